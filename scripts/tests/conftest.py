@@ -0,0 +1,29 @@
+'''
+The tests import the vpc_network_diagram package from the directory above,
+where vpc-network-diagram.py runs it from. Run them from there:
+
+    python -m pytest -q tests
+'''
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Input files for the tests
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),"data")
+
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0,SCRIPTS_DIR)
+
+def get_bench_snapshots(subnet_count,route_count,vpc_count=1,include_security=False,include_interfaces=False):
+    '''
+    Collect the snapshots of a synthetic region (see bench.py) through its
+    fake EC2 client, as a dict of {vpc_id: snapshot}.
+    '''
+    from vpc_network_diagram.bench import generate_region, FakeEc2Client
+    from vpc_network_diagram.collect import get_vpc_descriptions, collect_region_snapshots
+
+    ec2_client = FakeEc2Client(generate_region(subnet_count,route_count,vpc_count))
+    return collect_region_snapshots(ec2_client,get_vpc_descriptions(ec2_client,all_vpcs=True),
+        include_security=include_security,include_interfaces=include_interfaces)
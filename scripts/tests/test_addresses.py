@@ -0,0 +1,64 @@
+'''
+Address planning: overlapping CIDR blocks of different VPCs, and subnet
+utilization.
+'''
+
+import copy
+import ipaddress
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram.addresses import add_graph_utilization_heat, analyze_addresses, find_overlaps
+from vpc_network_diagram.diff import build_diff_graph
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.model import build_vpc_model
+
+def get_block(cidr,resource_id,vpc_id):
+    return (ipaddress.ip_network(cidr),resource_id,vpc_id,"111111111111")
+
+def get_overlap_ids(overlaps):
+    return sorted((outer[1],inner[1]) for outer,inner in overlaps)
+
+def test_find_overlaps():
+    blocks = [
+        get_block("10.0.0.0/16","a","vpc-a"),
+        get_block("10.0.1.0/24","b","vpc-b"),
+        get_block("10.0.0.0/16","c","vpc-c"),
+        get_block("10.1.0.0/16","d","vpc-d"),
+        # Within a block of the same VPC, which isn't an overlap
+        get_block("10.1.2.0/24","e","vpc-d"),
+        get_block("2600:1f14::/56","f","vpc-a"),
+        get_block("2600:1f14:0:1::/64","g","vpc-b"),
+    ]
+    assert get_overlap_ids(find_overlaps(blocks)) == [("a","b"),("a","c"),("c","b"),("f","g")]
+
+def test_no_overlaps():
+    blocks = [get_block(f"10.{i}.0.0/16",f"vpc-{i}",f"vpc-{i}") for i in range(10)]
+    assert find_overlaps(blocks) == []
+
+def test_analyze_addresses():
+    snapshot = list(get_bench_snapshots(10,20).values())[0]
+    copied_snapshot = copy.deepcopy(snapshot)
+    copied_snapshot["Vpc"]["VpcId"] = "vpc-copy"
+    for subnet_description in copied_snapshot["Subnets"]:
+        subnet_description["SubnetId"] += "-copy"
+        subnet_description["VpcId"] = "vpc-copy"
+
+    results = analyze_addresses([build_vpc_model(snapshot),build_vpc_model(copied_snapshot)])
+    overlaps = [result for result in results if result["Type"] == "Overlap"]
+    assert any(result["Kind"] == "vpc" for result in overlaps)
+    # Each subnet's IPv4 and IPv6 blocks overlap its copy's
+    assert sum(1 for result in overlaps if result["Kind"] == "subnet") == 20
+
+    utilizations = [result["Utilization"] for result in results if result["Type"] == "Utilization"]
+    assert len(utilizations) == 20
+    assert utilizations == sorted(utilizations,reverse=True)
+
+def test_heat_keeps_removed_style():
+    old_snapshot = list(get_bench_snapshots(10,20).values())[0]
+    new_snapshot = copy.deepcopy(old_snapshot)
+    removed_subnet_id = new_snapshot["Subnets"].pop()["SubnetId"]
+
+    graph = build_diff_graph(build_graph(old_snapshot),build_graph(new_snapshot),set())
+    add_graph_utilization_heat(graph)
+    assert sorted(graph.get_node(removed_subnet_id).attributes["style"].split(",")) == ["dashed","filled"]
+    assert graph.get_node(old_snapshot["Subnets"][0]["SubnetId"]).attributes["style"] == "filled"
@@ -0,0 +1,31 @@
+'''
+The benchmark harness: its fake EC2 client filters and paginates like EC2,
+and a small run goes through every phase.
+'''
+
+from vpc_network_diagram.bench import PAGE_SIZE, FakeEc2Client, generate_region, run_benchmark
+from vpc_network_diagram.collect import get_vpc_descriptions, collect_region_snapshots
+
+def test_fake_client_filters_and_paginates():
+    ec2_client = FakeEc2Client(generate_region(1500,100,vpc_count=2))
+    pages = list(ec2_client.get_paginator("describe_subnets").paginate(
+        Filters=[{"Name": "vpc-id", "Values": ["vpc-1"]}]))
+
+    assert [len(page["Subnets"]) for page in pages] == [PAGE_SIZE,1500 - PAGE_SIZE]
+    assert all(d["VpcId"] == "vpc-1" for page in pages for d in page["Subnets"])
+    assert ec2_client.call_count == 2
+
+def test_batch_collection_calls_dont_grow_with_vpcs():
+    call_counts = []
+    for vpc_count in [1,5]:
+        ec2_client = FakeEc2Client(generate_region(10,20,vpc_count=vpc_count))
+        snapshots = collect_region_snapshots(ec2_client,get_vpc_descriptions(ec2_client,all_vpcs=True))
+        assert len(snapshots) == vpc_count
+        call_counts.append(ec2_client.call_count)
+    assert call_counts[0] == call_counts[1]
+
+def test_run_benchmark():
+    result = run_benchmark(10,100,flow_log_records=1000)
+    assert result["Size"]["RouteTables"] == 1
+    for phase in ["collect","model","graph","write_dot","summarize","save_snapshot","load_snapshot"]:
+        assert result["Phases"][phase]["Seconds"] >= 0
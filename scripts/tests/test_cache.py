@@ -0,0 +1,90 @@
+'''
+The on-disk response cache, in front of bench's fake EC2 client.
+'''
+
+import os
+
+from vpc_network_diagram.bench import PAGE_SIZE, FakeEc2Client, generate_region
+from vpc_network_diagram.cache import CACHE_TTLS, ResponseCache, CachedClient, _CachedPaginator
+from vpc_network_diagram.collect import INTERFACE_PAGE_SIZE, describe_all, get_network_interface_counts
+
+def get_cached_client(cache_dir,subnet_count=1000):
+    ec2_client = FakeEc2Client(generate_region(subnet_count,100))
+    return ec2_client,CachedClient(ec2_client,ResponseCache(str(cache_dir),1024 * 1024 * 1024),"111111111111")
+
+def get_entry_paths(cache_dir):
+    return sorted(entry.path for entry in os.scandir(cache_dir) if entry.name.endswith(".json.gz"))
+
+def test_pages_cached_one_by_one(tmp_path):
+    ec2_client,cached_client = get_cached_client(tmp_path)
+    counts = get_network_interface_counts(cached_client)
+    call_count = ec2_client.call_count
+    assert call_count > 1
+    assert len(get_entry_paths(tmp_path)) == call_count
+
+    assert get_network_interface_counts(cached_client) == counts
+    assert ec2_client.call_count == call_count
+
+def get_listing_entry(cached_client):
+    key = cached_client._get_key("describe_network_interfaces",{"PaginationConfig": {"PageSize": INTERFACE_PAGE_SIZE}},True)
+    return cached_client._response_cache.get(key,None)
+
+def test_missing_page_listed_again(tmp_path):
+    ec2_client,cached_client = get_cached_client(tmp_path)
+    counts = get_network_interface_counts(cached_client)
+    call_count = ec2_client.call_count
+    first_entry = get_listing_entry(cached_client)
+    assert first_entry["PageCount"] == call_count
+
+    # Without its second page, the whole listing is fetched again rather
+    # than resumed from a token of the first page's time
+    key = cached_client._get_key("describe_network_interfaces",{"PaginationConfig": {"PageSize": INTERFACE_PAGE_SIZE}},
+        True,first_entry["ListingId"],1)
+    os.remove(ResponseCache(str(tmp_path),0)._get_path(key))
+    assert get_network_interface_counts(cached_client) == counts
+    assert ec2_client.call_count == 2 * call_count
+    assert get_listing_entry(cached_client)["ListingId"] != first_entry["ListingId"]
+
+    assert get_network_interface_counts(cached_client) == counts
+    assert ec2_client.call_count == 2 * call_count
+
+def test_listing_expires_as_a_unit(tmp_path,monkeypatch):
+    ec2_client,cached_client = get_cached_client(tmp_path)
+    get_network_interface_counts(cached_client)
+    call_count = ec2_client.call_count
+
+    # Once the first page expires, so do the pages after it
+    monkeypatch.setitem(CACHE_TTLS,"describe_network_interfaces",-1)
+    get_network_interface_counts(cached_client)
+    assert ec2_client.call_count == 2 * call_count
+
+def test_eviction(tmp_path):
+    response_cache = ResponseCache(str(tmp_path),2500)
+    for i in range(10):
+        response_cache.put(["key",i],os.urandom(256).hex())
+        assert response_cache._total_bytes == sum(entry.stat().st_size for entry in os.scandir(tmp_path)
+            if entry.name.endswith(".json.gz"))
+        assert response_cache._total_bytes <= 2500
+    assert response_cache.get(["key",9],None) is not None
+    assert response_cache.get(["key",0],None) is None
+
+def test_refresh(tmp_path):
+    ec2_client,cached_client = get_cached_client(tmp_path,subnet_count=10)
+    subnets = describe_all(cached_client,"describe_subnets","Subnets")
+    call_count = ec2_client.call_count
+    refreshing_client = CachedClient(ec2_client,ResponseCache(str(tmp_path),1024 * 1024 * 1024),"111111111111",True)
+
+    assert describe_all(refreshing_client,"describe_subnets","Subnets") == subnets
+    assert ec2_client.call_count == call_count + 1
+    assert describe_all(cached_client,"describe_subnets","Subnets") == subnets
+    assert ec2_client.call_count == call_count + 1
+
+def test_only_listed_operations_cached(tmp_path):
+    ec2_client,cached_client = get_cached_client(tmp_path,subnet_count=10)
+    ec2_client.get_waiter = lambda waiter_name: waiter_name
+    ec2_client.describe_instances = lambda **kwargs: {"Reservations": []}
+
+    assert cached_client.get_waiter is ec2_client.get_waiter
+    assert cached_client.describe_instances is ec2_client.describe_instances
+    assert not isinstance(cached_client.get_paginator("describe_instances"),_CachedPaginator)
+    assert isinstance(cached_client.get_paginator("describe_subnets"),_CachedPaginator)
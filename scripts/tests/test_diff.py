@@ -0,0 +1,79 @@
+'''
+Snapshot diffs: resources are matched by ID (routes by route table and
+destination), and volatile fields are ignored.
+'''
+
+import copy
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram.diff import diff_snapshots, format_report_summary, get_modified_ids
+
+def get_snapshot():
+    return list(get_bench_snapshots(10,100).values())[0]
+
+def get_ids(report,change):
+    return sorted((item["Type"],item["Id"]) for item in report[change])
+
+def test_unchanged():
+    old_snapshot = get_snapshot()
+    new_snapshot = copy.deepcopy(old_snapshot)
+    new_snapshot["Subnets"][0]["AvailableIpAddressCount"] -= 1
+
+    report = diff_snapshots(old_snapshot,new_snapshot)
+    assert report == {"VpcId": "vpc-0", "Added": [], "Removed": [], "Modified": [], "Skipped": []}
+
+def test_added_removed_and_modified():
+    old_snapshot = get_snapshot()
+    new_snapshot = copy.deepcopy(old_snapshot)
+    removed_subnet = new_snapshot["Subnets"].pop()
+    new_snapshot["Subnets"].append({**removed_subnet,"SubnetId": "subnet-new"})
+    new_snapshot["Subnets"][0]["Tags"] = [{"Key": "Name", "Value": "renamed"}]
+    route_table = new_snapshot["RouteTables"][0]
+    route_table["Routes"].append({"DestinationCidrBlock": "192.0.2.0/24", "GatewayId": "igw-0",
+        "Origin": "CreateRoute", "State": "active"})
+
+    report = diff_snapshots(old_snapshot,new_snapshot)
+    route_id = f"{route_table['RouteTableId']} 192.0.2.0/24"
+    assert get_ids(report,"Added") == [("Routes",route_id),("Subnets","subnet-new")]
+    assert get_ids(report,"Removed") == [("Subnets",removed_subnet["SubnetId"])]
+    assert get_ids(report,"Modified") == [("Subnets",new_snapshot["Subnets"][0]["SubnetId"])]
+    assert report["Modified"][0]["Changes"][0]["Key"] == "Tags"
+    # A route table whose routes changed is modified too, on the diagram
+    assert route_table["RouteTableId"] in get_modified_ids(report)
+
+def test_static_and_propagated_routes_kept_apart():
+    old_snapshot = get_snapshot()
+    route_table = old_snapshot["RouteTables"][0]
+    route_table["Routes"] += [
+        {"DestinationCidrBlock": "192.0.2.0/24", "GatewayId": "vgw-0", "Origin": "CreateRoute", "State": "active"},
+        {"DestinationCidrBlock": "192.0.2.0/24", "GatewayId": "vgw-0", "Origin": "EnableVgwRoutePropagation", "State": "active"},
+    ]
+    new_snapshot = copy.deepcopy(old_snapshot)
+    # The static route goes, and the propagated one becomes a blackhole
+    new_snapshot["RouteTables"][0]["Routes"][-1]["State"] = "blackhole"
+    del new_snapshot["RouteTables"][0]["Routes"][-2]
+
+    report = diff_snapshots(old_snapshot,new_snapshot)
+    route_id = f"{route_table['RouteTableId']} 192.0.2.0/24"
+    assert get_ids(report,"Removed") == [("Routes",route_id)]
+    assert get_ids(report,"Modified") == [("Routes",f"{route_id} propagated")]
+    assert report["Modified"][0]["Changes"] == [{"Key": "State", "Old": "active", "New": "blackhole"}]
+    assert route_table["RouteTableId"] in get_modified_ids(report)
+
+def test_types_missing_from_one_snapshot_skipped():
+    new_snapshot = get_snapshot()
+    new_snapshot["VpcEndpoints"] = [{"VpcEndpointId": "vpce-0", "VpcId": "vpc-0"}]
+    old_snapshot = copy.deepcopy(new_snapshot)
+    # As in a snapshot file from before endpoints were collected
+    del old_snapshot["VpcEndpoints"]
+
+    report = diff_snapshots(old_snapshot,new_snapshot)
+    assert report["Added"] == [] and report["Removed"] == []
+    assert report["Skipped"] == ["VpcEndpoints"]
+    assert format_report_summary(report) == "vpc-0: 0 added, 0 removed, 0 modified (VpcEndpoints not compared)"
+
+def test_vpc_added():
+    new_snapshot = get_snapshot()
+    report = diff_snapshots(None,new_snapshot)
+    assert report["Removed"] == [] and report["Modified"] == []
+    assert ("Vpc","vpc-0") in get_ids(report,"Added")
@@ -0,0 +1,133 @@
+'''
+Exports of a synthetic VPC's graph: JSON and NDJSON documents that read
+back as the graph's nodes and edges, well-formed GraphML, and Mermaid, with
+the special characters of names escaped.
+'''
+
+import json
+import os
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram import VpcDiagramError
+from vpc_network_diagram.export import export_graph
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.summarize import summarize_graph
+
+GRAPHML_NAMESPACE = {"g": "http://graphml.graphdrawing.org/xmlns"}
+
+# A subnet name with the characters that XML and Mermaid labels can't hold
+# as they are
+SPECIAL_NAME = 'web "a" <b> & #1\'s'
+
+def get_graph():
+    '''
+    The graph of a synthetic VPC of 10 subnets, one of which is named
+    SPECIAL_NAME.
+    '''
+    snapshot = get_bench_snapshots(10,20)["vpc-0"]
+    for subnet_description in snapshot["Subnets"]:
+        if subnet_description["SubnetId"] == "subnet-0-0":
+            subnet_description["Tags"] = [{"Key": "Name", "Value": SPECIAL_NAME}]
+    return build_graph(snapshot)
+
+def export(graph,tmp_path,extension):
+    filename = str(tmp_path / f"vpc{extension}")
+    export_graph(graph,[filename])
+    return filename
+
+def get_graph_edges(graph):
+    return sorted((edge.get_source(),edge.get_destination(),edge.attributes.get("label","")) for edge in graph.get_edges())
+
+def test_json_round_trip(tmp_path):
+    graph = get_graph()
+    with open(export(graph,tmp_path,".json"),encoding="utf-8") as f:
+        document = json.load(f)
+
+    assert document["Graph"] == graph.get_name()
+    nodes = {record["Id"]: record for record in document["Nodes"]}
+    assert len(nodes) == len(document["Nodes"]) == len(graph.get_nodes())
+    for node in graph.get_nodes():
+        assert nodes[node.get_name()]["Label"] == node.attributes.get("label","")
+    assert sorted((record["Source"],record["Target"],record["Label"]) for record in document["Edges"]) == get_graph_edges(graph)
+
+    subnet = nodes["subnet-0-0"]
+    assert (subnet["Type"],subnet["Name"],subnet["CidrBlocks"][0]) == ("Subnet",SPECIAL_NAME,"10.0.0.0/28")
+    route_table = nodes["rtb-0-0"]
+    assert route_table["Type"] == "RouteTable" and route_table["Main"]
+    assert len(route_table["SubnetIds"]) == 10
+    assert {"Destination": "0.0.0.0/0", "TargetId": "igw-0", "Propagated": False, "Blackhole": False} in route_table["Routes"]
+    assert nodes["vpc-0"]["CidrBlocks"][0] == "10.0.0.0/16"
+
+def test_ndjson_matches_json(tmp_path):
+    graph = get_graph()
+    with open(export(graph,tmp_path,".json"),encoding="utf-8") as f:
+        document = json.load(f)
+    with open(export(graph,tmp_path,".ndjson"),encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+
+    assert [line.pop("Kind") for line in lines] == ["Node"] * len(document["Nodes"]) + ["Edge"] * len(document["Edges"])
+    assert lines == document["Nodes"] + document["Edges"]
+
+def test_graphml(tmp_path):
+    graph = get_graph()
+    root = ElementTree.parse(export(graph,tmp_path,".graphml")).getroot()
+
+    keys = {key.get("id"): key.get("attr.name") for key in root.findall("g:key",GRAPHML_NAMESPACE)}
+    assert keys["name"] == "Name" and keys["edge_label"] == "Label"
+    graph_element = root.find("g:graph",GRAPHML_NAMESPACE)
+    node_elements = graph_element.findall("g:node",GRAPHML_NAMESPACE)
+    edge_elements = graph_element.findall("g:edge",GRAPHML_NAMESPACE)
+    assert len(node_elements) == len(graph.get_nodes())
+    assert len(edge_elements) == len(graph.get_edges())
+
+    def get_data(element):
+        return {data.get("key"): data.text for data in element.findall("g:data",GRAPHML_NAMESPACE)}
+
+    node_data = {node_element.get("id"): get_data(node_element) for node_element in node_elements}
+    assert node_data["subnet-0-0"]["name"] == SPECIAL_NAME
+    assert node_data["subnet-0-0"]["label"] == graph.get_node("subnet-0-0").attributes["label"]
+    assert node_data["subnet-0-0"]["type"] == "Subnet"
+    assert node_data["rtb-0-0"]["main"] == "true"
+    assert sorted((edge_element.get("source"),edge_element.get("target"),get_data(edge_element).get("edge_label",""))
+        for edge_element in edge_elements) == get_graph_edges(graph)
+
+def test_mermaid(tmp_path):
+    graph = get_graph()
+    with open(export(graph,tmp_path,".mmd"),encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    assert lines[0] == "flowchart LR"
+    node_lines = [line for line in lines[1:] if "-->" not in line and "---" not in line]
+    edge_lines = [line for line in lines[1:] if "-->" in line or "---" in line]
+    assert len(node_lines) == len(graph.get_nodes())
+    assert len(edge_lines) == len(graph.get_edges())
+
+    # The nodes are numbered in order, and the quotes, angle brackets and
+    # hashes of labels written as entity codes
+    subnet_line = node_lines[[node.get_name() for node in graph.get_nodes()].index("subnet-0-0")]
+    assert subnet_line.strip().startswith('n1["Subnet<br/>web #quot;a#quot; #lt;b#gt; & #35;1\'s<br/>subnet-0-0<br/>')
+    for line in node_lines:
+        label = line.split('"',1)[1].rsplit('"',1)[0]
+        assert '"' not in label and "<b>" not in label and "\n" not in label
+
+def test_mermaid_subgraphs(tmp_path):
+    graph,_ = summarize_graph(build_graph(get_bench_snapshots(40,20)["vpc-0"]),level=1)
+    with open(export(graph,tmp_path,".mmd"),encoding="utf-8") as f:
+        text = f.read()
+
+    lines = [line.strip() for line in text.splitlines()]
+    subgraph_count = sum(1 for line in lines if line.startswith("subgraph "))
+    assert subgraph_count > 0
+    assert lines.count("end") == subgraph_count
+    # Each node is written once, inside or outside of the subgraphs
+    node_ids = [line.split("[",1)[0].split("(",1)[0].split(">",1)[0] for line in lines
+        if line.startswith("n") and "--" not in line]
+    assert len(node_ids) == len(set(node_ids)) == len(graph.get_nodes())
+
+def test_unsupported_file_type(tmp_path):
+    with pytest.raises(VpcDiagramError,match="unsupported file type: .xml"):
+        export_graph(get_graph(),[str(tmp_path / "vpc.xml")])
+    assert not os.path.exists(tmp_path / "vpc.xml")
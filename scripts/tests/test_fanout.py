@@ -0,0 +1,132 @@
+'''
+Following peering connections and transit gateway attachments in to
+another region and account, with bench's fake EC2 clients standing in for
+each region.
+'''
+
+import json
+import re
+import threading
+
+from vpc_network_diagram.bench import FakeEc2Client, generate_region
+from vpc_network_diagram.collect import get_vpc_description, collect_vpc_snapshot
+from vpc_network_diagram.fanout import ClientPool, follow_links
+from vpc_network_diagram.graph import build_stitched_graph
+from vpc_network_diagram.nodes import RemoteVpcNode
+
+HOME_ACCOUNT_ID = "111111111111"
+OTHER_ACCOUNT_ID = "222222222222"
+MAX_WORKERS = 2
+
+class CountingEc2Client(FakeEc2Client):
+    '''
+    A fake EC2 client that records the most calls it had in flight at once.
+    '''
+    def __init__(self,region):
+        super().__init__(region,latency=0.005)
+        self._calls_lock = threading.Lock()
+        self._calls_in_flight = 0
+        self.max_calls_in_flight = 0
+
+    def _call(self,operation_name,kwargs,next_token=None):
+        with self._calls_lock:
+            self._calls_in_flight += 1
+            self.max_calls_in_flight = max(self.max_calls_in_flight,self._calls_in_flight)
+        try:
+            return super()._call(operation_name,kwargs,next_token)
+        finally:
+            with self._calls_lock:
+                self._calls_in_flight -= 1
+
+class FakeCredentials:
+    access_key = "home"
+    secret_key = "home"
+    token = None
+
+    def get_frozen_credentials(self):
+        return self
+
+class FakeStsClient:
+    def __init__(self):
+        self.assumed_role_arns = []
+
+    def get_caller_identity(self):
+        return {"Account": HOME_ACCOUNT_ID}
+
+    def assume_role(self,RoleArn,RoleSessionName):
+        self.assumed_role_arns.append(RoleArn)
+        account_id = RoleArn.split(":")[4]
+        return {"Credentials": {"AccessKeyId": f"role-{account_id}", "SecretAccessKey": "role", "SessionToken": "role"}}
+
+class FakeSession:
+    region_name = "us-west-2"
+
+    def __init__(self):
+        self.sts_client = FakeStsClient()
+
+    def get_credentials(self):
+        return FakeCredentials()
+
+    def client(self,service_name):
+        return self.sts_client
+
+def get_east_region():
+    '''
+    A region of two VPCs attached to a transit gateway, with IDs of their
+    own (vpc-east-0, subnet-east-0-0, ...).
+    '''
+    text = re.sub(r'"([a-z]+)-(\d)',r'"\1-east-\2',json.dumps(generate_region(8,20,2)))
+    return json.loads(text)
+
+def test_follow_links():
+    home_region = generate_region(8,20)
+    # Peer vpc-0 with a VPC in the other region, in the same account and in
+    # another one; the rest of its peers are nowhere to be found.
+    for vpc_peering_connection_description,account_id in zip(home_region["describe_vpc_peering_connections"],
+            [HOME_ACCOUNT_ID,OTHER_ACCOUNT_ID]):
+        vpc_peering_connection_description["AccepterVpcInfo"].update(OwnerId=account_id,
+            VpcId="vpc-east-0" if account_id == HOME_ACCOUNT_ID else "vpc-east-1")
+    home_client = FakeEc2Client(home_region)
+    vpc_description = get_vpc_description(home_client,"vpc-0")
+    snapshots = {"vpc-0": collect_vpc_snapshot(home_client,vpc_description)}
+
+    east_region = get_east_region()
+    created_clients = []
+    def create_client(session):
+        created_clients.append((session.get_credentials().access_key,session.region_name))
+        return CountingEc2Client(east_region)
+
+    session = FakeSession()
+    client_pool = ClientPool(session,role_name="network-admin",client_factory=create_client)
+    snapshots,skipped = follow_links(client_pool,snapshots,2,max_workers=MAX_WORKERS)
+
+    assert sorted(snapshots) == ["vpc-0","vpc-east-0","vpc-east-1"]
+    # The east VPCs' own peers are vpc-peer-0-* and vpc-peer-1-*
+    assert sorted(skipped) == sorted(f"vpc-peer-{v}-{p}" for v in range(2) for p in range(10))
+    assert skipped["vpc-peer-0-2"] == f"VPC not found in account {OTHER_ACCOUNT_ID} region us-east-1"
+    # One client per account and region, though the other account's is
+    # used again at the second hop
+    assert sorted(created_clients) == [("home","us-east-1"),(f"role-{OTHER_ACCOUNT_ID}","us-east-1")]
+    assert session.sts_client.assumed_role_arns == [f"arn:aws:iam::{OTHER_ACCOUNT_ID}:role/network-admin"]
+    for account_id in [HOME_ACCOUNT_ID,OTHER_ACCOUNT_ID]:
+        assert 0 < client_pool.get_client(account_id,"us-east-1").max_calls_in_flight <= MAX_WORKERS
+
+    graph = build_stitched_graph(snapshots)
+    for vpc_id in ["vpc-east-0","vpc-east-1"]:
+        assert not isinstance(graph.get_node(vpc_id),RemoteVpcNode)
+        assert graph.get_node(f"subnet-east-{vpc_id[-1]}-0") is not None
+    assert isinstance(graph.get_node("vpc-peer-0-2"),RemoteVpcNode)
+    # vpc-east-1's transit gateway attachment is drawn as the VPC itself
+    assert graph.get_node("tgw-attach-1") is None
+    assert graph.get_node("tgw-east-0") is not None
+
+def test_no_access_to_account():
+    home_client = FakeEc2Client(generate_region(8,20))
+    snapshots = {"vpc-0": collect_vpc_snapshot(home_client,get_vpc_description(home_client,"vpc-0"))}
+    created_clients = []
+    client_pool = ClientPool(FakeSession(),client_factory=created_clients.append)
+
+    snapshots,skipped = follow_links(client_pool,snapshots,1)
+    assert list(snapshots) == ["vpc-0"]
+    assert skipped["vpc-peer-0-0"] == f"no profile or role for account {OTHER_ACCOUNT_ID}"
+    assert created_clients == []
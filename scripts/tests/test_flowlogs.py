@@ -0,0 +1,169 @@
+'''
+Flow log traffic: reading text and Parquet flow logs, summing their records
+over the edges of a synthetic VPC's diagram, and drawing the totals.
+'''
+
+import gzip
+import ipaddress
+
+import pytest
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram import VpcDiagramError
+from vpc_network_diagram import flowlogs
+from vpc_network_diagram.flowlogs import (DEFAULT_FLOW_LOG_FIELDS, CidrIndex, TrafficIndex, add_traffic_overlay,
+    aggregate_flow_log, aggregate_flow_logs, read_text_records)
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.model import build_vpc_model
+from vpc_network_diagram.query import PROPAGATED_ROUTE_RANK, PREFIX_LIST_ROUTE_RANK
+
+# (srcaddr, dstaddr, packets, bytes, action) of the synthetic flow log. In
+# the bench VPC subnet-0-0 is 10.0.0.0/28 and subnet-0-1 is 10.0.0.16/28,
+# and rtb-0-0 routes 0.0.0.0/0 to igw-0, the S3 prefix list to vpce-0 and
+# 172.16.0.0/28 to nat-0-0.
+RECORDS = [
+    ("10.0.0.4","8.8.8.8","10","1000","ACCEPT"),
+    ("8.8.8.8","10.0.0.20","5","500","ACCEPT"),
+    ("10.0.0.4","52.218.1.5","20","2000","ACCEPT"),
+    ("10.0.0.4","172.16.0.5","1","100","ACCEPT"),
+    # Left out: traffic within the VPC, rejected traffic and no data
+    ("10.0.0.4","10.0.0.20","7","700","ACCEPT"),
+    ("10.0.0.4","8.8.8.8","3","300","REJECT"),
+    ("10.0.0.4","8.8.8.8","-","-","NODATA"),
+]
+TRAFFIC = {
+    ("subnet-0-0","rtb-0-0"): [3100,31],
+    ("subnet-0-1","rtb-0-0"): [500,5],
+    ("rtb-0-0","igw-0"): [1500,15],
+    ("rtb-0-0","vpce-0"): [2000,20],
+    ("rtb-0-0","nat-0-0"): [100,1],
+}
+
+def get_snapshot():
+    return get_bench_snapshots(10,100)["vpc-0"]
+
+def get_traffic_index():
+    return TrafficIndex([build_vpc_model(get_snapshot())])
+
+def get_flow_log_text(fields=DEFAULT_FLOW_LOG_FIELDS,header=False,repeat=1):
+    '''
+    The records as a text flow log with the fields given, the ones not in
+    RECORDS filled in.
+    '''
+    lines = [" ".join(fields)] if header else []
+    for _ in range(repeat):
+        for source,destination,packets,byte_count,action in RECORDS:
+            values = {"version": "2", "account-id": "111111111111", "interface-id": "eni-0-w0",
+                "srcaddr": source, "dstaddr": destination, "srcport": "443", "dstport": "51234", "protocol": "6",
+                "packets": packets, "bytes": byte_count, "start": "1700000000", "end": "1700000060",
+                "action": action, "log-status": "OK" if action != "NODATA" else "NODATA"}
+            lines.append(" ".join(values[field] for field in fields))
+    return "\n".join(lines) + "\n"
+
+def write_flow_log(path,text,compress=False):
+    data = text.encode("utf-8")
+    if compress:
+        data = gzip.compress(data)
+    path.write_bytes(data)
+    return str(path)
+
+def multiply(traffic,factor):
+    return {edge_key: [byte_count * factor,packets * factor] for edge_key,(byte_count,packets) in traffic.items()}
+
+# Reading -------------------------------------------------------------
+
+@pytest.mark.parametrize("header",[False,True])
+@pytest.mark.parametrize("compress",[False,True])
+def test_text_flow_log(tmp_path,header,compress):
+    filename = write_flow_log(tmp_path / "flow.log",get_flow_log_text(header=header),compress)
+    assert aggregate_flow_log(filename,None,get_traffic_index()) == TRAFFIC
+
+def test_custom_format(tmp_path):
+    # A header gives the positions of the fields; without an action field
+    # the REJECT record counts too.
+    filename = write_flow_log(tmp_path / "flow.log",
+        get_flow_log_text(["bytes","dstaddr","srcaddr","packets","action"],header=True))
+    assert aggregate_flow_log(filename,None,get_traffic_index()) == TRAFFIC
+    filename = write_flow_log(tmp_path / "no-action.log",
+        get_flow_log_text(["srcaddr","dstaddr","packets","bytes"],header=True))
+    traffic = aggregate_flow_log(filename,None,get_traffic_index())
+    assert traffic[("rtb-0-0","igw-0")] == [1800,18]
+
+    filename = write_flow_log(tmp_path / "no-bytes.log",get_flow_log_text(["srcaddr","dstaddr","packets"],header=True))
+    with pytest.raises(VpcDiagramError,match="has no bytes field"):
+        aggregate_flow_log(filename,None,get_traffic_index())
+
+def test_records_split_across_blocks(tmp_path,monkeypatch):
+    # Enough records to go past the end of the first block, and with small
+    # blocks every record is split between two or more of them.
+    repeat = flowlogs.CHUNK_BYTES // len(get_flow_log_text()) + 2
+    filename = write_flow_log(tmp_path / "flow.log",get_flow_log_text(header=True,repeat=repeat))
+    with open(filename,"rb") as f:
+        chunks = list(read_text_records(f,filename))
+    assert len(chunks) == 3
+    assert sum(len(records) for records in chunks) == len(RECORDS) * repeat
+    assert aggregate_flow_log(filename,None,get_traffic_index()) == multiply(TRAFFIC,repeat)
+
+    monkeypatch.setattr(flowlogs,"CHUNK_BYTES",17)
+    filename = write_flow_log(tmp_path / "small.log",get_flow_log_text(header=True,repeat=3).rstrip("\n"))
+    with open(filename,"rb") as f:
+        records = [record for chunk in read_text_records(f,filename) for record in chunk]
+    assert records == [tuple(value.encode("ascii") for value in record) for record in RECORDS] * 3
+    assert aggregate_flow_log(filename,None,get_traffic_index()) == multiply(TRAFFIC,3)
+
+def test_parquet_flow_log(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    columns = {field: [record[i] for record in RECORDS] for i,field in enumerate(flowlogs.FLOW_LOG_COLUMNS)}
+    for field in ["packets","bytes"]:
+        columns[field] = [None if value == "-" else int(value) for value in columns[field]]
+    filename = str(tmp_path / "flow.parquet")
+    pyarrow.parquet.write_table(pyarrow.table(columns),filename,row_group_size=4)
+
+    records = [record for chunk in flowlogs.read_parquet_records(filename,0) for record in chunk]
+    assert records == [("10.0.0.4","8.8.8.8",10,1000,"ACCEPT"),("8.8.8.8","10.0.0.20",5,500,"ACCEPT"),
+        ("10.0.0.4","52.218.1.5",20,2000,"ACCEPT"),("10.0.0.4","172.16.0.5",1,100,"ACCEPT")]
+    # One task per row group
+    assert aggregate_flow_logs([filename],[build_vpc_model(get_snapshot())],max_workers=1) == TRAFFIC
+
+def test_parquet_without_pyarrow(tmp_path,monkeypatch):
+    monkeypatch.setattr(flowlogs,"parquet",None)
+    filename = write_flow_log(tmp_path / "flow.parquet","PAR1 and the rest of a Parquet file")
+    with pytest.raises(VpcDiagramError,match="needs the pyarrow module"):
+        aggregate_flow_logs([filename],[build_vpc_model(get_snapshot())])
+
+def test_missing_file(tmp_path):
+    with pytest.raises(VpcDiagramError,match="cannot read flow log file"):
+        aggregate_flow_logs([str(tmp_path / "missing.log")],[build_vpc_model(get_snapshot())])
+
+# Aggregation ---------------------------------------------------------
+
+def test_cidr_index_same_prefix_ranked():
+    network = ipaddress.ip_network("10.0.0.0/16")
+    index = CidrIndex([(ipaddress.ip_network("0.0.0.0/0"),"default",0),(network,"propagated",PROPAGATED_ROUTE_RANK),
+        (network,"static",0),(network,"prefix list",PREFIX_LIST_ROUTE_RANK)])
+    assert index.lookup(int(ipaddress.ip_address("10.0.0.1"))) == "static"
+    assert index.lookup(int(ipaddress.ip_address("10.1.0.1"))) == "default"
+
+def test_worker_processes_merged(tmp_path):
+    filenames = [write_flow_log(tmp_path / "flow-1.log",get_flow_log_text()),
+        write_flow_log(tmp_path / "flow-2.log.gz",get_flow_log_text(header=True,repeat=2),compress=True)]
+    traffic = aggregate_flow_logs(filenames,[build_vpc_model(get_snapshot())],max_workers=2)
+    assert traffic == multiply(TRAFFIC,3)
+
+# Overlay -------------------------------------------------------------
+
+def test_traffic_overlay():
+    graph = build_graph(get_snapshot())
+    add_traffic_overlay(graph,TRAFFIC)
+
+    edges = {(edge.get_source(),edge.get_destination()): edge.attributes for edge in graph.get_edges()}
+    assert edges[("subnet-0-0","rtb-0-0")]["label"] == "3.0 KB, 31 packets"
+    assert edges[("subnet-0-1","rtb-0-0")]["label"] == "500 B, 5 packets"
+    assert edges[("rtb-0-0","igw-0")]["label"] == "0.0.0.0/0\n1.5 KB, 15 packets"
+    # The most bytes get the widest edge, and edges without traffic are as
+    # they were.
+    assert edges[("subnet-0-0","rtb-0-0")]["penwidth"] == "8.0"
+    assert edges[("rtb-0-0","nat-0-0")]["penwidth"] == "2.3"
+    assert "penwidth" not in edges[("subnet-0-2","rtb-0-0")]
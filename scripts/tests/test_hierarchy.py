@@ -0,0 +1,85 @@
+'''
+Hierarchical output: the split of a synthetic VPC's graph in to an overview
+and a detail graph per availability zone, linked to each other, and the
+check for detail files that already exist.
+'''
+
+import pytest
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram import cli
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.hierarchy import AvailabilityZoneNode, find_detail_files, split_graph
+from vpc_network_diagram.nodes import SubnetNode, VpcNode
+from vpc_network_diagram.snapshot import save_snapshots
+
+AVAILABILITY_ZONES = ["us-west-2a","us-west-2b","us-west-2c"]
+
+def get_nodes(graph,node_class):
+    return {node.get_name(): node for node in graph.get_nodes() if isinstance(node,node_class)}
+
+def test_split_graph():
+    graph = build_graph(get_bench_snapshots(40,40)["vpc-0"])
+    subnet_names = set(get_nodes(graph,SubnetNode))
+    (overview,overview_filenames),details = split_graph(graph,["out/vpc.png","out/vpc.svg"])
+
+    assert overview_filenames == ["out/vpc.png","out/vpc.svg"]
+    assert [detail_filenames for _,detail_filenames in details] == [
+        [f"out/vpc-{availability_zone}.png",f"out/vpc-{availability_zone}.svg"] for availability_zone in AVAILABILITY_ZONES]
+
+    # Every subnet is in exactly one zone's detail, with its edges
+    detail_subnet_names = [set(get_nodes(detail,SubnetNode)) for detail,_ in details]
+    assert sum(len(names) for names in detail_subnet_names) == len(subnet_names) == 40
+    assert set().union(*detail_subnet_names) == subnet_names
+    for (detail,_),names in zip(details,detail_subnet_names):
+        for edge in detail.get_edges():
+            assert edge.get_source() in names or edge.get_destination() in names
+            assert detail.get_node(edge.get_source()) is not None and detail.get_node(edge.get_destination()) is not None
+
+        # The VPC links back to the overview, as SVG, without changing the
+        # overview's own VPC node
+        vpc_node = get_nodes(detail,VpcNode)["vpc-0"]
+        assert vpc_node.attributes["URL"] == "vpc.svg"
+    assert "URL" not in overview.get_node("vpc-0").attributes
+
+    # The overview has no subnets, and its zones link to their details
+    assert get_nodes(overview,SubnetNode) == {}
+    zone_nodes = get_nodes(overview,AvailabilityZoneNode)
+    assert sorted(zone_nodes) == [f"az:{availability_zone}" for availability_zone in AVAILABILITY_ZONES]
+    for availability_zone,(detail,_) in zip(AVAILABILITY_ZONES,details):
+        zone_node = zone_nodes[f"az:{availability_zone}"]
+        assert zone_node.attributes["URL"] == f"vpc-{availability_zone}.svg"
+        assert sorted(zone_node.get_subnet_names()) == sorted(get_nodes(detail,SubnetNode))
+
+    # The subnets' edges are merged on to their zones, with counts
+    subnet_count = sum(int(edge.attributes["label"].split()[0]) for edge in overview.get_edges()
+        if edge.get_source().startswith("az:") and edge.get_destination().startswith("rtb-"))
+    assert subnet_count == 40
+
+def test_detail_links_to_first_file_type():
+    graph = build_graph(get_bench_snapshots(8,8)["vpc-0"])
+    (overview,_),details = split_graph(graph,["vpc.png","vpc.json"])
+    assert overview.get_node("az:us-west-2a").attributes["URL"] == "vpc-us-west-2a.png"
+    assert get_nodes(details[0][0],VpcNode)["vpc-0"].attributes["URL"] == "vpc.png"
+
+def test_find_detail_files(tmp_path):
+    for name in ["vpc-us-west-2a.svg","vpc-us-west-2-lax-1a.svg","vpc-no-az.svg","vpc-us-west-2a.png",
+            "vpc-old.svg","vpc-2024.svg","vpc.svg"]:
+        (tmp_path / name).write_text("")
+    assert find_detail_files([str(tmp_path / "vpc.svg")]) == [str(tmp_path / name)
+        for name in ["vpc-no-az.svg","vpc-us-west-2-lax-1a.svg","vpc-us-west-2a.svg"]]
+    assert find_detail_files([str(tmp_path / "vpc.pdf")]) == []
+
+def test_existing_detail_file_refused_before_collection(tmp_path,monkeypatch,capsys):
+    snapshot_filename = str(tmp_path / "snapshot.json.gz")
+    save_snapshots(snapshot_filename,get_bench_snapshots(8,8))
+    (tmp_path / "vpc-us-west-2b.svg").write_text("")
+
+    def collect_snapshots(args,batch_mode):
+        raise AssertionError("collected before the output files were checked")
+    monkeypatch.setattr(cli,"collect_snapshots",collect_snapshots)
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(["--from-snapshot",snapshot_filename,"--hierarchical","vpc-0",str(tmp_path / "vpc.svg")])
+    assert exc_info.value.code == 1
+    assert capsys.readouterr().err == f"ERROR - file already exists: {tmp_path / 'vpc-us-west-2b.svg'}\n"
@@ -0,0 +1,45 @@
+'''
+Importing the package, and running the script with --help, must stay cheap:
+boto3 and botocore are only imported once data is collected from AWS.
+'''
+
+import os
+import subprocess
+import sys
+
+from conftest import SCRIPTS_DIR
+
+# Cumulative import time of the package, in microseconds; about 35 ms is
+# typical, the rest is headroom for slow machines.
+IMPORT_TIME_BUDGET_US = 150000
+
+HEAVY_MODULES = ["boto3","botocore"]
+
+def get_import_times(*args):
+    '''
+    Run python -X importtime with the arguments, and return the cumulative
+    import time of each module imported, as a dict of {module: us}.
+    '''
+    result = subprocess.run([sys.executable,"-X","importtime",*args],cwd=SCRIPTS_DIR,
+        env={**os.environ,"PYTHONPATH": SCRIPTS_DIR},capture_output=True,text=True,check=True)
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _,cumulative,module = line[len("import time:"):].split("|")
+        import_times[module.strip()] = int(cumulative)
+    return import_times
+
+def test_import_skips_heavy_modules():
+    import_times = get_import_times("-c","import vpc_network_diagram")
+    for module in HEAVY_MODULES:
+        assert module not in import_times
+
+def test_import_time_within_budget():
+    import_times = get_import_times("-c","import vpc_network_diagram")
+    assert import_times["vpc_network_diagram"] < IMPORT_TIME_BUDGET_US
+
+def test_help_skips_heavy_modules():
+    import_times = get_import_times("vpc-network-diagram.py","--help")
+    for module in HEAVY_MODULES:
+        assert module not in import_times
@@ -0,0 +1,88 @@
+'''
+The workload density overlay: network interfaces counted by subnet and kind
+in one paginated sweep, and drawn on the subnets of a synthetic VPC.
+'''
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram.addresses import add_graph_utilization_heat
+from vpc_network_diagram.bench import FakeEc2Client, generate_region
+from vpc_network_diagram.collect import get_network_interface_counts
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.interfaces import add_interface_overlay, get_interface_density
+from vpc_network_diagram.nodes import SubnetNode
+from vpc_network_diagram.summarize import SummaryNode, summarize_graph
+
+def get_snapshot():
+    '''
+    A synthetic VPC of 40 subnets, each with 4 workload interfaces of mixed
+    kinds, and subnets subnet-0-0 to subnet-0-19 with one more instance
+    interface, which has no addresses (see bench.py).
+    '''
+    return get_bench_snapshots(40,20,include_interfaces=True)["vpc-0"]
+
+def get_subnet_nodes(graph):
+    return {node.get_name(): node for node in graph.get_nodes() if isinstance(node,SubnetNode)}
+
+def test_network_interface_counts():
+    ec2_client = FakeEc2Client(generate_region(300,20,2))
+    counts = get_network_interface_counts(ec2_client,{"Filters": [{"Name": "vpc-id", "Values": ["vpc-1"]}]})
+
+    # The VPC's 1220 interfaces take two pages of the fake client
+    assert ec2_client.call_count == 2
+    assert set(c["VpcId"] for c in counts) == {"vpc-1"}
+    assert sum(c["InterfaceCount"] for c in counts) == 300 * 4 + 20
+    subnet_counts = {c["Kind"]: (c["InterfaceCount"],c["IpAddressCount"]) for c in counts if c["SubnetId"] == "subnet-1-1"}
+    assert subnet_counts == {"instance": (2,18), "Lambda": (2,2), "ELB": (1,1)}
+
+def test_interface_overlay():
+    snapshot = get_snapshot()
+    graph = build_graph(snapshot)
+    add_interface_overlay(graph,get_interface_density([snapshot]))
+
+    subnet_nodes = get_subnet_nodes(graph)
+    assert len(subnet_nodes) == 40
+    assert subnet_nodes["subnet-0-0"].attributes["label"].endswith("\n5 ENIs, 7 IPs\n5 instance")
+    assert subnet_nodes["subnet-0-1"].attributes["label"].endswith("\n5 ENIs, 21 IPs\n2 instance, 2 Lambda, 1 ELB")
+    assert subnet_nodes["subnet-0-22"].attributes["label"].endswith("\n4 ENIs, 5 IPs\n2 instance, 1 NAT, 1 endpoint")
+
+    # The busiest subnets are red, and those with 4 of their 5 interfaces
+    # orange
+    for s in range(40):
+        attributes = subnet_nodes[f"subnet-0-{s}"].attributes
+        assert attributes["style"] == "filled"
+        assert attributes["fillcolor"] == ("#f03b20" if s < 20 else "#fd8d3c")
+
+def test_no_interfaces():
+    snapshot = get_snapshot()
+    snapshot["NetworkInterfaceCounts"] = [c for c in snapshot["NetworkInterfaceCounts"] if c["SubnetId"] != "subnet-0-39"]
+    graph = build_graph(snapshot)
+    add_interface_overlay(graph,get_interface_density([snapshot]))
+    assert get_subnet_nodes(graph)["subnet-0-39"].attributes["label"].endswith("\n0 ENIs, 0 IPs")
+    assert get_subnet_nodes(graph)["subnet-0-39"].attributes["fillcolor"] == "#ffffb2"
+
+    # Snapshots collected without the interfaces have no density
+    snapshot = get_bench_snapshots(40,20)["vpc-0"]
+    assert get_interface_density([snapshot]) == {}
+
+def test_utilization_colors_kept():
+    snapshot = get_snapshot()
+    graph = build_graph(snapshot)
+    add_graph_utilization_heat(graph)
+    fill_colors = {name: node.attributes["fillcolor"] for name,node in get_subnet_nodes(graph).items()}
+    add_interface_overlay(graph,get_interface_density([snapshot]))
+    assert {name: node.attributes["fillcolor"] for name,node in get_subnet_nodes(graph).items()} == fill_colors
+    assert get_subnet_nodes(graph)["subnet-0-0"].attributes["label"].endswith("\n5 ENIs, 7 IPs\n5 instance")
+
+def test_collapsed_subnets():
+    snapshot = get_snapshot()
+    graph,_ = summarize_graph(build_graph(snapshot),level=1)
+    add_interface_overlay(graph,get_interface_density([snapshot]))
+
+    summary_nodes = [node for node in graph.get_nodes() if isinstance(node,SummaryNode)]
+    assert len(summary_nodes) > 0
+    density = get_interface_density([snapshot])
+    for node in summary_nodes:
+        subnet_ids = [name for name in node.get_member_names() if name in density]
+        interface_count = sum(counts[0] for subnet_id in subnet_ids for counts in density[subnet_id].values())
+        assert f"\n{interface_count} ENIs, " in node.attributes["label"]
+        assert "fillcolor" in node.attributes
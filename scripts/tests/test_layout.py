@@ -0,0 +1,113 @@
+'''
+The layout cache, with graphviz stood in for: layouts are keyed by
+topology, leaving colors out, and a cached layout is drawn with "neato -n2"
+at its positions.
+'''
+
+import copy
+import json
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram import layout
+from vpc_network_diagram.graph import build_graph
+
+class FakeGraphviz:
+    '''
+    Records the graphviz commands run and the graphs they were given, and
+    writes a layout with made-up positions for -Tjson0.
+    '''
+    def __init__(self):
+        self.runs = []
+
+    def __call__(self,command,graph):
+        self.runs.append((command,graph))
+        if "-Tjson0" not in command:
+            return
+        node_ids = {node.get_name(): i for i,node in enumerate(graph.get_nodes())}
+        document = {
+            "bb": "0,0,1000,1000",
+            "objects": [{"_gvid": i, "name": name, "pos": f"{10 * i},{20 * i}", "width": "1", "height": "0.5"}
+                for name,i in node_ids.items()],
+            "edges": [{"tail": node_ids[edge.get_source()], "head": node_ids[edge.get_destination()],
+                "pos": f"e,{i},{i}"} for i,edge in enumerate(graph.get_edges())],
+        }
+        layout_filename = command[command.index("-Tjson0") + 1][2:]
+        with open(layout_filename,"w",encoding="utf-8") as f:
+            json.dump(document,f)
+
+def get_colored_graph(snapshot):
+    '''
+    The snapshot's graph, highlighted as a diff would be.
+    '''
+    graph = build_graph(snapshot)
+    for node in graph.get_nodes()[:5]:
+        node.attributes.update(color="orange",penwidth="2",style="filled",fillcolor="#ffeda0")
+    return graph
+
+def get_snapshot():
+    return list(get_bench_snapshots(30,60).values())[0]
+
+def get_node_positions(graph):
+    return {node.get_name(): node.attributes.get("pos") for node in graph.get_nodes()}
+
+def test_topology_hash():
+    snapshot = get_snapshot()
+    graph = build_graph(snapshot)
+    topology_hash = layout.get_topology_hash(graph)
+    assert layout.get_topology_hash(build_graph(copy.deepcopy(snapshot))) == topology_hash
+
+    # Colors don't change the layout
+    assert layout.get_topology_hash(get_colored_graph(snapshot)) == topology_hash
+
+    # A new route changes an edge, and a renamed subnet its label
+    routed_snapshot = copy.deepcopy(snapshot)
+    routed_snapshot["RouteTables"][0]["Routes"].append({"DestinationCidrBlock": "192.0.2.0/24",
+        "GatewayId": "vgw-new", "Origin": "CreateRoute", "State": "active"})
+    renamed_snapshot = copy.deepcopy(snapshot)
+    renamed_snapshot["Subnets"][0]["Tags"] = [{"Key": "Name", "Value": "renamed"}]
+    topology_hashes = {topology_hash,layout.get_topology_hash(build_graph(routed_snapshot)),
+        layout.get_topology_hash(build_graph(renamed_snapshot))}
+    assert len(topology_hashes) == 3
+
+def test_cached_layout_reused(tmp_path,monkeypatch):
+    graphviz = FakeGraphviz()
+    monkeypatch.setattr(layout,"run_graphviz",graphviz)
+    layout_cache = layout.LayoutCache(str(tmp_path / "layouts"),1024 * 1024 * 1024)
+    filenames = [str(tmp_path / "vpc.svg")]
+    snapshot = get_snapshot()
+
+    layout_cache.render(build_graph(snapshot),filenames)
+    command,_ = graphviz.runs[-1]
+    assert command[0] == "dot" and "-Tjson0" in command
+
+    # The same topology, colored, is drawn at the cached positions
+    colored_graph = get_colored_graph(snapshot)
+    layout_cache.render(colored_graph,filenames)
+    command,positioned_graph = graphviz.runs[-1]
+    assert command[:2] == ["neato","-n2"] and "-Tjson0" not in command
+    positions = get_node_positions(positioned_graph)
+    assert positions == {node.get_name(): f"{10 * i},{20 * i}" for i,node in enumerate(colored_graph.get_nodes())}
+    assert all(edge.attributes["pos"].startswith("e,") for edge in positioned_graph.get_edges())
+    colored_node_name = colored_graph.get_nodes()[0].get_name()
+    assert positioned_graph.get_node(colored_node_name).attributes["fillcolor"] == "#ffeda0"
+
+    # Without one subnet, neato lays it out again with the other nodes
+    # pinned where they were
+    removed_snapshot = copy.deepcopy(snapshot)
+    removed_subnet_id = removed_snapshot["Subnets"].pop()["SubnetId"]
+    layout_cache.render(build_graph(removed_snapshot),filenames)
+    command,seeded_graph = graphviz.runs[-1]
+    assert command[0] == "neato" and "-n2" not in command and "-Tjson0" in command
+    seeded_positions = get_node_positions(seeded_graph)
+    assert removed_subnet_id not in seeded_positions
+    assert all(seeded_positions[name] == position + "!" for name,position in positions.items() if name in seeded_positions)
+
+def test_changed_topology_laid_out_again(tmp_path,monkeypatch):
+    graphviz = FakeGraphviz()
+    monkeypatch.setattr(layout,"run_graphviz",graphviz)
+    layout_cache = layout.LayoutCache(str(tmp_path / "layouts"),1024 * 1024 * 1024)
+
+    layout_cache.render(build_graph(get_snapshot()),[str(tmp_path / "vpc.svg")])
+    # Much changed, a diagram gets a fresh layout from dot
+    layout_cache.render(build_graph(list(get_bench_snapshots(10,20).values())[0]),[str(tmp_path / "vpc.svg")])
+    assert [command[0] for command,_ in graphviz.runs] == ["dot","dot"]
@@ -0,0 +1,73 @@
+'''
+Route lookups: longest-prefix matching in a PrefixTrie, the ranking of
+routes with the same prefix, and queries against a synthetic VPC.
+'''
+
+import ipaddress
+
+import pytest
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram import VpcDiagramError
+from vpc_network_diagram.model import build_vpc_model
+from vpc_network_diagram.query import (PROPAGATED_ROUTE_RANK, PREFIX_LIST_ROUTE_RANK, PrefixTrie,
+    RouteQueryEngine)
+
+def lookup(trie,address):
+    return trie.lookup(ipaddress.ip_network(address))
+
+def test_longest_prefix_match():
+    trie = PrefixTrie(32)
+    for cidr in ["0.0.0.0/0","10.0.0.0/8","10.1.0.0/16","10.1.2.0/24"]:
+        trie.insert(ipaddress.ip_network(cidr),cidr)
+
+    assert lookup(trie,"10.1.2.3") == "10.1.2.0/24"
+    assert lookup(trie,"10.1.3.3") == "10.1.0.0/16"
+    assert lookup(trie,"10.2.0.1") == "10.0.0.0/8"
+    assert lookup(trie,"192.0.2.1") == "0.0.0.0/0"
+    # A block is matched by a prefix containing the whole of it
+    assert lookup(trie,"10.1.0.0/16") == "10.1.0.0/16"
+    assert lookup(trie,"10.0.0.0/7") == "0.0.0.0/0"
+
+def test_no_match():
+    trie = PrefixTrie(128)
+    trie.insert(ipaddress.ip_network("2600:1f14::/56"),"vpc")
+    assert lookup(trie,"2600:1f14::1") == "vpc"
+    assert lookup(trie,"2001:db8::1") is None
+
+def test_same_prefix_ranked():
+    network = ipaddress.ip_network("10.0.0.0/16")
+    trie = PrefixTrie(32)
+    trie.insert(network,"propagated",PROPAGATED_ROUTE_RANK)
+    trie.insert(network,"static")
+    trie.insert(network,"prefix list",PREFIX_LIST_ROUTE_RANK)
+    assert lookup(trie,"10.0.0.1") == "static"
+
+    trie = PrefixTrie(32)
+    trie.insert(network,"first")
+    trie.insert(network,"second")
+    assert lookup(trie,"10.0.0.1") == "second"
+
+def test_query_engine():
+    snapshot = list(get_bench_snapshots(10,100).values())[0]
+    route_table = snapshot["RouteTables"][0]
+    route_table["Routes"] += [
+        {"DestinationCidrBlock": "52.218.0.0/24", "GatewayId": "vgw-static", "Origin": "CreateRoute", "State": "active"},
+        {"DestinationPrefixListId": "pl-0", "GatewayId": "vpce-prefix-list", "Origin": "CreateRoute", "State": "active"},
+        {"DestinationCidrBlock": "52.218.1.0/24", "GatewayId": "vgw-propagated",
+            "Origin": "EnableVgwRoutePropagation", "State": "active"},
+    ]
+    engine = RouteQueryEngine(build_vpc_model(snapshot))
+
+    result = engine.lookup("subnet-0-0","10.0.5.6")
+    assert (result["RouteTableId"],result["Destination"],result["Target"]) == (route_table["RouteTableId"],"10.0.0.0/16","local")
+    assert engine.lookup("subnet-0-0","192.0.2.1")["Target"] == "igw-0"
+    assert engine.lookup("subnet-0-0","2001:db8::1")["Target"] == "eigw-0"
+    # pl-0 holds 52.218.0.0/24 and 52.218.1.0/24
+    assert engine.lookup("subnet-0-0","52.218.0.5")["Target"] == "vgw-static"
+    assert engine.lookup("subnet-0-0","52.218.1.5")["Target"] == "vpce-prefix-list"
+
+    with pytest.raises(VpcDiagramError,match="subnet not found"):
+        engine.lookup("subnet-missing","10.0.0.1")
+    with pytest.raises(VpcDiagramError,match="not an IP address"):
+        engine.lookup("subnet-0-0","nowhere")
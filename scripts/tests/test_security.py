@@ -0,0 +1,67 @@
+'''
+The network ACL and security group overlay: one node per distinct rule set,
+and edges for the security groups' references to each other.
+'''
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.nodes import NetworkAclNode, SecurityGroupNode, RemoteSecurityGroupNode
+
+def get_snapshot():
+    '''
+    A synthetic VPC of 40 subnets: 5 route tables, each with a network ACL
+    for its subnets, and 10 security groups (see bench.py).
+    '''
+    return get_bench_snapshots(40,40,include_security=True)["vpc-0"]
+
+def get_nodes(graph,node_class):
+    return {node.get_name(): node for node in graph.get_nodes() if isinstance(node,node_class)}
+
+def get_edges(graph,destination_prefix):
+    return {(edge.get_source(),edge.get_destination()): edge.attributes.get("label")
+        for edge in graph.get_edges() if edge.get_destination().startswith(destination_prefix)}
+
+def test_network_acls():
+    snapshot = get_snapshot()
+    graph = build_graph(snapshot,show_security=True)
+
+    # acl-0-4 has acl-0-0's rules, so they share a node, and the default ACL,
+    # associated with no subnets, isn't drawn.
+    network_acl_nodes = get_nodes(graph,NetworkAclNode)
+    assert sorted(network_acl_nodes) == ["acl-0-0","acl-0-1","acl-0-2","acl-0-3"]
+    assert network_acl_nodes["acl-0-0"].attributes["label"].startswith("2 Network ACLs\nacl-0-0\nacl-0-4\n")
+
+    # Each subnet has an edge to the node of its route table's ACL
+    network_acl_ids = {association["SubnetId"]: network_acl_description["NetworkAclId"]
+        for network_acl_description in snapshot["NetworkAcls"] for association in network_acl_description["Associations"]}
+    edges = get_edges(graph,"acl-")
+    assert len(edges) == 40
+    for subnet_id,network_acl_id in network_acl_ids.items():
+        assert (subnet_id,"acl-0-0" if network_acl_id == "acl-0-4" else network_acl_id) in edges
+
+def test_security_groups():
+    snapshot = get_snapshot()
+    security_groups = {d["GroupId"]: d for d in snapshot["SecurityGroups"]}
+    security_groups["sg-0-2"]["IpPermissionsEgress"].append({"IpProtocol": "tcp", "FromPort": 5432, "ToPort": 5432,
+        "UserIdGroupPairs": [{"GroupId": "sg-0-5"}]})
+    security_groups["sg-0-3"]["IpPermissions"].append({"IpProtocol": "tcp", "FromPort": 22, "ToPort": 22,
+        "UserIdGroupPairs": [{"GroupId": "sg-elsewhere"}]})
+    graph = build_graph(snapshot,show_security=True)
+
+    # sg-0-8 and sg-0-9 have the rules of sg-0-0 and sg-0-1
+    security_group_nodes = get_nodes(graph,SecurityGroupNode)
+    assert sorted(security_group_nodes) == [f"sg-0-{g}" for g in range(8)]
+    assert security_group_nodes["sg-0-0"].get_group_ids() == ("sg-0-0","sg-0-8")
+    assert security_group_nodes["sg-0-1"].get_group_ids() == ("sg-0-1","sg-0-9")
+    assert list(get_nodes(graph,RemoteSecurityGroupNode)) == ["sg-elsewhere"]
+
+    # Each group lets in HTTPS from the next; edges go the way the traffic does
+    edges = get_edges(graph,"sg-")
+    expected_edges = {(f"sg-0-{(g + 1) % 8}",f"sg-0-{g}"): "tcp/443" for g in range(8)}
+    expected_edges[("sg-0-2","sg-0-5")] = "tcp/5432"
+    expected_edges[("sg-elsewhere","sg-0-3")] = "tcp/22"
+    assert edges == expected_edges
+
+def test_no_overlay():
+    graph = build_graph(get_snapshot())
+    assert get_nodes(graph,NetworkAclNode) == {} and get_nodes(graph,SecurityGroupNode) == {}
@@ -0,0 +1,60 @@
+'''
+The diagram server, serving a synthetic region from bench's fake EC2
+client. Only the snapshot and export file types are requested, so that
+graphviz isn't needed.
+'''
+
+import asyncio
+import json
+
+from vpc_network_diagram.bench import FakeEc2Client, generate_region
+from vpc_network_diagram.server import DiagramServer
+
+async def get(port,path):
+    '''
+    Request the path, and return the response's status line and body.
+    '''
+    reader,writer = await asyncio.open_connection("127.0.0.1",port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head,_,body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0].decode("ascii"),body
+
+def run_requests(paths):
+    '''
+    Start a server, request the paths at once, and return the responses and
+    the number of EC2 API calls made.
+    '''
+    ec2_client = FakeEc2Client(generate_region(20,100))
+
+    async def run():
+        diagram_server = DiagramServer(ec2_client)
+        server = await asyncio.start_server(diagram_server.handle_connection,"127.0.0.1",0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*[get(port,path) for path in paths])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(run()),ec2_client.call_count
+
+def test_snapshot_and_exports():
+    responses,call_count = run_requests(["/vpc/bench-0.json","/vpc/bench-0.ndjson","/vpc/vpc-0.mmd"])
+    assert [status for status,_ in responses] == ["HTTP/1.1 200 OK"] * 3
+
+    snapshot = json.loads(responses[0][1])
+    assert snapshot["Vpc"]["VpcId"] == "vpc-0"
+    records = [json.loads(line) for line in responses[1][1].decode("utf-8").splitlines()]
+    assert sum(1 for record in records if record.get("Type") == "Subnet") == 20
+    assert responses[2][1].startswith(b"flowchart")
+
+    # The requests for bench-0 share one collection; vpc-0 is another key
+    _,single_call_count = run_requests(["/vpc/bench-0.json"])
+    assert call_count == 2 * single_call_count
+
+def test_not_found():
+    responses,_ = run_requests(["/vpc/missing.json","/vpc/bench-0.txt","/other"])
+    assert [status for status,_ in responses] == ["HTTP/1.1 404 Not Found"] * 3
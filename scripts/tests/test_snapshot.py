@@ -0,0 +1,44 @@
+'''
+Snapshot files: the snapshots of a synthetic region survive a save and
+load, and diagrams are built from the file without AWS API calls.
+'''
+
+import gzip
+import json
+
+import pytest
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram import VpcDiagramError, build_vpc_graph
+from vpc_network_diagram.nodes import SubnetNode
+from vpc_network_diagram.snapshot import SNAPSHOT_VERSION, save_snapshots, load_snapshots
+
+def test_round_trip(tmp_path):
+    snapshots = get_bench_snapshots(20,100,vpc_count=2)
+    filename = str(tmp_path / "snapshot.json.gz")
+    save_snapshots(filename,snapshots)
+
+    loaded_snapshots = load_snapshots(filename)
+    assert list(loaded_snapshots) == list(snapshots)
+    assert loaded_snapshots == json.loads(json.dumps(snapshots,default=lambda o: o.isoformat()))
+
+def test_build_graph_from_file(tmp_path):
+    filename = str(tmp_path / "snapshot.json.gz")
+    save_snapshots(filename,get_bench_snapshots(20,100))
+
+    graph = build_vpc_graph(filename,"bench-0")
+    assert sum(1 for node in graph.get_nodes() if isinstance(node,SubnetNode)) == 20
+
+def test_not_a_snapshot_file(tmp_path):
+    filename = str(tmp_path / "other.json.gz")
+    with gzip.open(filename,"wt",encoding="utf-8") as f:
+        json.dump({"Format": "something else"},f)
+    with pytest.raises(VpcDiagramError,match="not a snapshot file"):
+        load_snapshots(filename)
+
+def test_newer_version(tmp_path):
+    filename = str(tmp_path / "newer.json.gz")
+    with gzip.open(filename,"wt",encoding="utf-8") as f:
+        json.dump({"Format": "vpc-network-diagram-snapshot", "Version": SNAPSHOT_VERSION + 1, "Snapshots": []},f)
+    with pytest.raises(VpcDiagramError,match="newer"):
+        load_snapshots(filename)
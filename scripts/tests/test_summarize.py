@@ -0,0 +1,57 @@
+'''
+Summarizing large graphs: subnets and route tables are collapsed by level,
+whatever their IDs look like (e.g. the Terraform addresses that stand in
+for the IDs of resources a plan hasn't created yet).
+'''
+
+import copy
+
+import pytest
+
+from conftest import get_bench_snapshots
+from vpc_network_diagram.graph import build_graph
+from vpc_network_diagram.summarize import SummaryNode, summarize_graph
+
+def get_snapshot(route_table_ids):
+    '''
+    A synthetic VPC whose subnets are shared out among copies of its main
+    route table, with the IDs given.
+    '''
+    snapshot = list(get_bench_snapshots(12,20).values())[0]
+    route_table_description = snapshot["RouteTables"][0]
+    route_table_description["Associations"] = [a for a in route_table_description["Associations"] if a.get("Main")]
+
+    subnet_ids = [subnet_description["SubnetId"] for subnet_description in snapshot["Subnets"]]
+    for i,route_table_id in enumerate(route_table_ids):
+        copied_description = copy.deepcopy(route_table_description)
+        copied_description["RouteTableId"] = route_table_id
+        copied_description["Associations"] = [{"Main": False, "SubnetId": subnet_id, "RouteTableId": route_table_id}
+            for subnet_id in subnet_ids[i::len(route_table_ids)]]
+        snapshot["RouteTables"].append(copied_description)
+    return snapshot
+
+@pytest.mark.parametrize("route_table_ids",[
+    ["rtb-private-0","rtb-private-1","rtb-private-2"],
+    ["aws_route_table.private[0]","aws_route_table.private[1]","aws_route_table.private[2]"],
+])
+def test_identical_route_tables_collapsed(route_table_ids):
+    snapshot = get_snapshot(route_table_ids)
+    graph = build_graph(snapshot)
+    summary_graph,level = summarize_graph(graph,level=3)
+
+    assert level == 3
+    for route_table_id in route_table_ids:
+        assert summary_graph.get_node(route_table_id) is None
+    route_table_summaries = [node for node in summary_graph.get_nodes()
+        if isinstance(node,SummaryNode) and node.get_name().startswith("route-tables:")]
+    assert len(route_table_summaries) == 1
+    # The main route table has the same routes as its copies
+    assert sorted(route_table_summaries[0].get_member_names()) == sorted(
+        route_table_description["RouteTableId"] for route_table_description in snapshot["RouteTables"])
+
+def test_nothing_collapsed_within_budget():
+    graph = build_graph(get_snapshot(["rtb-private-0"]))
+    summary_graph,level = summarize_graph(graph)
+
+    assert level == 0
+    assert len(summary_graph.get_nodes()) == len(graph.get_nodes())
@@ -0,0 +1,126 @@
+'''
+Snapshots from "terraform show -json" output: a state, and a plan whose
+resources, in a child module, haven't been created yet. Each file is read
+both streamed (with ijson) and whole (with json.load).
+'''
+
+import json
+import os
+
+import pytest
+
+from conftest import DATA_DIR
+from vpc_network_diagram import VpcDiagramError, terraform
+from vpc_network_diagram.model import build_vpc_model
+from vpc_network_diagram.query import RouteQueryEngine
+
+PLAN_PREFIX = "module.network."
+
+def read_snapshots(filename,streamed):
+    path = os.path.join(DATA_DIR,filename)
+    with open(path,"rb") as f:
+        if streamed:
+            resources,references = terraform.read_streamed(f)
+        else:
+            resources,references = terraform.read_document(json.load(f))
+    return terraform.build_snapshots(resources,references)
+
+def get_route_tables(snapshot):
+    return {d["RouteTableId"]: d for d in snapshot["RouteTables"]}
+
+def get_associated_subnet_ids(route_table_description):
+    return sorted(a["SubnetId"] for a in route_table_description["Associations"] if not a["Main"])
+
+def is_main(route_table_description):
+    return any(a["Main"] for a in route_table_description["Associations"])
+
+def get_routes(route_table_description):
+    return [{k: v for k,v in route.items() if k not in ["Origin","State"]} for route in route_table_description["Routes"]]
+
+@pytest.mark.parametrize("streamed",[True,False])
+def test_state(streamed):
+    snapshots = read_snapshots("terraform-state.json",streamed)
+    # The data source isn't one of the VPCs
+    assert list(snapshots) == ["vpc-0a1b2c3d"]
+    snapshot = snapshots["vpc-0a1b2c3d"]
+    assert snapshot["Vpc"]["CidrBlock"] == "10.10.0.0/16"
+    assert {"Key": "Environment", "Value": "test"} in snapshot["Vpc"]["Tags"]
+
+    assert sorted((d["SubnetId"],d["CidrBlock"],d["AvailabilityZone"]) for d in snapshot["Subnets"]) == [
+        ("subnet-0private","10.10.10.0/24","us-west-2a"),
+        ("subnet-0public0","10.10.0.0/24","us-west-2a"),
+        ("subnet-0public1","10.10.1.0/24","us-west-2b"),
+    ]
+
+    route_tables = get_route_tables(snapshot)
+    assert sorted(route_tables) == ["rtb-0main","rtb-0public"]
+    assert is_main(route_tables["rtb-0main"]) and not is_main(route_tables["rtb-0public"])
+    assert route_tables["rtb-0main"]["Tags"] == [{"Key": "Name", "Value": "main"}]
+    assert get_routes(route_tables["rtb-0main"]) == [{"DestinationCidrBlock": "10.10.0.0/16", "GatewayId": "local"}]
+    assert get_associated_subnet_ids(route_tables["rtb-0public"]) == ["subnet-0public0","subnet-0public1"]
+    assert get_routes(route_tables["rtb-0public"]) == [
+        {"DestinationCidrBlock": "10.10.0.0/16", "GatewayId": "local"},
+        {"DestinationCidrBlock": "0.0.0.0/0", "GatewayId": "igw-0main"},
+    ]
+    assert [d["InternetGatewayId"] for d in snapshot["InternetGateways"]] == ["igw-0main"]
+
+    # The subnet without an association of its own takes the main route table
+    engine = RouteQueryEngine(build_vpc_model(snapshot))
+    assert engine.lookup("subnet-0private","192.0.2.1")["State"] == "no route"
+    assert engine.lookup("public-1","192.0.2.1")["Target"] == "igw-0main"
+
+@pytest.mark.parametrize("streamed",[True,False])
+def test_plan(streamed):
+    snapshots = read_snapshots("terraform-plan.json",streamed)
+    # Not yet created, the VPC's ID is its address; the prior state's VPC
+    # is left out.
+    vpc_id = PLAN_PREFIX + "aws_vpc.this"
+    assert list(snapshots) == [vpc_id]
+    snapshot = snapshots[vpc_id]
+
+    assert sorted(d["SubnetId"] for d in snapshot["Subnets"]) == [
+        PLAN_PREFIX + f"aws_subnet.{tier}[{i}]" for tier in ["private","public"] for i in range(2)]
+    assert all(d["VpcId"] == vpc_id for d in snapshot["Subnets"])
+
+    route_tables = get_route_tables(snapshot)
+    implicit_main_id = vpc_id + ".default_route_table_id"
+    assert sorted(route_tables) == sorted([implicit_main_id] + [PLAN_PREFIX + f"aws_route_table.{name}"
+        for name in ["private[0]","private[1]","public"]])
+    # aws_main_route_table_association replaces the implicit main route table
+    assert [route_table_id for route_table_id,d in route_tables.items() if is_main(d)] == [PLAN_PREFIX + "aws_route_table.private[0]"]
+    assert route_tables[implicit_main_id]["Associations"] == []
+
+    public_route_table = route_tables[PLAN_PREFIX + "aws_route_table.public"]
+    assert get_associated_subnet_ids(public_route_table) == [PLAN_PREFIX + f"aws_subnet.public[{i}]" for i in range(2)]
+    assert get_routes(public_route_table) == [
+        {"DestinationCidrBlock": "10.20.0.0/16", "GatewayId": "local"},
+        {"DestinationCidrBlock": "0.0.0.0/0", "GatewayId": PLAN_PREFIX + "aws_internet_gateway.this"},
+    ]
+    # count.index picks each private subnet's own route table and NAT gateway
+    for i in range(2):
+        route_table_description = route_tables[PLAN_PREFIX + f"aws_route_table.private[{i}]"]
+        assert get_associated_subnet_ids(route_table_description) == [PLAN_PREFIX + f"aws_subnet.private[{i}]"]
+        assert get_routes(route_table_description)[1] == {"DestinationCidrBlock": "0.0.0.0/0",
+            "NatGatewayId": PLAN_PREFIX + f"aws_nat_gateway.this[{i}]"}
+    assert sorted((d["NatGatewayId"],d["SubnetId"]) for d in snapshot["NatGateways"]) == [
+        (PLAN_PREFIX + f"aws_nat_gateway.this[{i}]",PLAN_PREFIX + f"aws_subnet.public[{i}]") for i in range(2)]
+
+    engine = RouteQueryEngine(build_vpc_model(snapshot))
+    assert engine.lookup("private-1","192.0.2.1")["Target"] == PLAN_PREFIX + "aws_nat_gateway.this[1]"
+
+def test_load_without_ijson(monkeypatch,tmp_path):
+    path = os.path.join(DATA_DIR,"terraform-plan.json")
+    streamed_snapshots = terraform.load_terraform_snapshots(path)
+    monkeypatch.setattr(terraform,"ijson",None)
+    assert terraform.load_terraform_snapshots(path) == streamed_snapshots
+
+    # Files too large to load whole are refused
+    monkeypatch.setattr(terraform,"MAX_UNSTREAMED_BYTES",1024)
+    with pytest.raises(VpcDiagramError,match="needs the ijson module"):
+        terraform.load_terraform_snapshots(path)
+
+def test_no_vpcs(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text('{"format_version": "1.0", "values": {"root_module": {}}}')
+    with pytest.raises(VpcDiagramError,match="no AWS VPC resources"):
+        terraform.load_terraform_snapshots(str(path))
@@ -0,0 +1,66 @@
+'''
+--trace: API calls are recorded through botocore's event hooks, and
+without --trace, spans record nothing, but each still takes details.
+'''
+
+import io
+
+import botocore.session
+from botocore.stub import Stubber
+
+from vpc_network_diagram.trace import NullTracer, Tracer
+
+def get_stubbed_client(tracer):
+    client = botocore.session.get_session().create_client("ec2",region_name="us-west-2",
+        aws_access_key_id="trace",aws_secret_access_key="trace")
+    # Hooked before the Stubber's, which answers the calls
+    tracer.instrument_client(client)
+    return client,Stubber(client)
+
+def get_subnets_page(subnet_ids,next_token=None,retries=0):
+    page = {"Subnets": [{"SubnetId": subnet_id} for subnet_id in subnet_ids],
+        "ResponseMetadata": {"RetryAttempts": retries}}
+    if next_token is not None:
+        page["NextToken"] = next_token
+    return page
+
+def test_api_call_summary():
+    tracer = Tracer()
+    client,stubber = get_stubbed_client(tracer)
+    # A listing of 3 pages, one of them retried twice, and one of 1 page
+    stubber.add_response("describe_subnets",get_subnets_page(["subnet-0"],"token-1"))
+    stubber.add_response("describe_subnets",get_subnets_page(["subnet-1"],"token-2",retries=2))
+    stubber.add_response("describe_subnets",get_subnets_page(["subnet-2"]))
+    stubber.add_response("describe_subnets",get_subnets_page(["subnet-3"]))
+    stubber.add_response("describe_vpcs",{"Vpcs": []})
+    stubber.add_client_error("describe_route_tables","UnauthorizedOperation")
+
+    with stubber:
+        paginator = client.get_paginator("describe_subnets")
+        assert sum(len(page["Subnets"]) for page in paginator.paginate()) == 3
+        assert sum(len(page["Subnets"]) for page in paginator.paginate(SubnetIds=["subnet-3"])) == 1
+        client.describe_vpcs()
+        try:
+            client.describe_route_tables()
+        except client.exceptions.ClientError:
+            pass
+
+    summary = {operation["Operation"]: operation for operation in tracer.get_api_call_summary()}
+    assert {name: (o["Calls"],o["Pages"],o["Retries"],o["Errors"]) for name,o in summary.items()} == {
+        "DescribeSubnets": (2,4,2,0),
+        "DescribeVpcs": (1,1,0,0),
+        "DescribeRouteTables": (1,1,0,1),
+    }
+
+    stream = io.StringIO()
+    tracer.write_summary(stream)
+    assert any(line.split()[:5] == ["DescribeSubnets","2","4","2","0"] for line in stream.getvalue().splitlines())
+
+def test_null_spans_not_shared():
+    tracer = NullTracer()
+    with tracer.span("build_graph") as span:
+        span["collapse_level"] = 3
+    with tracer.span("build_graph") as span:
+        assert span == {}
+    with NullTracer().span("render") as span:
+        assert span == {}
@@ -0,0 +1,51 @@
+'''
+Create a network diagram of a VPC using the graphviz dot utility.
+
+The package can be used from other Python code (e.g. Lambda functions) as
+well as from the command line:
+
+    import boto3
+    from vpc_network_diagram import build_vpc_graph, render
+    graph = build_vpc_graph(boto3.session.Session(), "vpc-0123456789abcdef0")
+    render(graph, ["vpc.svg", "vpc.png"])
+
+Importing the package is cheap. boto3 is only imported when data is
+collected from AWS.
+'''
+
+from .dot import render
+from .errors import VpcDiagramError
+
+def build_vpc_graph(session_or_snapshot,vpc,show_internet=False,max_workers=None,show_security=False):
+    '''
+    Build the graph of a VPC and return it.
+
+    session_or_snapshot is one of:
+    - a boto3 Session, to collect the VPC's data from AWS
+    - the path of a snapshot file saved with --save-snapshot
+    - a snapshot dict as returned by collect_vpc_snapshot(), or a dict of
+      {vpc_id: snapshot} as returned by load_snapshots()
+
+    vpc is a VPC ID, Name, or "default" for the default VPC. show_security
+    adds the network ACLs and security groups (collected from AWS, or taken
+    from the snapshot if it has them).
+    '''
+    from .graph import build_graph
+    from .snapshot import load_snapshots, select_snapshots
+
+    if isinstance(session_or_snapshot,str):
+        snapshots = load_snapshots(session_or_snapshot)
+    elif isinstance(session_or_snapshot,dict):
+        if "Vpc" in session_or_snapshot:
+            snapshots = {session_or_snapshot["Vpc"]["VpcId"]: session_or_snapshot}
+        else:
+            snapshots = session_or_snapshot
+    else:
+        from .collect import DEFAULT_MAX_WORKERS, create_ec2_client, get_vpc_description, collect_vpc_snapshot
+        ec2_client = create_ec2_client(session_or_snapshot)
+        vpc_description = get_vpc_description(ec2_client,vpc)
+        snapshots = {vpc_description["VpcId"]: collect_vpc_snapshot(ec2_client,vpc_description,
+            max_workers=max_workers or DEFAULT_MAX_WORKERS,include_security=show_security)}
+
+    snapshot = list(select_snapshots(snapshots,vpc_ids_or_names=[vpc]).values())[0]
+    return build_graph(snapshot,show_internet=show_internet,show_security=show_security)
@@ -0,0 +1,7 @@
+'''
+Allow running the package with "python -m vpc_network_diagram".
+'''
+
+from .cli import main
+
+main()
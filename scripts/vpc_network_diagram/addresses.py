@@ -0,0 +1,224 @@
+'''
+Address planning across VPCs: which CIDR blocks overlap between VPCs (and
+the VPCs they are peered with), and how full each subnet is.
+
+CIDR blocks either nest or are disjoint, so once they are sorted by first
+address, widest first, the blocks overlapping a block are exactly those left
+open on a stack of nested blocks. One sort and one sweep finds every overlap,
+in O(n log n) plus the overlaps found, instead of comparing every pair.
+'''
+
+import ipaddress
+import json
+
+from .model import build_vpc_model
+from .nodes import SubnetNode
+
+# AWS reserves five addresses in every subnet's IPv4 CIDR block: the first
+# four and the last.
+RESERVED_ADDRESS_COUNT = 5
+
+# Fill colors of subnets by utilization: (utilization below, color), the
+# last for the rest. From ColorBrewer's YlOrRd.
+UTILIZATION_HEAT_COLORS = [(0.5,"#ffffb2"),(0.75,"#fecc5c"),(0.9,"#fd8d3c"),(None,"#f03b20")]
+
+# Overlaps ------------------------------------------------------------
+
+def get_address_blocks(vpc_models):
+    '''
+    The CIDR blocks of the VPCs, of the peered VPCs that aren't among them,
+    and of the subnets, as a tuple of two lists (VPC blocks, subnet blocks)
+    of (network, resource ID, VPC ID, owner ID). Blocks that aren't CIDR
+    blocks, e.g. the placeholders in a Terraform plan, are left out.
+    '''
+    vpc_blocks = []
+    subnet_blocks = []
+
+    vpc_ids = set(vpc_model.vpc.vpc_id for vpc_model in vpc_models)
+    for vpc_model in vpc_models:
+        vpc = vpc_model.vpc
+        for cidr_block in vpc.cidr_blocks:
+            if not isinstance(cidr_block,str):
+                vpc_blocks.append((cidr_block,vpc.vpc_id,vpc.vpc_id,vpc.owner_id))
+
+        for subnet in vpc_model.subnets:
+            for cidr_block in subnet.cidr_blocks:
+                if not isinstance(cidr_block,str):
+                    subnet_blocks.append((cidr_block,subnet.subnet_id,vpc.vpc_id,vpc.owner_id))
+
+        for peer_vpc in vpc_model.peer_vpcs:
+            if peer_vpc.vpc_id in vpc_ids:
+                continue
+            vpc_ids.add(peer_vpc.vpc_id)
+            for cidr_block in peer_vpc.cidr_blocks:
+                if not isinstance(cidr_block,str):
+                    vpc_blocks.append((cidr_block,peer_vpc.vpc_id,peer_vpc.vpc_id,peer_vpc.owner_id))
+
+    return vpc_blocks,subnet_blocks
+
+def find_overlaps(blocks):
+    '''
+    The overlapping blocks of different VPCs, from a list of (network,
+    resource ID, VPC ID, owner ID), as a list of (outer block, inner block)
+    where the inner block is within (or the same as) the outer one.
+    '''
+    overlaps = []
+    for version in [4,6]:
+        # Sorted by first address, then widest first, on one int per block
+        # rather than a tuple, which is kinder to the garbage collector.
+        version_blocks = [block for block in blocks if block[0].version == version]
+        sort_keys = []
+        for block in version_blocks:
+            network = block[0]
+            sort_keys.append((int(network.network_address) << 8) | network.prefixlen)
+        order = sorted(range(len(version_blocks)),key=sort_keys.__getitem__)
+
+        # The open networks, each containing the ones after it, so there
+        # are at most 33 (or 129) of them, with their blocks by VPC ID.
+        open_networks = []
+        for i in order:
+            block = version_blocks[i]
+            network = block[0]
+            start = sort_keys[i] >> 8
+            end = start + (1 << (network.max_prefixlen - network.prefixlen)) - 1
+            while len(open_networks) > 0 and open_networks[-1][1] < start:
+                open_networks.pop()
+
+            vpc_id = block[2]
+            for _,_,vpc_blocks in open_networks:
+                for outer_vpc_id,outer_blocks in vpc_blocks.items():
+                    if outer_vpc_id != vpc_id:
+                        overlaps.extend((outer_block,block) for outer_block in outer_blocks)
+
+            if len(open_networks) > 0 and open_networks[-1][0] == start and open_networks[-1][1] == end:
+                open_networks[-1][2].setdefault(vpc_id,[]).append(block)
+            else:
+                open_networks.append((start,end,{vpc_id: [block]}))
+    return overlaps
+
+# Utilization ---------------------------------------------------------
+
+def get_utilization(subnets):
+    '''
+    The usable (i.e. not reserved) and free IPv4 addresses of the subnets,
+    summed over those whose free address count is known, as a tuple of
+    (usable, available), or None if it isn't known for any of them.
+    '''
+    usable = 0
+    available = 0
+    known = False
+    for subnet in subnets:
+        if subnet.available_ip_address_count is None:
+            continue
+        for cidr_block in subnet.cidr_blocks:
+            if isinstance(cidr_block,ipaddress.IPv4Network):
+                usable += max(0,(1 << (32 - cidr_block.prefixlen)) - RESERVED_ADDRESS_COUNT)
+                available += subnet.available_ip_address_count
+                known = True
+                break
+    if not known:
+        return None
+    return usable,available
+
+def get_heat_color(utilization):
+    for below,color in UTILIZATION_HEAT_COLORS:
+        if below is None or utilization < below:
+            return color
+
+def add_utilization_heat(node,subnets):
+    '''
+    Fill the node (of a subnet, or of several) with the color of the
+    subnets' utilization, and add it to the label. A style the node already
+    has, e.g. dashed for a subnet that --diff found removed, is kept.
+    '''
+    utilization = get_utilization(subnets)
+    if utilization is None:
+        return
+    usable,available = utilization
+    fraction = (usable - available) / usable if usable > 0 else 0.0
+    node.attributes["label"] += f"\n{fraction:.0%} used ({available} free)"
+    styles = [style for style in node.attributes.get("style","").split(",") if style != ""]
+    if "filled" not in styles:
+        styles.append("filled")
+    node.attributes["style"] = ",".join(styles)
+    node.attributes["fillcolor"] = get_heat_color(fraction)
+
+def add_graph_utilization_heat(graph):
+    '''
+    Color each subnet in the graph by its utilization. Subnets collapsed by
+    summarize_graph() afterwards are colored by their combined utilization.
+    '''
+    for node in graph.get_nodes():
+        if isinstance(node,SubnetNode):
+            add_utilization_heat(node,[node.get_subnet()])
+
+# Report --------------------------------------------------------------
+
+def analyze_addresses(vpc_models):
+    '''
+    Return a list of result dicts: the overlaps between the VPCs' CIDR
+    blocks, then between their subnets' CIDR blocks, then the utilization of
+    each subnet whose free address count is known, fullest first.
+    '''
+    results = []
+
+    vpc_blocks,subnet_blocks = get_address_blocks(vpc_models)
+    for kind,blocks in [("vpc",vpc_blocks),("subnet",subnet_blocks)]:
+        for outer_block,inner_block in find_overlaps(blocks):
+            results.append({"Type": "Overlap", "Kind": kind,
+                "Blocks": [get_block_result(outer_block),get_block_result(inner_block)]})
+
+    utilizations = []
+    for vpc_model in vpc_models:
+        for subnet in vpc_model.subnets:
+            utilization = get_utilization([subnet])
+            if utilization is None:
+                continue
+            usable,available = utilization
+            utilizations.append({"Type": "Utilization", "VpcId": vpc_model.vpc.vpc_id,
+                "SubnetId": subnet.subnet_id, "Name": subnet.name,
+                "Usable": usable, "Available": available, "Used": usable - available,
+                "Utilization": round((usable - available) / usable,4) if usable > 0 else 0.0})
+    utilizations.sort(key=lambda result: -result["Utilization"])
+    results.extend(utilizations)
+
+    return results
+
+def get_block_result(block):
+    network,resource_id,vpc_id,owner_id = block
+    return {"Cidr": str(network), "ResourceId": resource_id, "VpcId": vpc_id, "OwnerId": owner_id}
+
+def run_address_report(snapshots,output_format,stream):
+    '''
+    Analyze the snapshots' CIDR blocks and subnets and write one result per
+    line to the stream, as text or JSON lines. Returns the number of
+    overlaps found.
+    '''
+    results = analyze_addresses([build_vpc_model(snapshot) for snapshot in snapshots.values()])
+
+    for result in results:
+        if output_format == "json":
+            stream.write(json.dumps(result) + "\n")
+        else:
+            stream.write(format_address_result(result) + "\n")
+
+    return sum(1 for result in results if result["Type"] == "Overlap")
+
+def format_address_result(result):
+    '''
+    One line of text describing an overlap or a subnet's utilization.
+    '''
+    if result["Type"] == "Overlap":
+        outer_block,inner_block = result["Blocks"]
+        return f"{result['Kind']} overlap: {format_block_result(outer_block)} contains {format_block_result(inner_block)}"
+
+    return f"{result['SubnetId']} ({result['VpcId']}): {result['Utilization']:.1%} used, " \
+        f"{result['Used']} of {result['Usable']} addresses"
+
+def format_block_result(block):
+    text = f"{block['Cidr']} {block['ResourceId']}"
+    if block["ResourceId"] != block["VpcId"]:
+        text += f" in {block['VpcId']}"
+    if block["OwnerId"]:
+        text += f" ({block['OwnerId']})"
+    return text
@@ -0,0 +1,521 @@
+'''
+Benchmark the collection, graph building and rendering of VPCs of a chosen
+size, without AWS: a synthetic region is generated and served by a fake EC2
+client, and the same functions that main() uses are timed phase by phase.
+
+    python -m vpc_network_diagram.bench --scale 10:100 --scale 5000:50000 --output bench.json
+
+Each --scale is SUBNETS:ROUTES (optionally :VPCS, for batch mode). The
+results are written as JSON so that runs can be compared over time.
+'''
+
+import datetime
+import gzip
+import io
+import ipaddress
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from .addresses import analyze_addresses
+from .collect import (
+    DEFAULT_MAX_WORKERS, get_vpc_description, get_vpc_descriptions, collect_vpc_snapshot, collect_region_snapshots,
+    get_network_interface_counts,
+)
+from .dot import write_dot, render
+from .export import EXPORT_FORMATS
+from .flowlogs import DEFAULT_FLOW_LOG_FIELDS, aggregate_flow_logs, add_traffic_overlay
+from .graph import build_graph
+from .hierarchy import split_graph
+from .interfaces import get_interface_density, add_interface_overlay
+from .layout import LayoutCache, get_topology_hash
+from .model import build_vpc_model
+from .nodes import SubnetNode, RouteTableNode, RouteTableIndex
+from .snapshot import save_snapshots, load_snapshots
+from .summarize import summarize_graph
+
+DEFAULT_SCALES = ["10:100","500:5000","5000:50000"]
+DEFAULT_FLOW_LOG_RECORDS = 100000
+DEFAULT_INTERFACES_PER_SUBNET = 4
+
+# Format of the JSON results, bumped when its layout changes.
+BENCH_RESULTS_VERSION = 1
+
+# Items per page of the fake client's paginated responses.
+PAGE_SIZE = 1000
+
+# Synthetic Region ----------------------------------------------------
+
+def generate_region(subnet_count,route_count,vpc_count=1,az_count=3,interfaces_per_subnet=DEFAULT_INTERFACES_PER_SUBNET):
+    '''
+    Generate the describe responses for a region with vpc_count VPCs, each
+    with subnet_count subnets and route_count routes spread over one route
+    table per 8 subnets. The routes go to NAT gateways, a transit gateway,
+    peering connections, network interfaces and a gateway endpoint's prefix
+    list, with some blackholes. The peered VPCs' CIDR blocks overlap those
+    of the other VPCs. Each route table's subnets share a network ACL and
+    there is a security group per 4 subnets, both drawing on a few rule sets
+    so that many are identical, with the groups referring to each other.
+    Each subnet has interfaces_per_subnet network interfaces of mixed kinds
+    as well. Returns a dict of {operation name: items}.
+    '''
+    region = {key: [] for key in [
+        "describe_vpcs","describe_subnets","describe_route_tables","describe_internet_gateways",
+        "describe_egress_only_internet_gateways","describe_nat_gateways","describe_vpc_peering_connections",
+        "describe_vpn_gateways","describe_vpn_connections","describe_transit_gateways",
+        "describe_transit_gateway_attachments","describe_carrier_gateways","describe_vpc_endpoints",
+        "describe_network_interfaces","describe_local_gateways","describe_managed_prefix_lists",
+        "get_managed_prefix_list_entries","describe_network_acls","describe_security_groups"]}
+
+    region["describe_transit_gateways"].append({"TransitGatewayId": "tgw-0", "OwnerId": "111111111111", "State": "available"})
+    region["describe_managed_prefix_lists"].append({"PrefixListId": "pl-0", "PrefixListName": "com.amazonaws.us-west-2.s3"})
+    region["get_managed_prefix_list_entries"].extend({"Cidr": f"52.218.{i}.0/24"} for i in range(16))
+    region["describe_vpn_gateways"].append({"VpnGatewayId": "vgw-0", "VpcAttachments": [{"VpcId": "vpc-0", "State": "attached"}]})
+    region["describe_vpn_connections"].append({"VpnConnectionId": "vpn-0", "VpnGatewayId": "vgw-0"})
+
+    destinations = ipaddress.ip_network("172.16.0.0/12").subnets(new_prefix=28)
+    for v in range(vpc_count):
+        vpc_id = f"vpc-{v}"
+        vpc_cidr = ipaddress.ip_network(f"10.{v}.0.0/16") if subnet_count <= 4096 else ipaddress.ip_network(f"{v % 100 + 1}.0.0.0/8")
+        region["describe_vpcs"].append({"VpcId": vpc_id, "OwnerId": "111111111111", "CidrBlock": str(vpc_cidr),
+            "CidrBlockAssociationSet": [{"CidrBlock": str(vpc_cidr), "CidrBlockState": {"State": "associated"}}],
+            "Ipv6CidrBlockAssociationSet": [{"Ipv6CidrBlock": f"2600:1f14:{v:x}::/56", "Ipv6CidrBlockState": {"State": "associated"}}],
+            "Tags": [{"Key": "Name", "Value": f"bench-{v}"}]})
+        region["describe_internet_gateways"].append({"InternetGatewayId": f"igw-{v}", "Attachments": [{"VpcId": vpc_id, "State": "available"}]})
+        region["describe_egress_only_internet_gateways"].append({"EgressOnlyInternetGatewayId": f"eigw-{v}", "Attachments": [{"VpcId": vpc_id, "State": "attached"}]})
+        region["describe_vpc_endpoints"].append({"VpcEndpointId": f"vpce-{v}", "VpcId": vpc_id,
+            "ServiceName": "com.amazonaws.us-west-2.s3", "VpcEndpointType": "Gateway"})
+        region["describe_transit_gateway_attachments"].append({"TransitGatewayAttachmentId": f"tgw-attach-{v}",
+            "TransitGatewayId": "tgw-0", "ResourceType": "vpc", "ResourceId": vpc_id, "ResourceOwnerId": "111111111111", "State": "available"})
+
+        subnet_ids = []
+        subnet_cidrs = vpc_cidr.subnets(new_prefix=28)
+        for s in range(subnet_count):
+            subnet_id = f"subnet-{v}-{s}"
+            subnet_ids.append(subnet_id)
+            region["describe_subnets"].append({"SubnetId": subnet_id, "VpcId": vpc_id, "CidrBlock": str(next(subnet_cidrs)),
+                "AvailabilityZone": f"us-west-2{'abcdef'[s % az_count]}", "AvailableIpAddressCount": s % 12,
+                "Ipv6CidrBlockAssociationSet": [{"Ipv6CidrBlock": f"2600:1f14:{v:x}:{s % 256:x}::/64", "Ipv6CidrBlockState": {"State": "associated"}}],
+                "Tags": [{"Key": "Name", "Value": f"bench-{v}-subnet-{s}"}]})
+
+        targets = []
+        for a in range(az_count):
+            region["describe_nat_gateways"].append({"NatGatewayId": f"nat-{v}-{a}", "VpcId": vpc_id, "SubnetId": subnet_ids[a % len(subnet_ids)]})
+            targets.append({"NatGatewayId": f"nat-{v}-{a}"})
+        for p in range(10):
+            region["describe_vpc_peering_connections"].append({"VpcPeeringConnectionId": f"pcx-{v}-{p}", "Status": {"Code": "active"},
+                "RequesterVpcInfo": {"VpcId": vpc_id, "OwnerId": "111111111111", "Region": "us-west-2"},
+                "AccepterVpcInfo": {"VpcId": f"vpc-peer-{v}-{p}", "OwnerId": "222222222222", "Region": "us-east-1",
+                    "CidrBlockSet": [{"CidrBlock": f"10.{(v + p + 1) % 256}.0.0/16"}]}})
+            targets.append({"VpcPeeringConnectionId": f"pcx-{v}-{p}"})
+        for e in range(20):
+            region["describe_network_interfaces"].append({"NetworkInterfaceId": f"eni-{v}-{e}", "VpcId": vpc_id,
+                "SubnetId": subnet_ids[e % len(subnet_ids)], "InterfaceType": "interface", "Attachment": {"InstanceId": f"i-{v}-{e}"}})
+            targets.append({"NetworkInterfaceId": f"eni-{v}-{e}", "InstanceId": f"i-{v}-{e}"})
+        targets.append({"TransitGatewayId": "tgw-0"})
+        for i in range(subnet_count * interfaces_per_subnet):
+            region["describe_network_interfaces"].append(generate_network_interface(vpc_id,f"eni-{v}-w{i}",i,
+                subnet_ids[i // interfaces_per_subnet]))
+
+        route_table_count = max(1,subnet_count // 8)
+        for t in range(route_table_count):
+            associations = [{"Main": True, "RouteTableId": f"rtb-{v}-{t}"}] if t == 0 else []
+            associations += [{"Main": False, "SubnetId": subnet_id, "RouteTableId": f"rtb-{v}-{t}"}
+                for subnet_id in subnet_ids[t::route_table_count]]
+            routes = [
+                {"DestinationCidrBlock": str(vpc_cidr), "GatewayId": "local", "Origin": "CreateRouteTable", "State": "active"},
+                {"DestinationCidrBlock": "0.0.0.0/0", "GatewayId": f"igw-{v}", "Origin": "CreateRoute", "State": "active"},
+                {"DestinationIpv6CidrBlock": "::/0", "EgressOnlyInternetGatewayId": f"eigw-{v}", "Origin": "CreateRoute", "State": "active"},
+                {"DestinationPrefixListId": "pl-0", "GatewayId": f"vpce-{v}", "Origin": "CreateRoute", "State": "active"},
+            ]
+            region["describe_route_tables"].append({"RouteTableId": f"rtb-{v}-{t}", "VpcId": vpc_id,
+                "Associations": associations, "Routes": routes, "Tags": [{"Key": "Name", "Value": f"bench-{v}-rt-{t}"}]})
+
+        # The remaining routes, spread evenly over the route tables
+        route_tables = region["describe_route_tables"][-route_table_count:]
+        for r in range(max(0,route_count - 4 * route_table_count)):
+            route = {"DestinationCidrBlock": str(next(destinations)), "Origin": "CreateRoute",
+                "State": "blackhole" if r % 50 == 49 else "active"}
+            route.update(targets[r % len(targets)])
+            route_tables[r % route_table_count]["Routes"].append(route)
+
+        # A default network ACL, unused, then one per route table
+        region["describe_network_acls"].append(generate_network_acl(vpc_id,f"acl-{v}-default",0,[]))
+        for t in range(route_table_count):
+            region["describe_network_acls"].append(generate_network_acl(vpc_id,f"acl-{v}-{t}",t,
+                subnet_ids[t::route_table_count]))
+
+        group_count = max(1,subnet_count // 4)
+        for g in range(group_count):
+            region["describe_security_groups"].append(generate_security_group(vpc_id,f"sg-{v}-{g}",g,
+                f"sg-{v}-{(g + 1) % min(8,group_count)}"))
+
+    return region
+
+def generate_network_acl(vpc_id,network_acl_id,index,subnet_ids):
+    '''
+    A network ACL with one of 4 rule sets of 20 rules each way, picked by
+    index, associated with the subnets.
+    '''
+    entries = []
+    for egress in [False,True]:
+        for r in range(20):
+            entries.append({"RuleNumber": 100 + 10 * r, "Protocol": "6", "RuleAction": "deny" if r % 7 == 6 else "allow",
+                "Egress": egress, "CidrBlock": f"10.{index % 4}.{r}.0/24", "PortRange": {"From": 1024 + r, "To": 1024 + r}})
+        entries.append({"RuleNumber": 32767, "Protocol": "-1", "RuleAction": "deny", "Egress": egress, "CidrBlock": "0.0.0.0/0"})
+    return {"NetworkAclId": network_acl_id, "VpcId": vpc_id, "IsDefault": index == 0 and not subnet_ids,
+        "Entries": entries, "Associations": [{"NetworkAclId": network_acl_id, "SubnetId": subnet_id} for subnet_id in subnet_ids]}
+
+def generate_security_group(vpc_id,group_id,index,peer_group_id):
+    '''
+    A security group with one of 8 rule sets, picked by index, that lets in
+    HTTPS from the peer group as well.
+    '''
+    permissions = [{"IpProtocol": "tcp", "FromPort": 8000 + p, "ToPort": 8000 + p,
+        "IpRanges": [{"CidrIp": f"10.{index % 8}.{p}.0/24"}]} for p in range(8)]
+    permissions.append({"IpProtocol": "tcp", "FromPort": 443, "ToPort": 443,
+        "UserIdGroupPairs": [{"GroupId": peer_group_id}]})
+    return {"GroupId": group_id, "GroupName": f"bench-{group_id}", "VpcId": vpc_id, "IpPermissions": permissions,
+        "IpPermissionsEgress": [{"IpProtocol": "-1", "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}]}
+
+def generate_network_interface(vpc_id,interface_id,index,subnet_id):
+    '''
+    A network interface of one of the kinds of workload, picked by index:
+    mostly instances, some with secondary addresses or a delegated prefix,
+    then Lambda functions, load balancers, NAT gateways and endpoints.
+    '''
+    description = {"NetworkInterfaceId": interface_id, "VpcId": vpc_id, "SubnetId": subnet_id,
+        "InterfaceType": "interface", "Description": "", "RequesterManaged": False,
+        "PrivateIpAddresses": [{"PrivateIpAddress": f"10.0.{index % 256}.{index % 250 + 4}", "Primary": True}]}
+    kind = index % 10
+    if kind < 5:
+        description["Attachment"] = {"InstanceId": f"i-{interface_id}"}
+        description["PrivateIpAddresses"] *= 1 + index % 3
+        if kind == 4:
+            description["Ipv4Prefixes"] = [{"Ipv4Prefix": "10.0.0.0/28"}]
+    elif kind < 7:
+        description.update({"InterfaceType": "lambda", "Description": f"AWS Lambda VPC ENI-bench-{index}", "RequesterManaged": True})
+    elif kind == 7:
+        description.update({"Description": f"ELB app/bench-{index}/0", "RequesterId": "amazon-elb", "RequesterManaged": True})
+    elif kind == 8:
+        description.update({"InterfaceType": "nat_gateway", "Description": f"Interface for NAT Gateway nat-{index}", "RequesterManaged": True})
+    else:
+        description.update({"InterfaceType": "vpc_endpoint", "Description": f"VPC Endpoint Interface vpce-{index}", "RequesterManaged": True})
+    return description
+
+def generate_flow_log(filename,region,record_count):
+    '''
+    Write a gzip'd text flow log of record_count records to or from the
+    region's subnets: with the Internet (a pool of addresses, so that pairs
+    repeat as they do in real logs), with route destinations, and between
+    subnets. One in 20 is rejected and one in 100 has no data.
+    '''
+    subnet_addresses = [str(ipaddress.ip_network(d["CidrBlock"])[4]) for d in region["describe_subnets"][:4096]]
+    internet_addresses = [f"52.{i % 256}.{i // 256}.{i % 7 + 1}" for i in range(5000)]
+    route_addresses = [f"172.16.{i % 256}.{i % 13 + 1}" for i in range(1000)]
+    with gzip.open(filename,"wt") as f:
+        f.write(" ".join(DEFAULT_FLOW_LOG_FIELDS) + "\n")
+        for r in range(record_count):
+            if r % 100 == 99:
+                f.write("2 111111111111 eni-0 - - - - - - - 1 2 - NODATA\n")
+                continue
+            source = subnet_addresses[r % len(subnet_addresses)]
+            addresses = [internet_addresses,route_addresses,subnet_addresses][r % 3]
+            destination = addresses[(r * 7919) % len(addresses)]
+            if r % 2 == 1:
+                source,destination = destination,source
+            action = "REJECT" if r % 20 == 19 else "ACCEPT"
+            f.write(f"2 111111111111 eni-0 {source} {destination} 443 {1024 + r % 60000} 6 {r % 40 + 1} {(r % 40 + 1) * 800} 1 2 {action} OK\n")
+
+# Fake EC2 Client -----------------------------------------------------
+
+# How the fake client applies each EC2 filter: a function giving the values
+# of a description to match against.
+FILTER_VALUES = {
+    "vpc-id": lambda d: [d.get("VpcId")],
+    "attachment.vpc-id": lambda d: [a.get("VpcId") for a in d.get("Attachments",d.get("VpcAttachments",[]))],
+    "accepter-vpc-info.vpc-id": lambda d: [d.get("AccepterVpcInfo",{}).get("VpcId")],
+    "requester-vpc-info.vpc-id": lambda d: [d.get("RequesterVpcInfo",{}).get("VpcId")],
+    "tag:Name": lambda d: [t["Value"] for t in d.get("Tags",[]) if t["Key"] == "Name"],
+    "isDefault": lambda d: [str(d.get("IsDefault",False)).lower()],
+    "network-interface-id": lambda d: [d.get("NetworkInterfaceId")],
+    "local-gateway-id": lambda d: [d.get("LocalGatewayId")],
+    "prefix-list-id": lambda d: [d.get("PrefixListId")],
+    "vpn-gateway-id": lambda d: [d.get("VpnGatewayId")],
+    "transit-gateway-id": lambda d: [d.get("TransitGatewayId")],
+    "resource-type": lambda d: [d.get("ResourceType")],
+    "resource-id": lambda d: [d.get("ResourceId")],
+}
+
+class FakeEc2Client:
+    '''
+    Serves a generated region's describe responses, applying the filters
+    collect.py uses and paginating like the EC2 API. latency, in seconds, is
+    added to every call (every page) to stand in for the network.
+    '''
+    def __init__(self,region,latency=0.0):
+        import botocore.session
+
+        self._region = region
+        self._latency = latency
+        self._model_client = botocore.session.get_session().create_client(
+            "ec2",region_name="us-west-2",aws_access_key_id="bench",aws_secret_access_key="bench")
+        self.meta = self._model_client.meta
+        self._lock = threading.Lock()
+        self.call_count = 0
+
+        # The key of the items in each operation's response
+        self._result_keys = {}
+        for operation_name in region:
+            output_shape = self._model_client.meta.service_model.operation_model(
+                self._model_client.meta.method_to_api_mapping[operation_name]).output_shape
+            self._result_keys[operation_name] = [key for key in output_shape.members if key != "NextToken"][0]
+
+    def can_paginate(self,operation_name):
+        return self._model_client.can_paginate(operation_name)
+
+    def get_paginator(self,operation_name):
+        return _FakePaginator(self,operation_name)
+
+    def __getattr__(self,name):
+        if name not in self.__dict__.get("_region",{}):
+            raise AttributeError(name)
+        return lambda **kwargs: self._call(name,kwargs)[0]
+
+    def _call(self,operation_name,kwargs,next_token=None):
+        '''
+        One page of a response, and the NextToken for the next page (None
+        for the last one).
+        '''
+        with self._lock:
+            self.call_count += 1
+        if self._latency > 0:
+            time.sleep(self._latency)
+
+        items = self._region[operation_name]
+        for filter in kwargs.get("Filters",[]):
+            if filter["Name"] in FILTER_VALUES:
+                values = set(filter["Values"])
+                items = [d for d in items if values.intersection(FILTER_VALUES[filter["Name"]](d))]
+        if "TransitGatewayIds" in kwargs:
+            items = [d for d in items if d["TransitGatewayId"] in kwargs["TransitGatewayIds"]]
+
+        start = next_token or 0
+        page = items[start:start + PAGE_SIZE]
+        next_token = start + PAGE_SIZE if start + PAGE_SIZE < len(items) else None
+        return {self._result_keys[operation_name]: page},next_token
+
+class _FakePaginator:
+    def __init__(self,client,operation_name):
+        self._client = client
+        self._operation_name = operation_name
+
+    def paginate(self,**kwargs):
+        # Tokens are item offsets, as strings; like EC2's, each page but the
+        # last has the NextToken to resume from with a StartingToken.
+        next_token = kwargs.get("PaginationConfig",{}).get("StartingToken")
+        next_token = int(next_token) if next_token is not None else None
+        while True:
+            page,next_token = self._client._call(self._operation_name,kwargs,next_token)
+            if next_token is not None:
+                page["NextToken"] = str(next_token)
+            yield page
+            if next_token is None:
+                return
+
+# Benchmark -----------------------------------------------------------
+
+class PhaseTimer:
+    '''
+    Times the phases of a run, and optionally their peak memory use.
+    '''
+    def __init__(self,trace_memory=False):
+        self._trace_memory = trace_memory
+        self.phases = {}
+
+    def run(self,name,function,*args):
+        if self._trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function(*args)
+        phase = {"Seconds": round(time.perf_counter() - start,6)}
+        if self._trace_memory:
+            phase["PeakBytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.phases[name] = phase
+        return result
+
+def run_benchmark(subnet_count,route_count,vpc_count=1,latency=0.0,max_workers=DEFAULT_MAX_WORKERS,
+        render_files=False,trace_memory=False,flow_log_records=DEFAULT_FLOW_LOG_RECORDS,
+        interfaces_per_subnet=DEFAULT_INTERFACES_PER_SUBNET):
+    '''
+    Run the phases once at one scale and return a dict of the timings.
+    '''
+    timer = PhaseTimer(trace_memory)
+    region = timer.run("generate",generate_region,subnet_count,route_count,vpc_count,3,interfaces_per_subnet)
+    ec2_client = FakeEc2Client(region,latency)
+
+    def collect():
+        if vpc_count == 1:
+            vpc_description = get_vpc_description(ec2_client,"bench-0")
+            return {vpc_description["VpcId"]: collect_vpc_snapshot(ec2_client,vpc_description,max_workers,True,True)}
+        return collect_region_snapshots(ec2_client,get_vpc_descriptions(ec2_client,all_vpcs=True),max_workers,True,True)
+    snapshots = timer.run("collect",collect)
+    timer.phases["collect"]["ApiCalls"] = ec2_client.call_count
+
+    # The region-wide network interface sweep on its own
+    call_count = ec2_client.call_count
+    timer.run("interface_counts",get_network_interface_counts,ec2_client)
+    timer.phases["interface_counts"]["ApiCalls"] = ec2_client.call_count - call_count
+    snapshot = snapshots["vpc-0"]
+
+    # The model, node construction (labels included) and the route table
+    # index, which build_graph() also does, timed on their own.
+    vpc_model = timer.run("model",build_vpc_model,snapshot)
+
+    def construct_nodes():
+        return [SubnetNode(s) for s in vpc_model.subnets],[RouteTableNode(r) for r in vpc_model.route_tables]
+    _,route_table_nodes = timer.run("nodes",construct_nodes)
+
+    def index_routes():
+        route_table_index = RouteTableIndex(route_table_nodes,vpc_model.prefix_list_names)
+        for target_id in route_table_index.get_target_ids():
+            route_table_index.get_routes_for_target(target_id)
+    timer.run("edges",index_routes)
+
+    graph = timer.run("graph",build_graph,snapshot)
+    timer.run("write_dot",lambda: write_dot(graph,io.StringIO()))
+    for extension,write_export in EXPORT_FORMATS.items():
+        timer.run(f"export_{extension[1:]}",write_export,graph,io.StringIO())
+    summary_graph,collapse_level = timer.run("summarize",summarize_graph,graph)
+    timer.run("topology_hash",get_topology_hash,graph)
+    (overview_graph,_),details = timer.run("hierarchy",split_graph,graph,["bench.svg"])
+
+    # The network ACL and security group overlay, on top of the graph
+    security_graph = timer.run("security",build_graph,snapshot,False,True)
+
+    # The network interface density overlay, on a graph of its own
+    density_graph = build_graph(snapshot)
+    timer.run("interfaces",lambda: add_interface_overlay(density_graph,get_interface_density(snapshots.values())))
+
+    # Overlaps and utilization across all of the VPCs
+    vpc_models = [build_vpc_model(s) for s in snapshots.values()]
+    address_results = timer.run("addresses",analyze_addresses,vpc_models)
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_filename = f"{directory}/snapshot.json.gz"
+        timer.run("save_snapshot",save_snapshots,snapshot_filename,snapshots)
+        timer.run("load_snapshot",load_snapshots,snapshot_filename)
+        if render_files:
+            timer.run("render",render,graph,[f"{directory}/bench.svg"])
+            timer.run("render_summary",render,summary_graph,[f"{directory}/bench-summary.svg"])
+            timer.run("render_overview",render,overview_graph,[f"{directory}/bench-overview.svg"])
+
+            # A first render through the layout cache lays the graph out and
+            # caches the layout, a second one only draws it.
+            layout_cache = LayoutCache(f"{directory}/layouts",100 * 1024 * 1024)
+            timer.run("render_layout",render,graph,[f"{directory}/bench-layout.svg"],"dot",layout_cache)
+            timer.run("render_cached_layout",render,graph,[f"{directory}/bench-layout.svg"],"dot",layout_cache)
+
+        # Flow log traffic across all of the VPCs, read by one worker
+        traffic = {}
+        if flow_log_records > 0:
+            flow_log_filename = f"{directory}/flow-log.log.gz"
+            generate_flow_log(flow_log_filename,region,flow_log_records)
+            traffic = timer.run("flow_logs",aggregate_flow_logs,[flow_log_filename],vpc_models,1)
+            timer.run("traffic",add_traffic_overlay,graph,traffic)
+
+    return {
+        "Scale": {"Subnets": subnet_count, "Routes": route_count, "Vpcs": vpc_count},
+        "Size": {"Nodes": len(graph.get_nodes()), "Edges": len(graph.get_edges()),
+            "RouteTables": len(snapshot["RouteTables"]), "SummaryNodes": len(summary_graph.get_nodes()),
+            "SummaryEdges": len(summary_graph.get_edges()), "CollapseLevel": collapse_level,
+            "OverviewNodes": len(overview_graph.get_nodes()), "Details": len(details),
+            "SecurityNodes": len(security_graph.get_nodes()) - len(graph.get_nodes()),
+            "Overlaps": sum(1 for result in address_results if result["Type"] == "Overlap"),
+            "TrafficEdges": len(traffic),
+            "Interfaces": sum(c["InterfaceCount"] for s in snapshots.values() for c in s["NetworkInterfaceCounts"])},
+        "Phases": timer.phases,
+    }
+
+def main(argv=None):
+    '''
+    Main entry point
+    '''
+    parser = ArgumentParser(
+        description = "Benchmark vpc-network-diagram on synthetic VPCs, offline",
+    )
+    parser.add_argument("--scale",action='append',dest="scales",metavar="SUBNETS:ROUTES[:VPCS]",
+        help=f"Size of VPC to benchmark (may be repeated, default: {' '.join(DEFAULT_SCALES)})")
+    parser.add_argument("--latency-ms",type=float,default=0.0,
+        help="Simulated latency of each API call in milliseconds (default: 0)")
+    parser.add_argument("--max-workers",type=int,default=DEFAULT_MAX_WORKERS,
+        help=f"Maximum number of concurrent API calls (default: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument("--repeat",type=int,default=1,
+        help="Run each scale this many times and keep the fastest time of each phase (default: 1)")
+    parser.add_argument("--render",action='store_true',
+        help="Also render SVGs with graphviz dot, and with neato through the layout cache")
+    parser.add_argument("--flow-log-records",type=int,default=DEFAULT_FLOW_LOG_RECORDS,
+        help=f"Records in the synthetic flow log, 0 for none (default: {DEFAULT_FLOW_LOG_RECORDS})")
+    parser.add_argument("--interfaces-per-subnet",type=int,default=DEFAULT_INTERFACES_PER_SUBNET,
+        help=f"Network interfaces of workloads in each subnet (default: {DEFAULT_INTERFACES_PER_SUBNET})")
+    parser.add_argument("--memory",action='store_true',
+        help="Also record the peak memory of each phase (slows the run down)")
+    parser.add_argument("--output",metavar="FILE",
+        help="Write the JSON results to a file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.render and (shutil.which("dot") is None or shutil.which("neato") is None):
+        sys.stderr.write("ERROR - --render needs the graphviz dot and neato utilities in the path\n")
+        sys.exit(1)
+
+    scales = []
+    for scale in args.scales or DEFAULT_SCALES:
+        try:
+            numbers = [int(n) for n in scale.split(":")]
+        except ValueError:
+            numbers = []
+        if len(numbers) not in [2,3] or min(numbers) < 1:
+            sys.stderr.write(f"ERROR - expected SUBNETS:ROUTES[:VPCS]: {scale}\n")
+            sys.exit(1)
+        scales.append(numbers)
+
+    results = []
+    for scale in scales:
+        best = None
+        for _ in range(max(1,args.repeat)):
+            result = run_benchmark(*scale,latency=args.latency_ms / 1000,max_workers=args.max_workers,
+                render_files=args.render,trace_memory=args.memory,flow_log_records=args.flow_log_records,
+                interfaces_per_subnet=args.interfaces_per_subnet)
+            if best is None:
+                best = result
+            else:
+                for name,phase in result["Phases"].items():
+                    best["Phases"][name]["Seconds"] = min(best["Phases"][name]["Seconds"],phase["Seconds"])
+        results.append(best)
+        sys.stderr.write(" ".join([f"{':'.join(str(n) for n in scale)}"] +
+            [f"{name}={phase['Seconds']:.3f}s" for name,phase in best["Phases"].items()]) + "\n")
+
+    document = {
+        "Version": BENCH_RESULTS_VERSION,
+        "Created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "Python": platform.python_version(),
+        "Platform": platform.platform(),
+        "Parameters": {"LatencyMs": args.latency_ms, "MaxWorkers": args.max_workers, "Repeat": args.repeat},
+        "Results": results,
+    }
+    text = json.dumps(document,indent=2) + "\n"
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        with open(args.output,"w",encoding="utf-8") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
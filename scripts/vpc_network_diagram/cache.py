@@ -0,0 +1,327 @@
+'''
+On-disk cache of AWS API responses, shared by concurrent runs.
+'''
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; the response cache then works without
+    # inter-process locking.
+    fcntl = None
+
+from .errors import VpcDiagramError
+
+# Response cache defaults. Only the operations listed are cached, and their
+# entries expire after the TTL (in seconds) given. Things that rarely change
+# are kept longer than routes and gateways.
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME",os.path.join(os.path.expanduser("~"),".cache")),
+    "vpc-network-diagram")
+DEFAULT_CACHE_MAX_MB = 100
+DEFAULT_CACHE_TTL = 300
+CACHE_TTLS = {
+    "get_caller_identity": 86400,
+    "describe_vpcs": 3600,
+    "describe_subnets": 900,
+    "describe_transit_gateways": 3600,
+    "describe_vpn_gateways": 900,
+    "describe_vpn_connections": 900,
+    "describe_route_tables": DEFAULT_CACHE_TTL,
+    "describe_internet_gateways": DEFAULT_CACHE_TTL,
+    "describe_egress_only_internet_gateways": DEFAULT_CACHE_TTL,
+    "describe_nat_gateways": DEFAULT_CACHE_TTL,
+    "describe_vpc_peering_connections": DEFAULT_CACHE_TTL,
+    "describe_carrier_gateways": DEFAULT_CACHE_TTL,
+    "describe_local_gateways": DEFAULT_CACHE_TTL,
+    "describe_vpc_endpoints": DEFAULT_CACHE_TTL,
+    "describe_transit_gateway_attachments": DEFAULT_CACHE_TTL,
+    "describe_managed_prefix_lists": DEFAULT_CACHE_TTL,
+    "get_managed_prefix_list_entries": DEFAULT_CACHE_TTL,
+    "describe_network_acls": DEFAULT_CACHE_TTL,
+    "describe_security_groups": DEFAULT_CACHE_TTL,
+    "describe_network_interfaces": DEFAULT_CACHE_TTL,
+}
+
+class ResponseCache:
+    '''
+    On-disk cache of AWS API responses, one gzip'd JSON file per entry. It is
+    safe to share between concurrent processes: entries are written to a
+    temporary file and renamed in to place, and an flock on a lock file
+    serializes writes and eviction against reads. Once the total size goes
+    over max_bytes the least recently used entries are evicted.
+
+    The total size is kept as a running count of the entries written, so
+    the cache directory is only scanned on the first write and on eviction.
+    Entries written by other processes sharing the cache are only counted
+    once a scan finds them.
+    '''
+    def __init__(self,cache_dir,max_bytes):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._total_bytes = None
+        os.makedirs(cache_dir,exist_ok=True)
+
+    def get(self,key,ttl):
+        '''
+        Return the cached value for the key, or None if there isn't one
+        younger than ttl seconds (of any age if ttl is None).
+        '''
+        path = self._get_path(key)
+        with self._lock(shared=True):
+            try:
+                with gzip.open(path,"rt",encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError,ValueError):
+                return None
+            if ttl is not None and time.time() - entry["Created"] > ttl:
+                return None
+            try:
+                # The modification time doubles as the LRU timestamp.
+                os.utime(path)
+            except OSError:
+                pass
+        return entry["Value"]
+
+    def touch(self,keys):
+        '''
+        Mark the entries for the keys as the most recently used, so they
+        are the last to be evicted. Return False if any of them is missing.
+        '''
+        with self._lock(shared=True):
+            for key in keys:
+                try:
+                    os.utime(self._get_path(key))
+                except OSError:
+                    return False
+        return True
+
+    def put(self,key,value):
+        '''
+        Store a JSON serializable value under the key.
+        '''
+        path = self._get_path(key)
+        fd,temp_path = tempfile.mkstemp(dir=self._cache_dir,prefix=".tmp-")
+        try:
+            with os.fdopen(fd,"wb") as raw, gzip.open(raw,"wt",encoding="utf-8") as f:
+                json.dump({"Created": time.time(), "Value": value},f,
+                    separators=(",",":"),default=lambda o: o.isoformat())
+            size = os.path.getsize(temp_path)
+            with self._lock(shared=False):
+                try:
+                    size -= os.path.getsize(path)
+                except OSError:
+                    pass
+                os.replace(temp_path,path)
+                self._add_bytes(size)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _add_bytes(self,size):
+        '''
+        Add the size of a new entry to the running total, and evict once it
+        goes over max_bytes. Must be called with the exclusive lock held.
+        '''
+        if self._total_bytes is None:
+            self._total_bytes = self._evict()
+            return
+        self._total_bytes += size
+        if self._total_bytes > self._max_bytes:
+            self._total_bytes = self._evict()
+
+    def _evict(self):
+        '''
+        Remove the least recently used entries until the cache fits in
+        max_bytes, and return the total size of the entries left. Must be
+        called with the exclusive lock held.
+        '''
+        entries = []
+        total_bytes = 0
+        with os.scandir(self._cache_dir) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith(".json.gz"):
+                    continue
+                stat = dir_entry.stat()
+                entries.append((stat.st_mtime,stat.st_size,dir_entry.path))
+                total_bytes += stat.st_size
+
+        entries.sort()
+        for _,size,path in entries:
+            if total_bytes <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_bytes -= size
+        return total_bytes
+
+    def _get_path(self,key):
+        digest = hashlib.sha256(json.dumps(key,sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir,f"{digest}.json.gz")
+
+    def _lock(self,shared):
+        return _FileLock(os.path.join(self._cache_dir,".lock"),shared)
+
+class _FileLock:
+    '''
+    Context manager holding an flock on a file. Each use opens the file
+    anew, so it also serializes threads within one process.
+    '''
+    def __init__(self,path,shared):
+        self._path = path
+        self._shared = shared
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self._path,"a")
+            fcntl.flock(self._file,fcntl.LOCK_SH if self._shared else fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self,*exc_info):
+        if self._file is not None:
+            fcntl.flock(self._file,fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+class CachedClient:
+    '''
+    Wraps a boto3 client so that the calls, and the pages of the paginators,
+    of the operations in CACHE_TTLS are served from a ResponseCache. Entries
+    are keyed by account, region, operation and parameters (e.g. filters).
+    Everything else is passed through to the wrapped client.
+    '''
+    def __init__(self,client,response_cache,account_id,refresh=False):
+        self._client = client
+        self._response_cache = response_cache
+        self._account_id = account_id
+        self._refresh = refresh
+
+    @classmethod
+    def for_session(cls,session,client,response_cache,refresh=False):
+        '''
+        Wrap a client created from the session. The account ID for the cache
+        keys is itself cached, keyed by a hash of the session's access key,
+        so a cached run needs no STS call either.
+        '''
+        credentials = session.get_credentials()
+        access_key = credentials.access_key if credentials is not None else None
+        key = ["sts","get_caller_identity",
+            hashlib.sha256(str(access_key).encode("utf-8")).hexdigest()]
+
+        account_id = None
+        if not refresh:
+            account_id = response_cache.get(key,CACHE_TTLS["get_caller_identity"])
+        if account_id is None:
+            account_id = session.client("sts").get_caller_identity()["Account"]
+            response_cache.put(key,account_id)
+
+        return cls(client,response_cache,account_id,refresh)
+
+    def get_paginator(self,operation_name):
+        paginator = self._client.get_paginator(operation_name)
+        if operation_name not in CACHE_TTLS:
+            return paginator
+        return _CachedPaginator(self,paginator,operation_name)
+
+    def __getattr__(self,name):
+        attribute = getattr(self._client,name)
+        if name not in CACHE_TTLS or not callable(attribute):
+            return attribute
+
+        def cached_call(**kwargs):
+            return self._cached(name,kwargs,lambda: attribute(**kwargs))
+        return cached_call
+
+    def _cached(self,operation_name,kwargs,call):
+        '''
+        Return the cached result of the call if there is one within the
+        operation's TTL, otherwise make the call and cache the result.
+        '''
+        key = self._get_key(operation_name,kwargs)
+        value = self._get_cached(operation_name,key)
+        if value is None:
+            value = call()
+            self._response_cache.put(key,value)
+        return value
+
+    def _get_key(self,operation_name,kwargs,paginated=False,listing_id=None,page_index=0):
+        '''
+        The cache key of a call, or of a page of its paginator: the first
+        page of the listing, or a later page of the listing with the ID
+        given.
+        '''
+        key = [self._account_id,self._client.meta.region_name,operation_name,paginated,kwargs]
+        if page_index:
+            key += [listing_id,page_index]
+        return key
+
+    def _get_cached(self,operation_name,key):
+        if self._refresh:
+            return None
+        return self._response_cache.get(key,CACHE_TTLS[operation_name])
+
+class _CachedPaginator:
+    '''
+    Paginator counterpart of CachedClient: each page of a listing is cached
+    as an entry of its own, so a listing is never held in memory whole. The
+    first page's entry is written last, once the listing is complete, with
+    the listing's ID and page count. The later pages are keyed by the
+    listing ID and page index, and are only served along with the first
+    page: the listing expires as a unit with the first page, and if any of
+    its later pages has been evicted, the whole listing is fetched again.
+    '''
+    def __init__(self,cached_client,paginator,operation_name):
+        self._cached_client = cached_client
+        self._paginator = paginator
+        self._operation_name = operation_name
+
+    def paginate(self,**kwargs):
+        cached_client = self._cached_client
+        response_cache = cached_client._response_cache
+        first_entry = cached_client._get_cached(self._operation_name,
+            cached_client._get_key(self._operation_name,kwargs,True))
+        if first_entry is not None:
+            page_keys = [cached_client._get_key(self._operation_name,kwargs,True,first_entry["ListingId"],page_index)
+                for page_index in range(1,first_entry["PageCount"])]
+            if response_cache.touch(page_keys):
+                yield first_entry["Page"]
+                for key in page_keys:
+                    page = response_cache.get(key,None)
+                    if page is None:
+                        raise VpcDiagramError(f"{self._operation_name} response evicted from the cache while it was read, try again")
+                    yield page
+                return
+
+        yield from self._paginate(kwargs)
+
+    def _paginate(self,kwargs):
+        '''
+        Call AWS for the whole listing, caching the pages as they come.
+        '''
+        cached_client = self._cached_client
+        listing_id = uuid.uuid4().hex
+        first_page = None
+        page_count = 0
+        for page in self._paginator.paginate(**kwargs):
+            if page_count == 0:
+                first_page = page
+            else:
+                cached_client._response_cache.put(
+                    cached_client._get_key(self._operation_name,kwargs,True,listing_id,page_count),page)
+            page_count += 1
+            yield page
+
+        if page_count:
+            cached_client._response_cache.put(cached_client._get_key(self._operation_name,kwargs,True),
+                {"Page": first_page, "ListingId": listing_id, "PageCount": page_count})
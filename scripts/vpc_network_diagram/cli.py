@@ -0,0 +1,568 @@
+'''
+Command line interface. Only the standard library is imported up front, so
+--help and argument errors are fast; boto3 is imported once it is actually
+needed.
+'''
+
+import sys
+import os.path
+from argparse import ArgumentParser
+
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_MB, ResponseCache, CachedClient
+from .collect import (
+    DEFAULT_MAX_WORKERS, SECURITY_SNAPSHOT_KEYS, INTERFACE_COUNTS_SNAPSHOT_KEY, create_session, create_ec2_client,
+    get_vpc_description, get_vpc_descriptions,
+    collect_vpc_snapshot, collect_region_snapshots,
+)
+from .dot import RENDER_FORMATS
+from .errors import VpcDiagramError
+from .export import EXPORT_FORMATS, export_graph
+from .snapshot import save_snapshots, load_snapshots, select_snapshots
+from .summarize import DEFAULT_NODE_BUDGET, COLLAPSE_LEVELS
+
+SUPPORTED_FILE_TYPES=list(RENDER_FORMATS) + list(EXPORT_FORMATS)
+DEFAULT_FILE_TYPE = ".png"
+
+# Name of the stitched diagram written to the output directory in batch mode
+# with --follow.
+STITCHED_FILE_STEM = "vpc-network"
+
+def main(argv=None):
+    '''
+    Main entry point
+    '''
+    parser = ArgumentParser(
+        description = "Generate a network diagram of an AWS VPC",
+        epilog = f"Supported file types: {' '.join(SUPPORTED_FILE_TYPES)}"
+    )
+    parser.add_argument("--profile",
+        help="AWS Profile")
+    parser.add_argument("--region",
+        help="AWS Region")
+    parser.add_argument("--endpoint-url",
+        help="URL of the EC2 endpoint to use in place of AWS's, e.g. a local stub")
+    parser.add_argument("--internet",action='store_true',
+        help="Show the Internet (Warning: can make the graph hard to follow)")
+    parser.add_argument("--security",action='store_true',
+        help="Also show the network ACLs of the subnets and the security groups, with the references between them")
+    parser.add_argument("--interfaces",action='store_true',
+        help="Also show on each subnet its network interfaces by kind (instance, Lambda, ELB, NAT, endpoint) "
+            "and the IPv4 addresses they use")
+    parser.add_argument("--max-workers",type=int,default=DEFAULT_MAX_WORKERS,
+        help=f"Maximum number of concurrent AWS API calls (default: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument("--file-type",nargs='+',dest="file_types",choices=SUPPORTED_FILE_TYPES,metavar="TYPE",
+        help="Type(s) of the output files, all rendered by one run of dot, except for the exports "
+            f"({' '.join(EXPORT_FORMATS)}) which are written without graphviz "
+            f"(default: the filename's extension, or {DEFAULT_FILE_TYPE})")
+    parser.add_argument("--trace",metavar="FILE",
+        help="Record the time taken by each phase and each AWS API call to a JSON trace file "
+            "(Chrome trace-event format), and print a summary")
+    parser.add_argument("--render-workers",type=int,default=os.cpu_count(),
+        help="Maximum number of diagrams rendered at once in batch mode (default: number of CPUs)")
+    batch_group = parser.add_argument_group("batch mode",
+        "Diagram several VPCs in the region with one set of API calls. "
+        "One file per VPC is written to the output directory, named by VPC ID.")
+    batch_group.add_argument("--all",action='store_true',
+        help="Diagram every VPC in the region")
+    batch_group.add_argument("--vpcs",nargs='+',metavar="VPC",
+        help="Diagram the listed VPCs (IDs or Names)")
+    batch_group.add_argument("--tag",action='append',dest="tags",metavar="KEY[=VALUE]",
+        help="Diagram the VPCs having this tag (may be repeated, all must match)")
+    batch_group.add_argument("--output-dir",default=".",
+        help="Directory for the output files (default: current directory)")
+    cache_group = parser.add_argument_group("response cache",
+        "Keep AWS API responses in a local cache shared by all runs on this "
+        "machine, so repeat runs within the TTL make no API calls.")
+    cache_group.add_argument("--cache",action='store_true',
+        help="Use the response cache")
+    cache_group.add_argument("--cache-dir",default=DEFAULT_CACHE_DIR,
+        help=f"Response cache directory (default: {DEFAULT_CACHE_DIR})")
+    cache_group.add_argument("--cache-max-mb",type=int,default=DEFAULT_CACHE_MAX_MB,
+        help=f"Size limit of the response cache in MB, least recently used responses are evicted first (default: {DEFAULT_CACHE_MAX_MB})")
+    cache_group.add_argument("--refresh",action='store_true',
+        help="Ignore cached responses, calling AWS and updating the cache")
+    layout_group = parser.add_argument_group("layout cache",
+        "Keep the layouts graphviz computes in the cache directory, so that a diagram "
+        "whose topology hasn't changed is drawn without laying it out again, and its "
+        "nodes stay in place.")
+    layout_group.add_argument("--layout-cache",action='store_true',
+        help="Use the layout cache (needs graphviz neato as well as dot)")
+    snapshot_group = parser.add_argument_group("snapshots",
+        "Record the collected AWS data to a file, and render from it later "
+        "without making any AWS API calls.")
+    snapshot_group.add_argument("--save-snapshot",metavar="FILE",
+        help="Save the collected data to a snapshot file (gzip'd JSON)")
+    snapshot_group.add_argument("--from-snapshot",metavar="FILE",
+        help="Use the data in a snapshot file instead of calling AWS")
+    snapshot_group.add_argument("--from-terraform",metavar="FILE",
+        help="Use the VPCs in a Terraform state or plan, as output by 'terraform show -json', instead of calling AWS")
+    follow_group = parser.add_argument_group("fan-out",
+        "Follow active peering connections and transit gateway attachments to "
+        "the VPCs at the other end, in any region, and draw them all in one "
+        "diagram. VPCs in other accounts need --account-profile or --assume-role.")
+    follow_group.add_argument("--follow",type=int,default=0,metavar="DEPTH",
+        help="Follow links up to DEPTH hops from the selected VPCs (default: 0, don't follow)")
+    follow_group.add_argument("--account-profile",action='append',dest="account_profiles",metavar="ACCOUNT=PROFILE",
+        help="AWS Profile (e.g. an assume-role profile) for the VPCs in an account (may be repeated)")
+    follow_group.add_argument("--assume-role",metavar="ROLE",
+        help="Name of a role to assume in the other accounts that have no --account-profile")
+    diff_group = parser.add_argument_group("change detection",
+        "Compare the VPCs with an earlier snapshot file. The diagrams highlight "
+        "the added (green), removed (red, dashed) and modified (orange) "
+        "resources and connections.")
+    diff_group.add_argument("--diff",metavar="OLD_SNAPSHOT",
+        help="Show the changes since the snapshot file")
+    diff_group.add_argument("--diff-report",metavar="FILE",
+        help="Also write the changes, resource by resource, to a JSON file ('-' for stdout)")
+    query_group = parser.add_argument_group("route queries",
+        "Instead of a diagram, show the route that traffic from a subnet to a "
+        "destination address or CIDR block takes: the route table used, the "
+        "longest matching route and its target.")
+    query_group.add_argument("--query",nargs=2,action='append',dest="queries",metavar=("SUBNET","DESTINATION"),
+        help="Look up the route from a subnet (ID or Name) to a destination (may be repeated)")
+    query_group.add_argument("--query-file",metavar="FILE",
+        help="Look up the routes for the subnet/destination pairs in a file, one pair per line")
+    query_group.add_argument("--query-format",choices=["text","json"],default="text",
+        help="Format of the lookup results: text, or JSON lines (default: text)")
+    address_group = parser.add_argument_group("address planning",
+        "Instead of a diagram, report the CIDR blocks that overlap between "
+        "the VPCs (and the VPCs they are peered with), and their subnets, and "
+        "how full each subnet is. Select many VPCs with --all, --vpcs, --tag "
+        "or --follow, or a snapshot file.")
+    address_group.add_argument("--address-report",action='store_true',
+        help="Report overlapping CIDR blocks and subnet utilization instead of drawing diagrams")
+    address_group.add_argument("--address-report-format",choices=["text","json"],default="text",
+        help="Format of the report: text, or JSON lines (default: text)")
+    address_group.add_argument("--utilization",action='store_true',
+        help="In the diagrams, color the subnets by the share of their IPv4 addresses in use")
+    traffic_group = parser.add_argument_group("traffic",
+        "Draw the traffic in VPC Flow Log files (text as delivered to S3, "
+        "optionally gzip'd, or Parquet) on the edges from the subnets to their "
+        "route tables and on to the route targets, as widths and labels.")
+    traffic_group.add_argument("--flow-logs",nargs='+',metavar="FILE",
+        help="Flow log files to read")
+    traffic_group.add_argument("--flow-log-workers",type=int,default=os.cpu_count(),
+        help="Maximum number of flow log files (or Parquet row groups) read at once (default: number of CPUs)")
+    summary_group = parser.add_argument_group("summarization",
+        "For very large VPCs: group the subnets in to boxes by availability "
+        "zone and route table, and collapse subnets with the same route table "
+        "and CIDR pattern (and at the higher levels, route tables with the "
+        "same routes) in to one node with a count, to keep the diagram within "
+        "a node budget.")
+    summary_group.add_argument("--summarize",action='store_true',
+        help="Summarize the diagrams, choosing the collapse level from the node budget")
+    summary_group.add_argument("--node-budget",type=int,metavar="N",
+        help=f"Collapse until the diagram has at most N nodes, if possible (default: {DEFAULT_NODE_BUDGET}; implies --summarize)")
+    summary_group.add_argument("--collapse-level",type=int,choices=COLLAPSE_LEVELS,
+        help=f"Use this collapse level, from 0 (clusters only) to {COLLAPSE_LEVELS[-1]} (most collapsed), whatever the node count (implies --summarize)")
+    hierarchy_group = parser.add_argument_group("hierarchical output",
+        "For very large VPCs: draw an overview of the VPC, its route tables and "
+        "gateways, with a box per availability zone that links (in SVG and PDF "
+        "output) to a detail diagram of the zone's subnets. The overview is "
+        "rendered first, then the details in parallel, named <file>-<zone>.")
+    hierarchy_group.add_argument("--hierarchical",action='store_true',
+        help="Draw an overview and a detail diagram per availability zone")
+    parser.add_argument("vpcid", nargs='?',
+        help="AWS VPC ID, Name, or 'default' for the default VPC")
+    parser.add_argument("filename", nargs='?',
+        help=f"Name of the output file (default: vpcid{DEFAULT_FILE_TYPE})")
+    args = parser.parse_args(argv)
+
+    batch_mode = args.all or args.vpcs is not None or args.tags is not None
+
+    if batch_mode and args.vpcid is not None:
+        sys.stderr.write("ERROR - vpcid and filename cannot be combined with --all, --vpcs or --tag\n")
+        sys.exit(1)
+
+    if not batch_mode and args.vpcid is None:
+        parser.print_usage(sys.stderr)
+        sys.stderr.write("ERROR - a vpcid, --all, --vpcs or --tag is required\n")
+        sys.exit(1)
+
+    if args.max_workers < 1:
+        sys.stderr.write("ERROR - --max-workers must be at least 1\n")
+        sys.exit(1)
+
+    if args.render_workers is None or args.render_workers < 1:
+        args.render_workers = 1
+
+    if args.follow < 0:
+        sys.stderr.write("ERROR - --follow must not be negative\n")
+        sys.exit(1)
+
+    args.account_profiles = parse_account_profiles(args.account_profiles or [])
+
+    if args.diff_report is not None and args.diff is None:
+        sys.stderr.write("ERROR - --diff-report requires --diff\n")
+        sys.exit(1)
+
+    if args.node_budget is not None and args.node_budget < 1:
+        sys.stderr.write("ERROR - --node-budget must be at least 1\n")
+        sys.exit(1)
+    args.summarize = args.summarize or args.node_budget is not None or args.collapse_level is not None
+    if args.node_budget is None:
+        args.node_budget = DEFAULT_NODE_BUDGET
+
+    query_mode = args.queries is not None or args.query_file is not None
+
+    if args.hierarchical and args.summarize:
+        sys.stderr.write("ERROR - --hierarchical and --summarize cannot be combined\n")
+        sys.exit(1)
+
+    if query_mode and args.address_report:
+        sys.stderr.write("ERROR - --query and --address-report cannot be combined\n")
+        sys.exit(1)
+
+    if query_mode or args.address_report:
+        # No diagrams, so no output files
+        args.file_types = []
+    elif args.file_types is None:
+        if args.filename is not None:
+            args.file_types = [os.path.splitext(args.filename)[1]]
+        else:
+            args.file_types = [DEFAULT_FILE_TYPE]
+
+    if not batch_mode:
+        if args.filename is None:
+            stem = args.vpcid
+        else:
+            stem = os.path.splitext(args.filename)[0]
+        args.filenames = [f"{stem}{file_type}" for file_type in args.file_types]
+        for filename in args.filenames:
+            check_output_filename(filename)
+        if args.hierarchical:
+            check_detail_filenames(args.filenames)
+    elif not os.path.isdir(args.output_dir):
+        sys.stderr.write(f"ERROR - output directory does not exist: {args.output_dir}\n")
+        sys.exit(1)
+    elif args.follow > 0:
+        args.filenames = [os.path.join(args.output_dir,f"{STITCHED_FILE_STEM}{file_type}") for file_type in args.file_types]
+        for filename in args.filenames:
+            check_output_filename(filename)
+        if args.hierarchical:
+            check_detail_filenames(args.filenames)
+
+    if args.from_snapshot is not None and args.from_terraform is not None:
+        sys.stderr.write("ERROR - --from-snapshot and --from-terraform cannot be combined\n")
+        sys.exit(1)
+
+    for filename in args.flow_logs or []:
+        if not os.path.isfile(filename):
+            sys.stderr.write(f"ERROR - flow log file not found: {filename}\n")
+            sys.exit(1)
+
+    if args.save_snapshot is not None and os.path.exists(args.save_snapshot):
+        sys.stderr.write(f"ERROR - file already exists: {args.save_snapshot}\n")
+        sys.exit(1)
+
+    if args.trace is not None:
+        from .trace import Tracer
+        args.tracer = Tracer()
+    else:
+        from .trace import NullTracer
+        args.tracer = NullTracer()
+    tracer = args.tracer
+
+    try:
+        with tracer.span("collect") as span:
+            snapshots,filenames = collect_snapshots(args,batch_mode)
+            span["vpcs"] = len(snapshots)
+
+        if args.security:
+            for vpc_id,snapshot in snapshots.items():
+                if any(key not in snapshot for key in SECURITY_SNAPSHOT_KEYS):
+                    sys.stderr.write(f"WARNING - no network ACLs or security groups were recorded for {vpc_id}\n")
+
+        if args.interfaces:
+            for vpc_id,snapshot in snapshots.items():
+                if INTERFACE_COUNTS_SNAPSHOT_KEY not in snapshot:
+                    sys.stderr.write(f"WARNING - no network interface counts were recorded for {vpc_id}\n")
+
+        if args.save_snapshot is not None:
+            with tracer.span("save_snapshot"):
+                save_snapshots(args.save_snapshot,snapshots)
+            print(f"Snapshot created: {args.save_snapshot}")
+
+        if args.diff is not None:
+            from .diff import diff_snapshots, format_report_summary
+
+            with tracer.span("diff"):
+                old_snapshots = load_snapshots(args.diff)
+                reports = {}
+                for vpc_id,snapshot in snapshots.items():
+                    reports[vpc_id] = diff_snapshots(old_snapshots.get(vpc_id),snapshot)
+                    print(format_report_summary(reports[vpc_id]))
+                if args.diff_report is not None:
+                    write_diff_report(args.diff_report,list(reports.values()))
+
+        if query_mode:
+            from .query import run_queries, read_query_file
+
+            with tracer.span("query") as span:
+                queries = list(args.queries or [])
+                if args.query_file is not None:
+                    queries.extend(read_query_file(args.query_file))
+                run_queries(snapshots,queries,args.query_format,sys.stdout)
+                span["queries"] = len(queries)
+            return
+
+        if args.address_report:
+            from .addresses import run_address_report
+
+            with tracer.span("address_report") as span:
+                span["overlaps"] = run_address_report(snapshots,args.address_report_format,sys.stdout)
+            return
+
+        traffic = None
+        if args.flow_logs is not None:
+            from .flowlogs import aggregate_flow_logs
+            from .model import build_vpc_model
+
+            with tracer.span("flow_logs",files=len(args.flow_logs)) as span:
+                traffic = aggregate_flow_logs(args.flow_logs,[build_vpc_model(snapshot) for snapshot in snapshots.values()],
+                    max_workers=args.flow_log_workers)
+                span["edges"] = len(traffic)
+
+        interface_density = None
+        if args.interfaces:
+            from .interfaces import get_interface_density
+
+            interface_density = get_interface_density(snapshots.values())
+
+        # Create the Graphs and Save to file --------------------------
+
+        from .dot import render_many
+
+        layout_cache = None
+        if args.layout_cache:
+            from .layout import LayoutCache
+
+            layout_cache = LayoutCache(os.path.join(args.cache_dir,"layouts"),args.cache_max_mb * 1024 * 1024)
+
+        # The VPCs drawn in each diagram, and its files
+        if args.follow > 0:
+            diagrams = [(list(snapshots),args.filenames)]
+        else:
+            diagrams = [([vpc_id],filenames[vpc_id]) for vpc_id in snapshots]
+
+        # The graphs to draw, in stages: with --hierarchical the overviews are
+        # drawn first, then the details.
+        stages = [[],[]]
+        for vpc_ids,diagram_filenames in diagrams:
+            # The graphs keep nothing of the snapshots, so each snapshot is
+            # dropped once it has been drawn.
+            diagram_snapshots = {vpc_id: snapshots.pop(vpc_id) for vpc_id in vpc_ids}
+            with tracer.span("build_graph",vpcs=" ".join(vpc_ids)) as span:
+                graph = build_diagram_graph(args,diagram_snapshots)
+                if args.diff is not None:
+                    from .diff import build_diff_graph, get_modified_ids
+
+                    old_graph = build_diagram_graph(args,{vpc_id: old_snapshots.pop(vpc_id)
+                        for vpc_id in vpc_ids if vpc_id in old_snapshots})
+                    modified_ids = set()
+                    for vpc_id in vpc_ids:
+                        modified_ids.update(get_modified_ids(reports[vpc_id]))
+                    graph = build_diff_graph(old_graph,graph,modified_ids)
+                if args.utilization:
+                    from .addresses import add_graph_utilization_heat
+
+                    add_graph_utilization_heat(graph)
+                if args.summarize:
+                    from .summarize import summarize_graph
+
+                    graph,span["collapse_level"] = summarize_graph(graph,
+                        node_budget=args.node_budget,level=args.collapse_level)
+                if traffic is not None:
+                    from .flowlogs import add_traffic_overlay
+
+                    add_traffic_overlay(graph,traffic)
+                if interface_density is not None:
+                    from .interfaces import add_interface_overlay
+
+                    add_interface_overlay(graph,interface_density)
+                span["nodes"] = len(graph.get_nodes())
+                span["edges"] = len(graph.get_edges())
+
+            if args.hierarchical:
+                from .hierarchy import split_graph
+
+                with tracer.span("split",vpcs=" ".join(vpc_ids)) as span:
+                    overview,details = split_graph(graph,diagram_filenames)
+                    span["details"] = len(details)
+                stages[0].append(overview)
+                stages[1].extend(details)
+            else:
+                stages[0].append((graph,diagram_filenames))
+
+        for stage_name,stage_graphs in zip(["render","render_details"],stages):
+            # Exports are written here, the rest is rendered by graphviz
+            jobs = []
+            for graph,diagram_filenames in stage_graphs:
+                export_filenames = [f for f in diagram_filenames if os.path.splitext(f)[1] in EXPORT_FORMATS]
+                if len(export_filenames) > 0:
+                    with tracer.span("export",files=len(export_filenames)):
+                        export_graph(graph,export_filenames)
+                render_filenames = [f for f in diagram_filenames if f not in export_filenames]
+                if len(render_filenames) > 0:
+                    jobs.append((graph,render_filenames))
+
+            if len(jobs) > 0:
+                with tracer.span(stage_name,diagrams=len(jobs),files=sum(len(f) for _,f in jobs)):
+                    render_many(jobs,max_workers=args.render_workers,layout_cache=layout_cache)
+
+            for _,diagram_filenames in stage_graphs:
+                for filename in diagram_filenames:
+                    print(f"File created: {filename}")
+    except VpcDiagramError as e:
+        sys.stderr.write(f"ERROR - {e}\n")
+        sys.exit(1)
+    finally:
+        if args.trace is not None:
+            tracer.write(args.trace)
+            tracer.write_summary(sys.stderr)
+            sys.stderr.write(f"Trace created: {args.trace}\n")
+
+def build_diagram_graph(args,snapshots):
+    '''
+    The graph of one diagram: the VPC's graph, or with --follow the graph of
+    all of the VPCs stitched together. No snapshots gives an empty graph.
+    '''
+    from .dot import Graph
+    from .graph import build_graph, build_stitched_graph
+
+    if args.follow > 0:
+        return build_stitched_graph(snapshots,show_internet=args.internet,show_security=args.security)
+    if len(snapshots) == 0:
+        return Graph("vpc_network_graph")
+    return build_graph(next(iter(snapshots.values())),show_internet=args.internet,show_security=args.security)
+
+def write_diff_report(filename,reports):
+    '''
+    Write the change reports as JSON to a file, or to stdout for "-".
+    '''
+    import json
+
+    text = json.dumps(reports,indent=2,default=lambda o: o.isoformat()) + "\n"
+    if filename == "-":
+        sys.stdout.write(text)
+        return
+    try:
+        with open(filename,"w",encoding="utf-8") as f:
+            f.write(text)
+    except OSError as e:
+        raise VpcDiagramError(f"cannot write change report {filename}: {e}")
+    print(f"File created: {filename}")
+
+def collect_snapshots(args,batch_mode):
+    '''
+    Collect the snapshots of the selected VPCs, from a snapshot file or from
+    AWS, and work out their output filenames. Returns a tuple of
+    ({vpc_id: snapshot}, {vpc_id: [filename, ...]}).
+    '''
+    if args.from_snapshot is not None or args.from_terraform is not None:
+        if args.from_snapshot is not None:
+            recorded_snapshots = load_snapshots(args.from_snapshot)
+        else:
+            from .terraform import load_terraform_snapshots
+            recorded_snapshots = load_terraform_snapshots(args.from_terraform)
+        if batch_mode:
+            snapshots = select_snapshots(recorded_snapshots,args.all,args.vpcs,args.tags)
+        else:
+            snapshots = select_snapshots(recorded_snapshots,vpc_ids_or_names=[args.vpcid])
+        if args.follow > 0:
+            from .fanout import follow_recorded_links
+            snapshots = follow_recorded_links(recorded_snapshots,snapshots,args.follow)
+        return snapshots,get_output_filenames(args,snapshots.keys())
+
+    if args.cache:
+        response_cache = ResponseCache(args.cache_dir,args.cache_max_mb * 1024 * 1024)
+
+    def create_client(session):
+        ec2_client = args.tracer.instrument_client(create_ec2_client(session,args.endpoint_url))
+        if args.cache:
+            ec2_client = CachedClient.for_session(session,ec2_client,response_cache,refresh=args.refresh)
+        return ec2_client
+
+    session = create_session(args.profile,args.region)
+    ec2_client = create_client(session)
+
+    if batch_mode:
+        vpc_descriptions = get_vpc_descriptions(ec2_client,args.all,args.vpcs,args.tags)
+        filenames = get_output_filenames(args,[d['VpcId'] for d in vpc_descriptions])
+        snapshots = collect_region_snapshots(ec2_client,vpc_descriptions,max_workers=args.max_workers,
+            include_security=args.security,include_interfaces=args.interfaces)
+    else:
+        vpc_description = get_vpc_description(ec2_client,args.vpcid)
+        filenames = get_output_filenames(args,[vpc_description['VpcId']])
+        snapshots = {vpc_description['VpcId']: collect_vpc_snapshot(ec2_client,vpc_description,max_workers=args.max_workers,
+            include_security=args.security,include_interfaces=args.interfaces)}
+
+    if args.follow > 0:
+        from .fanout import ClientPool, follow_links
+
+        client_pool = ClientPool(session,args.account_profiles,args.assume_role,client_factory=create_client)
+        with args.tracer.span("follow",depth=args.follow):
+            snapshots,skipped = follow_links(client_pool,snapshots,args.follow,max_workers=args.max_workers,
+                include_security=args.security,include_interfaces=args.interfaces)
+        for vpc_id,reason in skipped.items():
+            sys.stderr.write(f"WARNING - not following {vpc_id}: {reason}\n")
+
+    return snapshots,filenames
+
+def get_output_filenames(args,vpc_ids):
+    '''
+    Get the output filenames, one per file type, for each VPC ID. In batch
+    mode the files are named by VPC ID in the output directory.
+    '''
+    filenames = {}
+    for vpc_id in vpc_ids:
+        if args.vpcid is not None or args.follow > 0:
+            filenames[vpc_id] = args.filenames
+        else:
+            filenames[vpc_id] = []
+            for file_type in args.file_types:
+                filename = os.path.join(args.output_dir,f"{vpc_id}{file_type}")
+                check_output_filename(filename)
+                filenames[vpc_id].append(filename)
+            if args.hierarchical:
+                check_detail_filenames(filenames[vpc_id])
+    return filenames
+
+def parse_account_profiles(account_profiles):
+    '''
+    Turn a list of "ACCOUNT=PROFILE" strings in to a dict, exiting with an
+    error if one is malformed.
+    '''
+    profiles = {}
+    for account_profile in account_profiles:
+        account_id,_,profile = account_profile.partition("=")
+        if not account_id.isdigit() or profile == "":
+            sys.stderr.write(f"ERROR - expected ACCOUNT=PROFILE: {account_profile}\n")
+            sys.exit(1)
+        profiles[account_id] = profile
+    return profiles
+
+def check_detail_filenames(filenames):
+    '''
+    Exit with an error if a detail diagram of --hierarchical output to the
+    filenames could already exist.
+    '''
+    from .hierarchy import find_detail_files
+
+    for filename in find_detail_files(filenames):
+        sys.stderr.write(f"ERROR - file already exists: {filename}\n")
+        sys.exit(1)
+
+def check_output_filename(filename):
+    '''
+    Exit with an error if the output file already exists or has an
+    unsupported extension.
+    '''
+    if os.path.exists(filename):
+        sys.stderr.write(f"ERROR - file already exists: {filename}\n")
+        sys.exit(1)
+
+    extension = os.path.splitext(filename)[1]
+    if extension not in SUPPORTED_FILE_TYPES:
+        sys.stderr.write(f"ERROR - unsupported file type: {extension}\n")
+        sys.exit(1)
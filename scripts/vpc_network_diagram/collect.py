@@ -0,0 +1,540 @@
+'''
+Collect the descriptions of a VPC's resources from the EC2 API.
+
+boto3 and botocore are imported when first needed, so that importing this
+module (e.g. for the command line's --help) stays cheap.
+'''
+
+import concurrent.futures
+
+from .descriptions import get_aws_name, get_route_table_target_ids, get_interface_kind, get_ipv4_address_count
+from .errors import VpcDiagramError
+
+# Upper bound on the number of describe calls in flight at once.
+DEFAULT_MAX_WORKERS = 8
+
+# EC2 throttles bursts of describe calls. The "adaptive" retry mode backs off
+# exponentially on throttling errors and also rate limits the client.
+EC2_RETRY_CONFIG = {"max_attempts": 10, "mode": "adaptive"}
+
+# EC2 accepts at most this many values in one filter.
+MAX_FILTER_VALUES = 200
+
+# The snapshot keys of the network ACLs and security groups, which are only
+# collected on request.
+SECURITY_SNAPSHOT_KEYS = ["NetworkAcls","SecurityGroups"]
+
+# The snapshot key of the counts of the network interfaces in each subnet,
+# which are only collected on request.
+INTERFACE_COUNTS_SNAPSHOT_KEY = "NetworkInterfaceCounts"
+
+# Network interfaces per page of the inventory, the most the API returns.
+INTERFACE_PAGE_SIZE = 1000
+
+def create_session(profile=None,region=None):
+    '''
+    Create a boto3 session for the AWS profile and region.
+    '''
+    import boto3
+    return boto3.session.Session(profile_name=profile,region_name=region)
+
+def create_ec2_client(session,endpoint_url=None):
+    '''
+    Create an EC2 client with retries suited to bursts of describe calls.
+    endpoint_url overrides the EC2 endpoint, e.g. for a local stub.
+    '''
+    import botocore.config
+    return session.client("ec2",endpoint_url=endpoint_url,config=botocore.config.Config(retries=EC2_RETRY_CONFIG))
+
+def collect_vpc_snapshot(ec2_client,vpc_description,max_workers=DEFAULT_MAX_WORKERS,include_security=False,
+        include_interfaces=False):
+    '''
+    Collect the descriptions of everything in, or attached to, the VPC and
+    return them as a dict keyed by resource type. The independent describe
+    calls are made concurrently, then the calls that depend on their
+    results (VPN connections, the transit gateway details, and the route
+    targets and prefix lists named by the route tables). include_security
+    adds the network ACLs and security groups, and include_interfaces the
+    counts of the network interfaces in each subnet.
+    '''
+    vpc_id = vpc_description["VpcId"]
+    vpc_filters = [{"Name": "vpc-id", "Values": [vpc_id]}]
+    attachment_filters = [{"Name": "attachment.vpc-id", "Values": [vpc_id]}]
+
+    snapshot = {"Vpc": vpc_description}
+
+    optional_calls = {}
+    if include_security:
+        optional_calls = get_security_calls(ec2_client,{"Filters": vpc_filters})
+    if include_interfaces:
+        optional_calls[INTERFACE_COUNTS_SNAPSHOT_KEY] = (get_network_interface_counts,
+            ec2_client,{"Filters": vpc_filters})
+
+    snapshot.update(run_concurrently({
+        "Subnets": (describe_all,
+            ec2_client,"describe_subnets","Subnets",{"Filters": vpc_filters}),
+        "RouteTables": (describe_all,
+            ec2_client,"describe_route_tables","RouteTables",{"Filters": vpc_filters}),
+        "InternetGateways": (describe_all,
+            ec2_client,"describe_internet_gateways","InternetGateways",{"Filters": attachment_filters}),
+        "EgressOnlyInternetGateways": (get_egress_only_internet_gateway_descriptions,
+            ec2_client,vpc_id),
+        "NatGateways": (describe_all,
+            ec2_client,"describe_nat_gateways","NatGateways",{"Filters": vpc_filters}),
+        "AccepterVpcPeeringConnections": (describe_all,
+            ec2_client,"describe_vpc_peering_connections","VpcPeeringConnections",
+            {"Filters": [{"Name": "accepter-vpc-info.vpc-id", "Values": [vpc_id]}]}),
+        "RequesterVpcPeeringConnections": (describe_all,
+            ec2_client,"describe_vpc_peering_connections","VpcPeeringConnections",
+            {"Filters": [{"Name": "requester-vpc-info.vpc-id", "Values": [vpc_id]}]}),
+        "VpnGateways": (describe_all,
+            ec2_client,"describe_vpn_gateways","VpnGateways",{"Filters": attachment_filters}),
+        "TransitGatewayIds": (get_transit_gateway_ids_for_vpc,
+            ec2_client,vpc_id),
+        "CarrierGateways": (describe_all,
+            ec2_client,"describe_carrier_gateways","CarrierGateways",{"Filters": vpc_filters}),
+        "VpcEndpoints": (describe_all,
+            ec2_client,"describe_vpc_endpoints","VpcEndpoints",{"Filters": vpc_filters}),
+        **optional_calls,
+    },max_workers))
+
+    vpn_gateway_ids = [vpn_gateway["VpnGatewayId"] for vpn_gateway in snapshot["VpnGateways"]]
+    transit_gateway_ids = snapshot.pop("TransitGatewayIds")
+
+    snapshot.update(run_concurrently({
+        "VpnConnections": (get_vpn_connection_descriptions,
+            ec2_client,vpn_gateway_ids),
+        "TransitGateways": (get_transit_gateway_descriptions,
+            ec2_client,transit_gateway_ids),
+        "TransitGatewayAttachments": (get_transit_gateway_attachment_descriptions_for_transit_gateways,
+            ec2_client,transit_gateway_ids,vpc_id),
+        **get_route_reference_calls(ec2_client,snapshot["RouteTables"]),
+    },max_workers))
+
+    return snapshot
+
+def collect_region_snapshots(ec2_client,vpc_descriptions,max_workers=DEFAULT_MAX_WORKERS,include_security=False,
+        include_interfaces=False):
+    '''
+    Collect snapshots, in the same form as collect_vpc_snapshot(), for many
+    VPCs at once. Each resource type is described once for the whole region,
+    without a VPC filter, and the results are bucketed by VPC ID in memory,
+    so the number of API calls does not depend on the number of VPCs.
+    include_security adds the network ACLs and security groups, and
+    include_interfaces the counts of the network interfaces in each subnet,
+    from one sweep of the region's interfaces. Returns a dict of
+    {vpc_id: snapshot}.
+    '''
+    optional_calls = {}
+    if include_security:
+        optional_calls = get_security_calls(ec2_client)
+    if include_interfaces:
+        optional_calls[INTERFACE_COUNTS_SNAPSHOT_KEY] = (get_network_interface_counts,ec2_client)
+
+    region = run_concurrently({
+        "Subnets": (describe_all,
+            ec2_client,"describe_subnets","Subnets"),
+        "RouteTables": (describe_all,
+            ec2_client,"describe_route_tables","RouteTables"),
+        "InternetGateways": (describe_all,
+            ec2_client,"describe_internet_gateways","InternetGateways"),
+        "EgressOnlyInternetGateways": (describe_all,
+            ec2_client,"describe_egress_only_internet_gateways","EgressOnlyInternetGateways"),
+        "NatGateways": (describe_all,
+            ec2_client,"describe_nat_gateways","NatGateways"),
+        "VpcPeeringConnections": (describe_all,
+            ec2_client,"describe_vpc_peering_connections","VpcPeeringConnections"),
+        "VpnGateways": (describe_all,
+            ec2_client,"describe_vpn_gateways","VpnGateways"),
+        "VpnConnections": (describe_all,
+            ec2_client,"describe_vpn_connections","VpnConnections"),
+        "TransitGateways": (describe_all,
+            ec2_client,"describe_transit_gateways","TransitGateways"),
+        "TransitGatewayAttachments": (describe_all,
+            ec2_client,"describe_transit_gateway_attachments","TransitGatewayAttachments"),
+        "CarrierGateways": (describe_all,
+            ec2_client,"describe_carrier_gateways","CarrierGateways"),
+        "VpcEndpoints": (describe_all,
+            ec2_client,"describe_vpc_endpoints","VpcEndpoints"),
+        **optional_calls,
+    },max_workers)
+
+    vpc_ids = set(vpc_description["VpcId"] for vpc_description in vpc_descriptions)
+    route_table_descriptions = [d for d in region["RouteTables"] if d["VpcId"] in vpc_ids]
+    region.update(run_concurrently(
+        get_route_reference_calls(ec2_client,route_table_descriptions),max_workers))
+
+    snapshots = {}
+    for vpc_description in vpc_descriptions:
+        snapshots[vpc_description["VpcId"]] = {
+            "Vpc": vpc_description,
+            "Subnets": [],
+            "RouteTables": [],
+            "InternetGateways": [],
+            "EgressOnlyInternetGateways": [],
+            "NatGateways": [],
+            "AccepterVpcPeeringConnections": [],
+            "RequesterVpcPeeringConnections": [],
+            "VpnGateways": [],
+            "VpnConnections": [],
+            "TransitGateways": [],
+            "TransitGatewayAttachments": [],
+            "CarrierGateways": [],
+            "VpcEndpoints": [],
+            "NetworkInterfaces": [],
+            "LocalGateways": [],
+            "ManagedPrefixLists": [],
+            "ManagedPrefixListEntries": [],
+        }
+
+    def add_to_bucket(vpc_id,key,description):
+        if vpc_id in snapshots:
+            snapshots[vpc_id][key].append(description)
+
+    for key in ["Subnets","RouteTables","NatGateways","CarrierGateways","VpcEndpoints","NetworkInterfaces"]:
+        for description in region[key]:
+            add_to_bucket(description["VpcId"],key,description)
+
+    if include_security:
+        for key in SECURITY_SNAPSHOT_KEYS:
+            for snapshot in snapshots.values():
+                snapshot[key] = []
+            for description in region[key]:
+                add_to_bucket(description["VpcId"],key,description)
+
+    if include_interfaces:
+        for snapshot in snapshots.values():
+            snapshot[INTERFACE_COUNTS_SNAPSHOT_KEY] = []
+        for counts in region[INTERFACE_COUNTS_SNAPSHOT_KEY]:
+            add_to_bucket(counts["VpcId"],INTERFACE_COUNTS_SNAPSHOT_KEY,counts)
+
+    # Local gateways and prefix lists aren't in a VPC; they go to the
+    # snapshots of the VPCs whose routes use them.
+    referenced_descriptions = {}
+    for key,id_key in [("LocalGateways","LocalGatewayId"),("ManagedPrefixLists","PrefixListId")]:
+        for description in region[key]:
+            referenced_descriptions[description[id_key]] = (key,description)
+    prefix_list_entries = {}
+    for entry in region["ManagedPrefixListEntries"]:
+        prefix_list_entries.setdefault(entry["PrefixListId"],[]).append(entry)
+
+    vpc_route_table_descriptions = {}
+    for route_table_description in route_table_descriptions:
+        vpc_route_table_descriptions.setdefault(route_table_description["VpcId"],[]).append(route_table_description)
+
+    for vpc_id,vpc_route_tables in vpc_route_table_descriptions.items():
+        for route_key in ["LocalGatewayId","DestinationPrefixListId"]:
+            for referenced_id in get_route_table_target_ids(vpc_route_tables,route_key):
+                if referenced_id in referenced_descriptions:
+                    key,description = referenced_descriptions[referenced_id]
+                    add_to_bucket(vpc_id,key,description)
+                for entry in prefix_list_entries.get(referenced_id,[]):
+                    add_to_bucket(vpc_id,"ManagedPrefixListEntries",entry)
+
+    for key in ["InternetGateways","EgressOnlyInternetGateways"]:
+        for description in region[key]:
+            for vpc_id in set(attachment["VpcId"] for attachment in description.get("Attachments",[])):
+                add_to_bucket(vpc_id,key,description)
+
+    for description in region["VpcPeeringConnections"]:
+        add_to_bucket(description["AccepterVpcInfo"]["VpcId"],"AccepterVpcPeeringConnections",description)
+        add_to_bucket(description["RequesterVpcInfo"]["VpcId"],"RequesterVpcPeeringConnections",description)
+
+    vpn_gateway_vpc_ids = {}
+    for description in region["VpnGateways"]:
+        vpc_ids = set(attachment["VpcId"] for attachment in description.get("VpcAttachments",[]))
+        vpn_gateway_vpc_ids[description["VpnGatewayId"]] = vpc_ids
+        for vpc_id in vpc_ids:
+            add_to_bucket(vpc_id,"VpnGateways",description)
+
+    for description in region["VpnConnections"]:
+        for vpc_id in vpn_gateway_vpc_ids.get(description.get("VpnGatewayId"),[]):
+            add_to_bucket(vpc_id,"VpnConnections",description)
+
+    # Transit gateways are linked to VPCs through the VPCs' own attachments.
+    # The snapshot holds the other attachments of those transit gateways.
+    transit_gateway_vpc_ids = {}
+    for description in region["TransitGatewayAttachments"]:
+        if description["ResourceType"] == "vpc" and description["ResourceId"] in snapshots:
+            transit_gateway_vpc_ids.setdefault(description["TransitGatewayId"],set()).add(description["ResourceId"])
+
+    for description in region["TransitGateways"]:
+        for vpc_id in transit_gateway_vpc_ids.get(description["TransitGatewayId"],[]):
+            add_to_bucket(vpc_id,"TransitGateways",description)
+
+    for description in region["TransitGatewayAttachments"]:
+        for vpc_id in transit_gateway_vpc_ids.get(description["TransitGatewayId"],[]):
+            if description["ResourceType"] == "vpc" and description["ResourceId"] == vpc_id:
+                continue
+            add_to_bucket(vpc_id,"TransitGatewayAttachments",description)
+
+    return snapshots
+
+def get_route_reference_calls(ec2_client,route_table_descriptions):
+    '''
+    The calls, for run_concurrently(), that describe the network interfaces,
+    local gateways and prefix lists named by the routes, all of each kind at
+    once rather than one call per route, and get the prefix lists' CIDRs.
+    '''
+    return {
+        "NetworkInterfaces": (describe_by_ids,
+            ec2_client,"describe_network_interfaces","NetworkInterfaces","network-interface-id",
+            get_route_table_target_ids(route_table_descriptions,"NetworkInterfaceId")),
+        "LocalGateways": (describe_by_ids,
+            ec2_client,"describe_local_gateways","LocalGateways","local-gateway-id",
+            get_route_table_target_ids(route_table_descriptions,"LocalGatewayId")),
+        "ManagedPrefixLists": (describe_by_ids,
+            ec2_client,"describe_managed_prefix_lists","PrefixLists","prefix-list-id",
+            get_route_table_target_ids(route_table_descriptions,"DestinationPrefixListId")),
+        "ManagedPrefixListEntries": (get_managed_prefix_list_entries,
+            ec2_client,get_route_table_target_ids(route_table_descriptions,"DestinationPrefixListId")),
+    }
+
+def get_security_calls(ec2_client,kwargs=None):
+    '''
+    The calls, for run_concurrently(), that describe the network ACLs and
+    security groups: one paginated call for each, filtered by kwargs.
+    '''
+    return {
+        "NetworkAcls": (describe_all,
+            ec2_client,"describe_network_acls","NetworkAcls",kwargs),
+        "SecurityGroups": (describe_all,
+            ec2_client,"describe_security_groups","SecurityGroups",kwargs),
+    }
+
+def get_network_interface_counts(ec2_client,kwargs=None):
+    '''
+    Count the network interfaces, filtered by kwargs, and the IPv4 addresses
+    they use, by VPC, subnet and kind (see get_interface_kind()). The
+    interfaces are described by one paginated call and counted page by page,
+    without keeping their descriptions. Returns a list of {"VpcId": ...,
+    "SubnetId": ..., "Kind": ..., "InterfaceCount": ..., "IpAddressCount": ...}.
+    '''
+    kwargs = dict(kwargs or {},PaginationConfig={"PageSize": INTERFACE_PAGE_SIZE})
+
+    counts = {}
+    paginator = ec2_client.get_paginator("describe_network_interfaces")
+    for page in paginator.paginate(**kwargs):
+        for interface_description in page.get("NetworkInterfaces",[]):
+            key = (interface_description.get("VpcId"),interface_description.get("SubnetId"),
+                get_interface_kind(interface_description))
+            count = counts.get(key)
+            if count is None:
+                count = counts[key] = [0,0]
+            count[0] += 1
+            count[1] += get_ipv4_address_count(interface_description)
+
+    return [{"VpcId": vpc_id, "SubnetId": subnet_id, "Kind": kind, "InterfaceCount": interface_count,
+        "IpAddressCount": ip_address_count}
+        for (vpc_id,subnet_id,kind),(interface_count,ip_address_count) in counts.items()]
+
+def run_concurrently(calls,max_workers):
+    '''
+    Run a dict of {key: (function, *args)} calls in a bounded thread pool and
+    return a dict of {key: result}. boto3 clients are thread safe, so the
+    calls can share one. If any call fails its exception is re-raised here.
+    '''
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for key,call in calls.items():
+            futures[key] = executor.submit(*call)
+        for key,future in futures.items():
+            results[key] = future.result()
+    return results
+
+def describe_all(ec2_client,operation_name,result_key,kwargs=None):
+    '''
+    Call an EC2 describe operation and return the result_key items from every
+    page of the response. Operations that the AWS API does not paginate
+    (e.g. describe_vpn_gateways) are called once.
+    '''
+    if kwargs is None:
+        kwargs = {}
+
+    if not ec2_client.can_paginate(operation_name):
+        response = getattr(ec2_client,operation_name)(**kwargs)
+        return response.get(result_key,[])
+
+    items = []
+    paginator = ec2_client.get_paginator(operation_name)
+    for page in paginator.paginate(**kwargs):
+        items.extend(page.get(result_key,[]))
+    return items
+
+def describe_by_ids(ec2_client,operation_name,result_key,filter_name,ids):
+    '''
+    Describe the resources with the given IDs, using as few calls as the
+    limit on filter values allows. No IDs means no calls.
+    '''
+    items = []
+    for i in range(0,len(ids),MAX_FILTER_VALUES):
+        items.extend(describe_all(ec2_client,operation_name,result_key,
+            {"Filters": [{"Name": filter_name, "Values": ids[i:i + MAX_FILTER_VALUES]}]}))
+    return items
+
+def get_managed_prefix_list_entries(ec2_client,prefix_list_ids):
+    '''
+    Get the CIDR blocks of the prefix lists, as a list of
+    {"PrefixListId": ..., "Cidr": ...}. The API takes one list per call, but
+    routes name few distinct prefix lists.
+    '''
+    entries = []
+    for prefix_list_id in prefix_list_ids:
+        for entry in describe_all(ec2_client,"get_managed_prefix_list_entries","Entries",
+                {"PrefixListId": prefix_list_id}):
+            entries.append({"PrefixListId": prefix_list_id, "Cidr": entry["Cidr"]})
+    return entries
+
+def get_vpc_description(ec2_client,vpc_id_or_name):
+    '''
+    Get a VPC's description by VPC ID, Name, or the special name of "default"
+    '''
+
+    if vpc_id_or_name.startswith("vpc-"):
+        filters = [{"Name": "vpc-id", "Values": [vpc_id_or_name]}]
+    elif vpc_id_or_name == "default":
+        filters = [{"Name": "isDefault", "Values": ["true"]}]
+    else:
+        filters = [{"Name": "tag:Name", "Values": [vpc_id_or_name]}]
+
+    import botocore.exceptions
+
+    try:
+        vpc_descriptions = describe_all(ec2_client,"describe_vpcs","Vpcs",{"Filters": filters})
+    except botocore.exceptions.ClientError as e:
+        if 'NotFound' in str(e):
+            raise VpcDiagramError(f"VPC not found: {vpc_id_or_name}")
+        else:
+            raise
+
+    if len(vpc_descriptions) == 0:
+        raise VpcDiagramError(f"VPC not found: {vpc_id_or_name}")
+
+    if len(vpc_descriptions) > 1:
+        raise VpcDiagramError(f"Found more than one VPC matching '{vpc_id_or_name}'. Use ID instead.")
+
+    return vpc_descriptions[0]
+
+def get_vpc_descriptions(ec2_client,all_vpcs=False,vpc_ids_or_names=None,tags=None):
+    '''
+    Get the VPC descriptions for batch mode: every VPC in the region, the
+    listed VPC IDs/Names, and/or the VPCs having all of the specified tags
+    ("Key=Value", or just "Key" for any value).
+    '''
+    tag_filters = []
+    for tag in tags or []:
+        if "=" in tag:
+            key,value = tag.split("=",1)
+            tag_filters.append({"Name": f"tag:{key}", "Values": [value]})
+        else:
+            tag_filters.append({"Name": "tag-key", "Values": [tag]})
+
+    if all_vpcs or not vpc_ids_or_names:
+        return describe_all(ec2_client,"describe_vpcs","Vpcs",{"Filters": tag_filters})
+
+    vpc_ids = [v for v in vpc_ids_or_names if v.startswith("vpc-")]
+    vpc_names = [v for v in vpc_ids_or_names if not v.startswith("vpc-")]
+
+    # EC2 ANDs filters together, so IDs and Names need separate calls.
+    lookups = {}
+    if len(vpc_ids) > 0:
+        lookups["ids"] = (describe_all,ec2_client,"describe_vpcs","Vpcs",
+            {"Filters": tag_filters + [{"Name": "vpc-id", "Values": vpc_ids}]})
+    if len(vpc_names) > 0:
+        lookups["names"] = (describe_all,ec2_client,"describe_vpcs","Vpcs",
+            {"Filters": tag_filters + [{"Name": "tag:Name", "Values": vpc_names}]})
+    results = run_concurrently(lookups,len(lookups))
+
+    vpc_descriptions = {}
+    for vpc_description in results.get("ids",[]) + results.get("names",[]):
+        vpc_descriptions[vpc_description["VpcId"]] = vpc_description
+
+    for vpc_id_or_name in vpc_ids_or_names:
+        matches = [d for d in vpc_descriptions.values()
+            if d["VpcId"] == vpc_id_or_name or get_aws_name(d) == vpc_id_or_name]
+        if len(matches) == 0:
+            raise VpcDiagramError(f"VPC not found: {vpc_id_or_name}")
+        if len(matches) > 1:
+            raise VpcDiagramError(f"Found more than one VPC matching '{vpc_id_or_name}'. Use ID instead.")
+
+    return list(vpc_descriptions.values())
+
+def get_egress_only_internet_gateway_descriptions(ec2_client,vpc_id):
+    '''
+    Get the descriptions for egress-only internet gateways that are associated
+    with the specified VPC. The AWS API does not support filtering by VPC ID
+    so we have to do our own filtering.
+    '''
+    egress_only_internet_gateway_descriptions = []
+    for egress_only_internet_gateway_description in describe_all(ec2_client,"describe_egress_only_internet_gateways","EgressOnlyInternetGateways"):
+        for attachment in egress_only_internet_gateway_description['Attachments']:
+            if attachment['VpcId'] == vpc_id:
+                egress_only_internet_gateway_descriptions.append(egress_only_internet_gateway_description)
+                break
+
+    return egress_only_internet_gateway_descriptions
+
+def get_vpn_connection_descriptions(ec2_client,vpn_gateway_ids):
+    '''
+    Get the VPN Connection descriptions for all of the specified VPN Gateways
+    in a single call.
+    '''
+    if len(vpn_gateway_ids) == 0:
+        return []
+
+    return describe_all(ec2_client,"describe_vpn_connections","VpnConnections",
+        {"Filters": [{"Name": "vpn-gateway-id", "Values": vpn_gateway_ids}]})
+
+def get_transit_gateway_ids_for_vpc(ec2_client,vpc_id):
+    '''
+    Get the IDs of the transit gateways the VPC is attached to.
+    '''
+    transit_gateway_attachment_descriptions = describe_all(ec2_client,
+        "describe_transit_gateway_attachments","TransitGatewayAttachments",
+        {"Filters": [
+            {"Name": "resource-type", "Values": ["vpc"]},
+            {"Name": "resource-id", "Values": [vpc_id]}
+        ]})
+
+    transit_gateway_ids = []
+    for transit_gateway_attachment_description in transit_gateway_attachment_descriptions:
+        if transit_gateway_attachment_description['TransitGatewayId'] not in transit_gateway_ids:
+            transit_gateway_ids.append(transit_gateway_attachment_description['TransitGatewayId'])
+
+    return transit_gateway_ids
+
+def get_transit_gateway_descriptions(ec2_client,transit_gateway_ids):
+    '''
+    Get the descriptions of the specified transit gateways. An empty list of
+    IDs would describe every transit gateway in the region, so skip the call.
+    '''
+    if len(transit_gateway_ids) == 0:
+        return []
+
+    return describe_all(ec2_client,"describe_transit_gateways","TransitGateways",
+        {"TransitGatewayIds": transit_gateway_ids})
+
+def get_transit_gateway_attachment_descriptions_for_transit_gateways(ec2_client,transit_gateway_ids,vpc_id):
+    '''
+    Get the Transit Gateway Attachment descriptions associated with the specified
+    Transit Gateway IDs, but excluding any that are for the specified VPC ID.
+    '''
+    if len(transit_gateway_ids) == 0:
+        return []
+
+    all_transit_gateway_attachment_descriptions = describe_all(ec2_client,
+        "describe_transit_gateway_attachments","TransitGatewayAttachments",
+        {"Filters": [
+            {"Name": "transit-gateway-id", "Values": transit_gateway_ids}
+        ]})
+
+    transit_gateway_attachment_descriptions = []
+
+    for transit_gateway_attachment_description in all_transit_gateway_attachment_descriptions:
+        if transit_gateway_attachment_description['ResourceType'] == 'vpc' \
+            and transit_gateway_attachment_description['ResourceId'] == vpc_id:
+            continue
+        transit_gateway_attachment_descriptions.append(transit_gateway_attachment_description)
+
+    return transit_gateway_attachment_descriptions
@@ -0,0 +1,164 @@
+'''
+Helpers for the raw resource descriptions returned by the EC2 describe_*
+calls.
+'''
+
+def get_aws_name(resource_description):
+    '''
+    The the value for the 'Name' tag, if any. This assumes the EC2 way of
+    tagging things, which is fine because everything here is under the EC2
+    umbrella.
+    '''
+    name = None
+    if 'Tags' in resource_description:
+        tags = resource_description['Tags']
+        for tag in tags:
+            if tag['Key'] == "Name":
+                name = tag['Value']
+                break
+    return name
+
+# Routes --------------------------------------------------------------
+
+# The keys of a route description that name its target, in order of
+# precedence. A route to an instance names both the instance and its network
+# interface, and the interface is the more specific target. InstanceOwnerId
+# and DestinationPrefixListId also end in "Id" but are not targets. GatewayId
+# covers internet gateways, VPN gateways, gateway VPC endpoints and "local".
+ROUTE_TARGET_KEYS = [
+    "NatGatewayId",
+    "EgressOnlyInternetGatewayId",
+    "TransitGatewayId",
+    "VpcPeeringConnectionId",
+    "CarrierGatewayId",
+    "LocalGatewayId",
+    "NetworkInterfaceId",
+    "InstanceId",
+    "CoreNetworkArn",
+    "GatewayId",
+]
+
+ROUTE_DESTINATION_KEYS = [
+    "DestinationCidrBlock",
+    "DestinationIpv6CidrBlock",
+    "DestinationPrefixListId",
+]
+
+# The target of the routes to the VPC's own CIDR blocks
+LOCAL_ROUTE_TARGET = "local"
+
+def get_route_target(route_description):
+    '''
+    The ID (or ARN, for core networks) of the route's target, or None if it
+    has none that we know of.
+    '''
+    for key in ROUTE_TARGET_KEYS:
+        if key in route_description:
+            return route_description[key]
+    return None
+
+def get_route_destination(route_description):
+    '''
+    The route's destination: a CIDR block or a prefix list ID.
+    '''
+    for key in ROUTE_DESTINATION_KEYS:
+        if key in route_description:
+            return route_description[key]
+    return None
+
+def is_propagated_route(route_description):
+    '''
+    Was the route propagated by a VPN gateway, rather than created statically?
+    '''
+    return route_description.get("Origin") == "EnableVgwRoutePropagation"
+
+def is_blackhole_route(route_description):
+    '''
+    Is the route's target gone (e.g. a deleted NAT gateway)?
+    '''
+    return route_description.get("State") == "blackhole"
+
+def get_route_table_target_ids(route_table_descriptions,target_key):
+    '''
+    The distinct target IDs of the given kind (e.g. "NetworkInterfaceId")
+    across the routes of the route tables.
+    '''
+    target_ids = {}
+    for route_table_description in route_table_descriptions:
+        for route in route_table_description["Routes"]:
+            if target_key in route:
+                target_ids[route[target_key]] = None
+    return list(target_ids)
+
+# Network ACLs and Security Groups ------------------------------------
+
+# Names of the IP protocol numbers that rules commonly use. "-1" is every
+# protocol.
+PROTOCOL_NAMES = {"-1": "all", "1": "icmp", "6": "tcp", "17": "udp", "58": "icmpv6"}
+
+def get_protocol_name(protocol):
+    '''
+    The name of a rule's protocol (a number as a string, or a name), e.g.
+    "tcp", or the number if it has no common name.
+    '''
+    return PROTOCOL_NAMES.get(str(protocol),str(protocol))
+
+def get_port_range(from_port,to_port):
+    '''
+    A rule's port range as a string: "443", "1024-65535", or "" for every
+    port (no range, -1, or ICMP's type and code of -1).
+    '''
+    if from_port is None or from_port == -1 or (from_port == 0 and to_port == 65535):
+        return ""
+    if to_port is None or to_port == from_port:
+        return str(from_port)
+    return f"{from_port}-{to_port}"
+
+# Network Interfaces --------------------------------------------------
+
+# The kinds of workload that network interfaces are counted by, in the order
+# they are listed.
+INTERFACE_KINDS = ["instance","Lambda","ELB","NAT","endpoint","other"]
+
+# The kind of the network interfaces of each InterfaceType that has one of
+# its own.
+INTERFACE_TYPE_KINDS = {
+    "lambda": "Lambda",
+    "network_load_balancer": "ELB",
+    "gateway_load_balancer": "ELB",
+    "nat_gateway": "NAT",
+    "vpc_endpoint": "endpoint",
+    "gateway_load_balancer_endpoint": "endpoint",
+}
+
+# The IPv4 addresses of a prefix delegated to a network interface (a /28).
+IPV4_PREFIX_ADDRESS_COUNT = 16
+
+def get_interface_kind(interface_description):
+    '''
+    The kind of workload (one of INTERFACE_KINDS) that a network interface
+    belongs to. Lambda functions' interfaces, and those of application and
+    classic load balancers, can have the plain "interface" type, and are
+    told apart by their description and requester.
+    '''
+    kind = INTERFACE_TYPE_KINDS.get(interface_description.get("InterfaceType"))
+    if kind is not None:
+        return kind
+    description = interface_description.get("Description","")
+    if description.startswith("AWS Lambda VPC ENI"):
+        return "Lambda"
+    if interface_description.get("RequesterId") == "amazon-elb" or description.startswith("ELB "):
+        return "ELB"
+    if "InstanceId" in interface_description.get("Attachment",{}):
+        return "instance"
+    return "other"
+
+def get_ipv4_address_count(interface_description):
+    '''
+    The IPv4 addresses of its subnet that a network interface uses: its
+    private addresses, primary and secondary, and its delegated prefixes.
+    '''
+    address_count = len(interface_description.get("PrivateIpAddresses",[]))
+    if address_count == 0 and "PrivateIpAddress" in interface_description:
+        address_count = 1
+    return address_count + IPV4_PREFIX_ADDRESS_COUNT * len(interface_description.get("Ipv4Prefixes",[]))
@@ -0,0 +1,218 @@
+'''
+Compare two snapshots of a VPC: which resources were added, removed or
+modified, as a JSON-able change report and as a diagram with the changes
+highlighted.
+
+Resources are matched by ID and compared by a hash of their description, so
+only the resources whose hashes differ are compared field by field. Routes
+are compared individually, matched by route table, destination and whether
+they are propagated (a route table can have a static and a propagated route
+to the same destination).
+'''
+
+import hashlib
+import json
+
+from .descriptions import get_route_destination, is_propagated_route
+
+# Snapshot key, and the ID key of its descriptions, of each resource type
+# that is compared.
+RESOURCE_ID_KEYS = [
+    ("Subnets","SubnetId"),
+    ("RouteTables","RouteTableId"),
+    ("InternetGateways","InternetGatewayId"),
+    ("EgressOnlyInternetGateways","EgressOnlyInternetGatewayId"),
+    ("NatGateways","NatGatewayId"),
+    ("AccepterVpcPeeringConnections","VpcPeeringConnectionId"),
+    ("RequesterVpcPeeringConnections","VpcPeeringConnectionId"),
+    ("VpnGateways","VpnGatewayId"),
+    ("VpnConnections","VpnConnectionId"),
+    ("TransitGateways","TransitGatewayId"),
+    ("TransitGatewayAttachments","TransitGatewayAttachmentId"),
+    ("CarrierGateways","CarrierGatewayId"),
+    ("VpcEndpoints","VpcEndpointId"),
+    ("NetworkInterfaces","NetworkInterfaceId"),
+    ("LocalGateways","LocalGatewayId"),
+    ("ManagedPrefixLists","PrefixListId"),
+    ("NetworkAcls","NetworkAclId"),
+    ("SecurityGroups","GroupId"),
+]
+
+# Fields that change without anything having been done to the resource. They
+# are left out of the comparison.
+VOLATILE_KEYS = {
+    "Subnets": ["AvailableIpAddressCount"],
+    "VpnConnections": ["VgwTelemetry"],
+    "ManagedPrefixLists": ["Version"],
+}
+
+# Routes are compared separately from their route tables.
+ROUTE_TABLE_IGNORED_KEYS = ["Routes"]
+
+# Highlighting of the changes in the diagram.
+ADDED_ATTRIBUTES = {"color": "green3", "fontcolor": "green4", "penwidth": "2"}
+REMOVED_ATTRIBUTES = {"color": "red3", "fontcolor": "red3", "penwidth": "2", "style": "dashed"}
+MODIFIED_ATTRIBUTES = {"color": "orange", "penwidth": "2"}
+
+def hash_description(description,ignored_keys=()):
+    '''
+    A hash of a resource description that doesn't depend on key order, or
+    on whether timestamps are datetimes (from boto3) or strings (from a
+    snapshot file).
+    '''
+    if len(ignored_keys) > 0:
+        description = {k: v for k,v in description.items() if k not in ignored_keys}
+    text = json.dumps(description,sort_keys=True,separators=(",",":"),default=lambda o: o.isoformat())
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+def get_resources(snapshot,skipped_keys=()):
+    '''
+    The snapshot's resources as a dict of {(type, ID): (description, hash)},
+    except for the snapshot keys in skipped_keys. Each route is a resource
+    of type "Routes" with an ID of "<route table ID> <destination>", or
+    "<route table ID> <destination> propagated" for a propagated route.
+    '''
+    resources = {}
+    if snapshot is None:
+        return resources
+
+    vpc_description = snapshot["Vpc"]
+    resources[("Vpc",vpc_description["VpcId"])] = (vpc_description,hash_description(vpc_description))
+
+    for snapshot_key,id_key in RESOURCE_ID_KEYS:
+        if snapshot_key in skipped_keys:
+            continue
+        ignored_keys = VOLATILE_KEYS.get(snapshot_key,[])
+        if snapshot_key == "RouteTables":
+            ignored_keys = ignored_keys + ROUTE_TABLE_IGNORED_KEYS
+        for description in snapshot.get(snapshot_key,[]):
+            resources[(snapshot_key,description[id_key])] = (description,hash_description(description,ignored_keys))
+
+    for route_table_description in snapshot["RouteTables"]:
+        for route in route_table_description["Routes"]:
+            route_id = f"{route_table_description['RouteTableId']} {get_route_destination(route)}"
+            if is_propagated_route(route):
+                route_id += " propagated"
+            resources[("Routes",route_id)] = (route,hash_description(route))
+
+    return resources
+
+def diff_snapshots(old_snapshot,new_snapshot):
+    '''
+    Compare two snapshots of the same VPC; either may be None for a VPC that
+    didn't exist. Returns the change report: a dict with the VpcId, lists
+    of the Added, Removed and Modified resources, each a dict with the Type
+    and Id, and for Modified the Changes as a list of
+    {"Key": ..., "Old": ..., "New": ...}, and the Skipped resource types.
+
+    A resource type that only one of the snapshots recorded is skipped, so
+    that its resources don't all show as added (or removed): e.g. network
+    ACLs and security groups when only one run had --security, or the types
+    that older snapshot files didn't have.
+    '''
+    skipped_keys = []
+    if old_snapshot is not None and new_snapshot is not None:
+        skipped_keys = [snapshot_key for snapshot_key,_ in RESOURCE_ID_KEYS
+            if (snapshot_key in old_snapshot) != (snapshot_key in new_snapshot)]
+    old_resources = get_resources(old_snapshot,skipped_keys)
+    new_resources = get_resources(new_snapshot,skipped_keys)
+    vpc_id = (new_snapshot or old_snapshot)["Vpc"]["VpcId"]
+
+    report = {"VpcId": vpc_id, "Added": [], "Removed": [], "Modified": [], "Skipped": skipped_keys}
+    for key,(new_description,new_hash) in new_resources.items():
+        if key not in old_resources:
+            report["Added"].append({"Type": key[0], "Id": key[1]})
+            continue
+        old_description,old_hash = old_resources[key]
+        if old_hash != new_hash:
+            report["Modified"].append({"Type": key[0], "Id": key[1],
+                "Changes": get_changes(key[0],old_description,new_description)})
+
+    for key in old_resources:
+        if key not in new_resources:
+            report["Removed"].append({"Type": key[0], "Id": key[1]})
+
+    return report
+
+def get_changes(resource_type,old_description,new_description):
+    '''
+    The top-level fields that differ between two descriptions of a resource.
+    '''
+    ignored_keys = VOLATILE_KEYS.get(resource_type,[])
+    if resource_type == "RouteTables":
+        ignored_keys = ignored_keys + ROUTE_TABLE_IGNORED_KEYS
+
+    changes = []
+    for key in sorted(set(old_description) | set(new_description)):
+        if key in ignored_keys:
+            continue
+        old_value = old_description.get(key)
+        new_value = new_description.get(key)
+        if hash_description({key: old_value}) != hash_description({key: new_value}):
+            changes.append({"Key": key, "Old": old_value, "New": new_value})
+    return changes
+
+def get_modified_ids(report):
+    '''
+    The IDs of the resources drawn as modified nodes: the modified
+    resources, and the route tables whose routes changed.
+    '''
+    modified_ids = set()
+    for change in report["Modified"]:
+        modified_ids.add(change["Id"].split(" ")[0] if change["Type"] == "Routes" else change["Id"])
+    for change in report["Added"] + report["Removed"]:
+        if change["Type"] == "Routes":
+            modified_ids.add(change["Id"].split(" ")[0])
+    return modified_ids
+
+def format_report_summary(report):
+    '''
+    One line of text summarizing a change report.
+    '''
+    summary = f"{report['VpcId']}: {len(report['Added'])} added, " \
+        f"{len(report['Removed'])} removed, {len(report['Modified'])} modified"
+    if len(report["Skipped"]) > 0:
+        summary += f" ({', '.join(report['Skipped'])} not compared)"
+    return summary
+
+def build_diff_graph(old_graph,new_graph,modified_ids):
+    '''
+    Combine the graphs of the old and new snapshots in to one, highlighting
+    the nodes and edges that were added or removed, and the nodes of the
+    modified resources. The removed nodes and edges are taken from the old
+    graph, everything else is as in the new graph.
+    '''
+    graph = new_graph
+    old_node_names = set(node.get_name() for node in old_graph.get_nodes())
+
+    for node in graph.get_nodes():
+        if node.get_name() not in old_node_names:
+            node.attributes.update(ADDED_ATTRIBUTES)
+        elif node.get_name() in modified_ids:
+            node.attributes.update(MODIFIED_ATTRIBUTES)
+
+    for node in old_graph.get_nodes():
+        if graph.get_node(node.get_name()) is None:
+            node.attributes.update(REMOVED_ATTRIBUTES)
+            graph.add_node(node)
+
+    # Edges are matched by their endpoints and attributes, so an edge whose
+    # style changed (e.g. a route becoming a blackhole) shows as removed and
+    # added.
+    def edge_key(edge):
+        return (edge.get_source(),edge.get_destination(),tuple(sorted(edge.attributes.items())))
+
+    old_edge_keys = set(edge_key(edge) for edge in old_graph.get_edges())
+    new_edge_keys = set()
+    for edge in graph.get_edges():
+        key = edge_key(edge)
+        new_edge_keys.add(key)
+        if key not in old_edge_keys:
+            edge.attributes.update(ADDED_ATTRIBUTES)
+
+    for edge in old_graph.get_edges():
+        if edge_key(edge) not in new_edge_keys:
+            edge.attributes.update(REMOVED_ATTRIBUTES)
+            graph.add_edge(edge)
+
+    return graph
@@ -0,0 +1,275 @@
+'''
+A lightweight graph model with a streaming writer for the graphviz DOT
+language, and rendering through the graphviz dot utility.
+
+Nodes and edges are slotted records holding just a name (or endpoint names)
+and a dict of DOT attributes. The DOT text is streamed straight to the dot
+process, and all of a graph's output files, whatever their formats, are
+rendered by a single dot invocation. Layouts can be cached between runs
+(see layout.py).
+'''
+
+import concurrent.futures
+import io
+import os.path
+import subprocess
+import tempfile
+
+from .errors import VpcDiagramError
+
+# Output file extensions, and the dot -T format for each where the two
+# differ. .gv is the preferred extension for graphviz dot files in order to
+# avoid confusion with MS Word document templates.
+RENDER_FORMATS = {
+    ".dot": "dot",
+    ".gv": "dot",
+    ".jpg": "jpg",
+    ".pdf": "pdf",
+    ".png": "png",
+    ".svg": "svg",
+}
+
+class Node:
+    '''
+    A graph node: a name and its DOT attributes.
+    '''
+    __slots__ = ("_name","attributes")
+
+    def __init__(self,name,**attributes):
+        self._name = name
+        self.attributes = attributes
+
+    def get_name(self):
+        return self._name
+
+    def __reduce__(self):
+        # Pickled (e.g. for a render worker) as a plain Node: whatever else
+        # a subclass holds isn't needed to write the DOT.
+        return (Node,(self._name,),(None,{"attributes": self.attributes}))
+
+class Edge:
+    '''
+    An edge between two nodes, by name, with its DOT attributes.
+    '''
+    __slots__ = ("_source","_destination","attributes")
+
+    def __init__(self,source,destination,**attributes):
+        self._source = source
+        self._destination = destination
+        self.attributes = attributes
+
+    def get_source(self):
+        return self._source
+
+    def get_destination(self):
+        return self._destination
+
+class Graph:
+    '''
+    A graph of nodes and edges. As in DOT, adding a node whose name is
+    already in the graph updates that node's attributes rather than adding
+    a second node.
+    '''
+    __slots__ = ("_name","_graph_type","attributes","_nodes","_edges","_subgraphs")
+
+    def __init__(self,name,graph_type="graph",**attributes):
+        self._name = name
+        self._graph_type = graph_type
+        self.attributes = attributes
+        self._nodes = {}
+        self._edges = []
+        self._subgraphs = []
+
+    def get_name(self):
+        return self._name
+
+    def get_graph_type(self):
+        return self._graph_type
+
+    def add_node(self,node):
+        existing_node = self._nodes.get(node.get_name())
+        if existing_node is None:
+            self._nodes[node.get_name()] = node
+        else:
+            existing_node.attributes.update(node.attributes)
+
+    def add_edge(self,edge):
+        self._edges.append(edge)
+
+    def get_node(self,name):
+        return self._nodes.get(name)
+
+    def get_nodes(self):
+        return list(self._nodes.values())
+
+    def get_edges(self):
+        return list(self._edges)
+
+    def add_subgraph(self,subgraph):
+        self._subgraphs.append(subgraph)
+
+    def get_subgraphs(self):
+        return list(self._subgraphs)
+
+    def to_string(self):
+        '''
+        The graph in the DOT language.
+        '''
+        stream = io.StringIO()
+        write_dot(self,stream)
+        return stream.getvalue()
+
+class Subgraph:
+    '''
+    A subgraph grouping some of a graph's nodes, by name. Named "cluster_..."
+    it is drawn as a box around them. Subgraphs nest.
+    '''
+    __slots__ = ("_name","attributes","_node_names","_subgraphs")
+
+    def __init__(self,name,**attributes):
+        self._name = name
+        self.attributes = attributes
+        self._node_names = []
+        self._subgraphs = []
+
+    def get_name(self):
+        return self._name
+
+    def add_node_name(self,node_name):
+        self._node_names.append(node_name)
+
+    def get_node_names(self):
+        return list(self._node_names)
+
+    def add_subgraph(self,subgraph):
+        self._subgraphs.append(subgraph)
+
+    def get_subgraphs(self):
+        return list(self._subgraphs)
+
+# DOT Writer ----------------------------------------------------------
+
+def quote(value):
+    '''
+    Quote a string as a DOT ID. Newlines become the \\n escape that graphviz
+    uses for line breaks in labels.
+    '''
+    value = str(value).replace("\\","\\\\").replace('"','\\"').replace("\n","\\n")
+    return f'"{value}"'
+
+def format_attributes(attributes):
+    return ", ".join(f"{key}={quote(value)}" for key,value in attributes.items())
+
+def write_dot(graph,stream):
+    '''
+    Write the graph to a text stream in the DOT language, a line at a time.
+    '''
+    edge_op = "--" if graph.get_graph_type() == "graph" else "->"
+
+    stream.write(f"{graph.get_graph_type()} {quote(graph.get_name())} {{\n")
+    if len(graph.attributes) > 0:
+        stream.write(f"graph [{format_attributes(graph.attributes)}];\n")
+
+    # Nodes in a subgraph are written inside it, the rest at the top level
+    subgraph_node_names = set()
+    for subgraph in graph.get_subgraphs():
+        write_subgraph(graph,subgraph,stream,subgraph_node_names)
+
+    for node in graph.get_nodes():
+        if node.get_name() not in subgraph_node_names:
+            write_node(node,stream)
+
+    for edge in graph.get_edges():
+        stream.write(f"{quote(edge.get_source())} {edge_op} {quote(edge.get_destination())}")
+        if len(edge.attributes) > 0:
+            stream.write(f" [{format_attributes(edge.attributes)}]")
+        stream.write(";\n")
+
+    stream.write("}\n")
+
+def write_node(node,stream):
+    stream.write(f"{quote(node.get_name())} [{format_attributes(node.attributes)}];\n")
+
+def write_subgraph(graph,subgraph,stream,written_node_names):
+    '''
+    Write a subgraph and its nodes, adding their names to written_node_names.
+    '''
+    stream.write(f"subgraph {quote(subgraph.get_name())} {{\n")
+    if len(subgraph.attributes) > 0:
+        stream.write(f"graph [{format_attributes(subgraph.attributes)}];\n")
+    for child_subgraph in subgraph.get_subgraphs():
+        write_subgraph(graph,child_subgraph,stream,written_node_names)
+    for node_name in subgraph.get_node_names():
+        node = graph.get_node(node_name)
+        if node is not None and node_name not in written_node_names:
+            written_node_names.add(node_name)
+            write_node(node,stream)
+    stream.write("}\n")
+
+# Rendering -----------------------------------------------------------
+
+def render(graph,filenames,program="dot",layout_cache=None):
+    '''
+    Render the graph to one or more files, the format of each being
+    determined by its extension, with a single run of the graphviz program.
+    With a layout_cache (see layout.py) the layout of an unchanged topology
+    is reused rather than computed again.
+    '''
+    if layout_cache is not None:
+        layout_cache.render(graph,filenames,program)
+        return
+    run_graphviz([program] + get_output_arguments(filenames),graph)
+
+def get_output_arguments(filenames):
+    '''
+    The graphviz command line arguments to write each file, in the format
+    of its extension.
+    '''
+    arguments = []
+    for filename in filenames:
+        extension = os.path.splitext(filename)[1]
+        if extension not in RENDER_FORMATS:
+            raise VpcDiagramError(f"unsupported file type: {extension}")
+        arguments.extend([f"-T{RENDER_FORMATS[extension]}",f"-o{filename}"])
+    return arguments
+
+def run_graphviz(command,graph):
+    '''
+    Run a graphviz command, streaming the graph to it in the DOT language.
+    '''
+    program = command[0]
+
+    # stderr goes to a file rather than a pipe, so that a chatty dot can't
+    # fill the pipe and block while we are still writing to its stdin.
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(command,stdin=subprocess.PIPE,stderr=stderr)
+        except FileNotFoundError:
+            raise VpcDiagramError(f"graphviz '{program}' not found in path")
+
+        try:
+            with io.TextIOWrapper(process.stdin,encoding="utf-8") as stdin:
+                write_dot(graph,stdin)
+        except BrokenPipeError:
+            pass
+        returncode = process.wait()
+
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8",errors="replace").strip()
+            raise VpcDiagramError(f"{program} failed: {message}")
+
+def render_many(jobs,max_workers=None,layout_cache=None):
+    '''
+    Render many graphs in a pool of processes. jobs is a list of
+    (graph, filenames) tuples.
+    '''
+    if len(jobs) == 1 or max_workers == 1:
+        for graph,filenames in jobs:
+            render(graph,filenames,layout_cache=layout_cache)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(render,graph,filenames,"dot",layout_cache) for graph,filenames in jobs]
+        for future in futures:
+            future.result()
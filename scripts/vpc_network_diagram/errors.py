@@ -0,0 +1,9 @@
+'''
+Exceptions raised by the vpc_network_diagram package.
+'''
+
+class VpcDiagramError(Exception):
+    '''
+    An error the user can fix, e.g. a VPC that doesn't exist or an unreadable
+    snapshot file. The command line reports these without a traceback.
+    '''
@@ -0,0 +1,241 @@
+'''
+Export a VPC's graph in machine-readable formats, for CMDBs and docs
+pipelines, rather than as a diagram: JSON, NDJSON (JSON lines), GraphML
+and Mermaid.
+
+Nodes are typed (Vpc, Subnet, RouteTable, NatGateway, RemoteVpc,
+RemoteNetwork, ...) and the VPCs, subnets and route tables carry the fields
+of their records in the compact model (see model.py); every node has its
+label. Edges have their label, e.g. a route's destinations. Each file is
+written a node and an edge at a time, straight from the graph, without
+graphviz.
+'''
+
+import json
+import os.path
+from xml.sax.saxutils import escape, quoteattr
+
+from .errors import VpcDiagramError
+from .nodes import VpcNode, SubnetNode, RouteTableNode, TheInternetNode
+from .hierarchy import AvailabilityZoneNode
+from .summarize import SummaryNode
+
+# GraphML keys: (ID, for, record field, attr.type), for the node and edge
+# fields that are strings, numbers or lists of strings.
+GRAPHML_KEYS = [
+    ("type","node","Type","string"),
+    ("label","node","Label","string"),
+    ("name","node","Name","string"),
+    ("owner_id","node","OwnerId","string"),
+    ("cidr_blocks","node","CidrBlocks","string"),
+    ("availability_zone","node","AvailabilityZone","string"),
+    ("available_ip_address_count","node","AvailableIpAddressCount","int"),
+    ("main","node","Main","boolean"),
+    ("subnet_ids","node","SubnetIds","string"),
+    ("members","node","Members","string"),
+    ("edge_label","edge","Label","string"),
+]
+
+# Mermaid node shapes, by DOT shape: (opening, closing) around the label.
+MERMAID_SHAPES = {
+    "box3d": ('[["','"]]'),
+    "ellipse": ('(["','"])'),
+    "note": ('>"','"]'),
+}
+
+# Records -------------------------------------------------------------
+
+def get_node_type(node):
+    '''
+    The type of resource a node stands for, from its class, e.g. "Subnet"
+    for a SubnetNode.
+    '''
+    if isinstance(node,SummaryNode):
+        return "SubnetSummary" if node.get_name().startswith("subnets:") else "RouteTableSummary"
+    if isinstance(node,TheInternetNode):
+        return "Internet"
+    node_type = type(node).__name__
+    if node_type.endswith("Node") and node_type != "Node":
+        node_type = node_type[:-len("Node")]
+    return node_type
+
+def get_node_record(node):
+    '''
+    A dict of the node's ID, type and label, and the fields of the model
+    record of a VPC, subnet or route table, or the members of a summary.
+    '''
+    record = {"Id": node.get_name(), "Type": get_node_type(node), "Label": node.attributes.get("label","")}
+
+    if isinstance(node,VpcNode):
+        vpc = node.get_vpc()
+        record.update({"Name": vpc.name, "OwnerId": vpc.owner_id,
+            "CidrBlocks": [str(cidr_block) for cidr_block in vpc.cidr_blocks]})
+    elif isinstance(node,SubnetNode):
+        subnet = node.get_subnet()
+        record.update({"Name": subnet.name, "AvailabilityZone": subnet.availability_zone,
+            "CidrBlocks": [str(cidr_block) for cidr_block in subnet.cidr_blocks],
+            "AvailableIpAddressCount": subnet.available_ip_address_count})
+    elif isinstance(node,RouteTableNode):
+        route_table = node.get_route_table()
+        record.update({"Name": route_table.name, "Main": route_table.is_main,
+            "SubnetIds": list(route_table.subnet_ids),
+            "Routes": [{"Destination": route.destination, "TargetId": route.target_id,
+                "Propagated": route.is_propagated, "Blackhole": route.is_blackhole} for route in route_table.routes]})
+    elif isinstance(node,SummaryNode):
+        record["Members"] = node.get_member_names()
+    elif isinstance(node,AvailabilityZoneNode):
+        record["Members"] = node.get_subnet_names()
+
+    return record
+
+def get_edge_record(edge):
+    '''
+    A dict of the edge's source and target node IDs, label, and whether it
+    has a direction.
+    '''
+    return {"Source": edge.get_source(), "Target": edge.get_destination(),
+        "Label": edge.attributes.get("label",""), "Directed": edge.attributes.get("dir") != "none"}
+
+# Writers -------------------------------------------------------------
+
+def write_json(graph,stream):
+    '''
+    Write the graph as one JSON document: {"Graph": name, "Nodes": [...],
+    "Edges": [...]}, with a node or edge per line.
+    '''
+    stream.write(f'{{"Graph": {json.dumps(graph.get_name())},\n"Nodes": [')
+    separator = "\n"
+    for node in graph.get_nodes():
+        stream.write(separator + json.dumps(get_node_record(node)))
+        separator = ",\n"
+    stream.write('\n],\n"Edges": [')
+    separator = "\n"
+    for edge in graph.get_edges():
+        stream.write(separator + json.dumps(get_edge_record(edge)))
+        separator = ",\n"
+    stream.write("\n]}\n")
+
+def write_ndjson(graph,stream):
+    '''
+    Write the graph as JSON lines: one per node, then one per edge, told
+    apart by their Kind ("Node" or "Edge").
+    '''
+    for node in graph.get_nodes():
+        stream.write(json.dumps({"Kind": "Node", **get_node_record(node)}) + "\n")
+    for edge in graph.get_edges():
+        stream.write(json.dumps({"Kind": "Edge", **get_edge_record(edge)}) + "\n")
+
+def write_graphml(graph,stream):
+    '''
+    Write the graph as GraphML, with the record fields in GRAPHML_KEYS as
+    data. Lists are written space separated.
+    '''
+    stream.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for key_id,key_for,field,attr_type in GRAPHML_KEYS:
+        stream.write(f'<key id="{key_id}" for="{key_for}" attr.name="{field}" attr.type="{attr_type}"/>\n')
+    stream.write(f'<graph id={quoteattr(graph.get_name())} edgedefault="directed">\n')
+
+    for node in graph.get_nodes():
+        stream.write(f'<node id={quoteattr(node.get_name())}>')
+        write_graphml_data(get_node_record(node),"node",stream)
+        stream.write("</node>\n")
+
+    for edge in graph.get_edges():
+        record = get_edge_record(edge)
+        stream.write(f'<edge source={quoteattr(record["Source"])} target={quoteattr(record["Target"])}'
+            f' directed="{str(record["Directed"]).lower()}">')
+        write_graphml_data(record,"edge",stream)
+        stream.write("</edge>\n")
+
+    stream.write("</graph>\n</graphml>\n")
+
+def write_graphml_data(record,key_for,stream):
+    for key_id,for_element,field,_ in GRAPHML_KEYS:
+        value = record.get(field)
+        if for_element != key_for or value is None or value == "":
+            continue
+        if isinstance(value,bool):
+            value = str(value).lower()
+        elif isinstance(value,list):
+            value = " ".join(value)
+        stream.write(f'<data key="{key_id}">{escape(str(value))}</data>')
+
+def write_mermaid(graph,stream):
+    '''
+    Write the graph as a Mermaid flowchart, with the clusters of a
+    summarized graph as subgraphs. Node IDs can't hold all of the
+    characters that resource IDs do, so the nodes are numbered, in order.
+    '''
+    node_ids = {node.get_name(): f"n{i}" for i,node in enumerate(graph.get_nodes())}
+    stream.write(f"flowchart {graph.attributes.get('rankdir','LR')}\n")
+
+    written_node_names = set()
+    subgraph_count = [0]
+
+    def write_subgraph(subgraph,indent):
+        stream.write(f'{indent}subgraph s{subgraph_count[0]} ["{format_mermaid_label(subgraph.attributes.get("label",""))}"]\n')
+        subgraph_count[0] += 1
+        for child_subgraph in subgraph.get_subgraphs():
+            write_subgraph(child_subgraph,indent + "  ")
+        for node_name in subgraph.get_node_names():
+            node = graph.get_node(node_name)
+            if node is not None and node_name not in written_node_names:
+                written_node_names.add(node_name)
+                write_mermaid_node(node,node_ids,indent + "  ",stream)
+        stream.write(f"{indent}end\n")
+
+    for subgraph in graph.get_subgraphs():
+        write_subgraph(subgraph,"  ")
+    for node in graph.get_nodes():
+        if node.get_name() not in written_node_names:
+            write_mermaid_node(node,node_ids,"  ",stream)
+
+    for edge in graph.get_edges():
+        source = node_ids.get(edge.get_source())
+        destination = node_ids.get(edge.get_destination())
+        if source is None or destination is None:
+            continue
+        arrow = "-->" if edge.attributes.get("dir") != "none" else "---"
+        label = edge.attributes.get("label","")
+        if label != "":
+            arrow += f'|"{format_mermaid_label(label)}"|'
+        stream.write(f"  {source} {arrow} {destination}\n")
+
+def write_mermaid_node(node,node_ids,indent,stream):
+    opening,closing = MERMAID_SHAPES.get(node.attributes.get("shape"),('["','"]'))
+    label = format_mermaid_label(node.attributes.get("label",node.get_name()))
+    stream.write(f"{indent}{node_ids[node.get_name()]}{opening}{label}{closing}\n")
+
+def format_mermaid_label(label):
+    '''
+    A label as Mermaid text in quotes: line breaks as <br/>, and quotes and
+    angle brackets as entity codes.
+    '''
+    label = str(label).replace("#","#35;").replace('"',"#quot;").replace("<","#lt;").replace(">","#gt;")
+    return label.replace("\n","<br/>")
+
+# Exporting -----------------------------------------------------------
+
+# Output file extensions, and the writer of each.
+EXPORT_FORMATS = {
+    ".json": write_json,
+    ".ndjson": write_ndjson,
+    ".graphml": write_graphml,
+    ".mmd": write_mermaid,
+}
+
+def export_graph(graph,filenames):
+    '''
+    Write the graph to one or more files, the format of each being
+    determined by its extension (see EXPORT_FORMATS).
+    '''
+    for filename in filenames:
+        extension = os.path.splitext(filename)[1]
+        if extension not in EXPORT_FORMATS:
+            raise VpcDiagramError(f"unsupported file type: {extension}")
+        try:
+            with open(filename,"w",encoding="utf-8") as f:
+                EXPORT_FORMATS[extension](graph,f)
+        except OSError as e:
+            raise VpcDiagramError(f"cannot write {filename}: {e}")
@@ -0,0 +1,201 @@
+'''
+Follow a VPC's peering connections and transit gateway attachments to the
+VPCs at the other end, which may be in other regions and, through named or
+assume-role profiles, other accounts.
+
+The VPCs found at each hop are grouped by account and region. Each group has
+its own EC2 client and worker pool, and the groups are collected
+concurrently.
+'''
+
+import concurrent.futures
+
+from .collect import (
+    DEFAULT_MAX_WORKERS, create_ec2_client, describe_by_ids,
+    collect_vpc_snapshot, collect_region_snapshots,
+)
+
+# RoleSessionName for assumed roles, as seen in CloudTrail.
+ROLE_SESSION_NAME = "vpc-network-diagram"
+
+class ClientPool:
+    '''
+    EC2 clients by (account ID, region), all created from the home session.
+    Another account's clients come from its profile in account_profiles
+    ({account_id: profile name}), or else from assuming role_name in that
+    account. client_factory, if given, creates the client for a session
+    (e.g. to add the response cache).
+    '''
+    def __init__(self,session,account_profiles=None,role_name=None,client_factory=create_ec2_client):
+        self._session = session
+        self._account_profiles = account_profiles or {}
+        self._role_name = role_name
+        self._client_factory = client_factory
+        self._home_account_id = None
+        self._account_credentials = {}
+        self._clients = {}
+
+    def get_home_region(self):
+        return self._session.region_name
+
+    def get_home_account_id(self):
+        if self._home_account_id is None:
+            self._home_account_id = self._session.client("sts").get_caller_identity()["Account"]
+        return self._home_account_id
+
+    def can_access(self,account_id):
+        return account_id == self.get_home_account_id() \
+            or account_id in self._account_profiles or self._role_name is not None
+
+    def get_client(self,account_id,region):
+        '''
+        The client for the account and region, created on first use. Not
+        thread safe: get the clients before handing them to workers.
+        '''
+        key = (account_id,region)
+        if key not in self._clients:
+            self._clients[key] = self._client_factory(self._create_session(account_id,region))
+        return self._clients[key]
+
+    def _create_session(self,account_id,region):
+        import boto3
+
+        if account_id == self.get_home_account_id():
+            credentials = self._session.get_credentials().get_frozen_credentials()
+            return boto3.session.Session(
+                aws_access_key_id=credentials.access_key,
+                aws_secret_access_key=credentials.secret_key,
+                aws_session_token=credentials.token,
+                region_name=region)
+
+        if account_id in self._account_profiles:
+            return boto3.session.Session(profile_name=self._account_profiles[account_id],region_name=region)
+
+        if account_id not in self._account_credentials:
+            response = self._session.client("sts").assume_role(
+                RoleArn=f"arn:aws:iam::{account_id}:role/{self._role_name}",
+                RoleSessionName=ROLE_SESSION_NAME)
+            self._account_credentials[account_id] = response["Credentials"]
+        credentials = self._account_credentials[account_id]
+        return boto3.session.Session(
+            aws_access_key_id=credentials["AccessKeyId"],
+            aws_secret_access_key=credentials["SecretAccessKey"],
+            aws_session_token=credentials["SessionToken"],
+            region_name=region)
+
+def get_linked_vpcs(snapshot,region=None):
+    '''
+    The VPCs that the snapshot's VPC is connected to by an active peering
+    connection or a shared transit gateway, as a list of (VPC ID, account
+    ID, region). Transit gateway attachments are in the transit gateway's
+    region, which is the snapshot's region.
+    '''
+    linked_vpcs = []
+
+    for key,remote_key in [("AccepterVpcPeeringConnections","RequesterVpcInfo"),("RequesterVpcPeeringConnections","AccepterVpcInfo")]:
+        for vpc_peering_connection_description in snapshot[key]:
+            if vpc_peering_connection_description.get("Status",{}).get("Code") != "active":
+                continue
+            remote_vpc_info = vpc_peering_connection_description[remote_key]
+            linked_vpcs.append((remote_vpc_info["VpcId"],remote_vpc_info.get("OwnerId"),remote_vpc_info.get("Region",region)))
+
+    for transit_gateway_attachment_description in snapshot["TransitGatewayAttachments"]:
+        if transit_gateway_attachment_description["ResourceType"] != "vpc" \
+            or transit_gateway_attachment_description.get("State") != "available":
+            continue
+        linked_vpcs.append((transit_gateway_attachment_description["ResourceId"],
+            transit_gateway_attachment_description.get("ResourceOwnerId"),region))
+
+    return linked_vpcs
+
+def follow_links(client_pool,snapshots,depth,max_workers=DEFAULT_MAX_WORKERS,include_security=False,
+        include_interfaces=False):
+    '''
+    Collect the snapshots of the VPCs linked to the given snapshots' VPCs,
+    and of the VPCs linked to those, up to depth hops away. The snapshots
+    are assumed to be from the pool's home region. Returns a tuple of
+    ({vpc_id: snapshot} including the given ones, {vpc_id: reason} for the
+    linked VPCs that couldn't be collected). include_security also collects
+    the linked VPCs' network ACLs and security groups, and
+    include_interfaces the counts of their network interfaces.
+    '''
+    import botocore.exceptions
+
+    snapshots = dict(snapshots)
+    regions = {vpc_id: client_pool.get_home_region() for vpc_id in snapshots}
+    skipped = {}
+    frontier = list(snapshots)
+
+    for _ in range(depth):
+        groups = {}
+        for vpc_id in frontier:
+            for linked_vpc_id,account_id,region in get_linked_vpcs(snapshots[vpc_id],regions[vpc_id]):
+                if linked_vpc_id in snapshots or linked_vpc_id in skipped:
+                    continue
+                vpc_ids = groups.setdefault((account_id,region),[])
+                if linked_vpc_id not in vpc_ids:
+                    vpc_ids.append(linked_vpc_id)
+        if len(groups) == 0:
+            break
+
+        calls = {}
+        for (account_id,region),vpc_ids in groups.items():
+            if not client_pool.can_access(account_id):
+                for vpc_id in vpc_ids:
+                    skipped[vpc_id] = f"no profile or role for account {account_id}"
+                continue
+            try:
+                calls[(account_id,region)] = (collect_linked_vpcs,
+                    client_pool.get_client(account_id,region),vpc_ids,max_workers,include_security,include_interfaces)
+            except (botocore.exceptions.BotoCoreError,botocore.exceptions.ClientError) as e:
+                for vpc_id in vpc_ids:
+                    skipped[vpc_id] = str(e)
+
+        frontier = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(calls),1)) as executor:
+            futures = {key: executor.submit(*call) for key,call in calls.items()}
+            for (account_id,region),future in futures.items():
+                try:
+                    group_snapshots = future.result()
+                except (botocore.exceptions.BotoCoreError,botocore.exceptions.ClientError) as e:
+                    group_snapshots = {}
+                    for vpc_id in groups[(account_id,region)]:
+                        skipped[vpc_id] = str(e)
+                for vpc_id in groups[(account_id,region)]:
+                    if vpc_id in group_snapshots:
+                        snapshots[vpc_id] = group_snapshots[vpc_id]
+                        regions[vpc_id] = region
+                        frontier.append(vpc_id)
+                    elif vpc_id not in skipped:
+                        skipped[vpc_id] = f"VPC not found in account {account_id} region {region}"
+
+    return snapshots,skipped
+
+def collect_linked_vpcs(ec2_client,vpc_ids,max_workers=DEFAULT_MAX_WORKERS,include_security=False,
+        include_interfaces=False):
+    '''
+    Collect the snapshots of the listed VPCs, in one account and region.
+    Returns a dict of {vpc_id: snapshot} for those that were found.
+    '''
+    vpc_descriptions = describe_by_ids(ec2_client,"describe_vpcs","Vpcs","vpc-id",vpc_ids)
+    if len(vpc_descriptions) == 1:
+        return {vpc_descriptions[0]["VpcId"]: collect_vpc_snapshot(ec2_client,vpc_descriptions[0],max_workers,
+            include_security,include_interfaces)}
+    return collect_region_snapshots(ec2_client,vpc_descriptions,max_workers,include_security,include_interfaces)
+
+def follow_recorded_links(recorded_snapshots,snapshots,depth):
+    '''
+    The snapshot file counterpart of follow_links(): add the recorded
+    snapshots of the VPCs up to depth hops from the given snapshots' VPCs.
+    '''
+    snapshots = dict(snapshots)
+    frontier = list(snapshots)
+    for _ in range(depth):
+        next_frontier = []
+        for vpc_id in frontier:
+            for linked_vpc_id,_,_ in get_linked_vpcs(snapshots[vpc_id]):
+                if linked_vpc_id in recorded_snapshots and linked_vpc_id not in snapshots:
+                    snapshots[linked_vpc_id] = recorded_snapshots[linked_vpc_id]
+                    next_frontier.append(linked_vpc_id)
+        frontier = next_frontier
+    return snapshots
@@ -0,0 +1,449 @@
+'''
+Draw the traffic recorded in VPC Flow Log files on the diagram's edges:
+bytes and packets from each subnet to its route table, and from each route
+table to the targets the traffic was routed to.
+
+The files, text (as delivered to S3, optionally gzip'd) or Parquet, are
+read in chunks of lines or rows, so memory use doesn't grow with their
+size. Each chunk's records are summed per pair of addresses first, and each
+pair is then mapped to the edges it crossed: an address in one of the
+VPCs' subnets takes the subnet's route table and, through its longest
+matching route to the other address, the route's target. Both are looked
+up by binary search, over the CIDR blocks flattened in to sorted ranges of
+addresses. Traffic between subnets of the same VPC goes by the local route,
+which isn't drawn, so it isn't counted. The files (and the row groups of
+Parquet files) are shared out to a pool of worker processes, each
+returning its totals per edge.
+
+Records are summed as logged, so a flow logged by more than one network
+interface (e.g. the instance's and the NAT gateway's) counts for each.
+'''
+
+import bisect
+import concurrent.futures
+import gzip
+import math
+import operator
+import socket
+
+from .errors import VpcDiagramError
+from .query import RouteQueryEngine
+
+try:
+    import pyarrow.parquet as parquet
+except ImportError:
+    parquet = None
+
+# The fields of the default flow log format, used for text files without a
+# header line.
+DEFAULT_FLOW_LOG_FIELDS = ["version","account-id","interface-id","srcaddr","dstaddr","srcport","dstport",
+    "protocol","packets","bytes","start","end","action","log-status"]
+FLOW_LOG_COLUMNS = ["srcaddr","dstaddr","packets","bytes","action"]
+
+# Text is read this many bytes of lines at a time, Parquet this many rows.
+CHUNK_BYTES = 1024 * 1024
+CHUNK_ROWS = 65536
+
+# Addresses (and pairs of addresses) resolved to subnets (and edges) are
+# remembered, until there are this many.
+RESOLVED_CACHE_SIZE = 65536
+
+GZIP_MAGIC = b"\x1f\x8b"
+PARQUET_MAGIC = b"PAR1"
+
+# Values of records without traffic: rejected, or without data.
+REJECTED_ACTIONS = frozenset(["REJECT",b"REJECT"])
+MISSING_VALUES = frozenset([None,"-",b"-"])
+
+# Edge widths range from 1 for the least traffic to this for the most.
+MAX_TRAFFIC_PENWIDTH = 8.0
+
+# Units of the counts in edge labels, each 1024 (or 1000) of the last
+BYTE_UNITS = ["B","KB","MB","GB","TB","PB"]
+PACKET_UNITS = ["packets","k packets","M packets","G packets","T packets"]
+
+class CidrIndex:
+    '''
+    Longest prefix matching of addresses (as ints) by binary search. The
+    CIDR blocks, which nest or are disjoint, are flattened in to sorted
+    ranges of addresses, each with the value of the longest block covering
+    it, or None. Blocks for the same network are ranked as routes are in a
+    PrefixTrie (see query.py).
+    '''
+    __slots__ = ("_starts","_values")
+
+    def __init__(self,blocks):
+        '''
+        blocks is a list of (ipaddress network, value, rank), all of one
+        address family. Of the values for the same network, the one with the
+        lowest rank is used, and of those, the last.
+        '''
+        self._starts = []
+        self._values = []
+
+        # Widest first at each start, and for the same network the preferred
+        # value last, so that it is innermost; the open blocks are on the
+        # stack, the innermost last, as (last address, value).
+        order = sorted(range(len(blocks)),key=lambda i: (int(blocks[i][0].network_address),
+            blocks[i][0].prefixlen,-blocks[i][2]))
+        open_blocks = []
+        for i in order:
+            network,value,_ = blocks[i]
+            start = int(network.network_address)
+            while len(open_blocks) > 0 and open_blocks[-1][0] < start:
+                self._close(open_blocks)
+            self._add_range(start,value)
+            open_blocks.append((int(network.broadcast_address),value))
+        while len(open_blocks) > 0:
+            self._close(open_blocks)
+
+    def _close(self,open_blocks):
+        last_address,_ = open_blocks.pop()
+        self._add_range(last_address + 1,open_blocks[-1][1] if len(open_blocks) > 0 else None)
+
+    def _add_range(self,start,value):
+        if len(self._starts) > 0 and self._starts[-1] == start:
+            self._values[-1] = value
+        else:
+            self._starts.append(start)
+            self._values.append(value)
+
+    def lookup(self,address):
+        i = bisect.bisect_right(self._starts,address) - 1
+        return self._values[i] if i >= 0 else None
+
+class TrafficIndex:
+    '''
+    Maps the addresses of flow log records to the edges their traffic
+    crossed, from the VpcModels of the VPCs drawn (see model.py): a
+    CidrIndex of the subnets, and one of each route table's routes.
+    '''
+    def __init__(self,vpc_models):
+        subnet_blocks = {4: [], 6: []}
+        self._subnet_route_table_ids = {}
+        self._route_indexes = {}
+        for vpc_model in vpc_models:
+            vpc_id = vpc_model.vpc.vpc_id
+            route_query_engine = RouteQueryEngine(vpc_model)
+            for subnet in vpc_model.subnets:
+                self._subnet_route_table_ids[subnet.subnet_id] = route_query_engine.get_route_table_id(subnet.subnet_id)
+                for cidr_block in subnet.cidr_blocks:
+                    if not isinstance(cidr_block,str):
+                        subnet_blocks[cidr_block.version].append((cidr_block,(subnet.subnet_id,vpc_id),0))
+
+            for route_table in vpc_model.route_tables:
+                route_blocks = {4: [], 6: []}
+                for network,result,rank in route_query_engine.get_routes(route_table.route_table_id):
+                    route_blocks[network.version].append((network,result,rank))
+                self._route_indexes[route_table.route_table_id] = {version: CidrIndex(blocks)
+                    for version,blocks in route_blocks.items()}
+
+        self._subnet_indexes = {version: CidrIndex(blocks) for version,blocks in subnet_blocks.items()}
+        self._addresses = {}
+        self._edges = {}
+
+    def __getstate__(self):
+        # The caches aren't worth sending to a worker
+        return (self._subnet_route_table_ids,self._route_indexes,self._subnet_indexes)
+
+    def __setstate__(self,state):
+        self._subnet_route_table_ids,self._route_indexes,self._subnet_indexes = state
+        self._addresses = {}
+        self._edges = {}
+
+    def get_address(self,address):
+        '''
+        The address as (version, int, (subnet ID, VPC ID) or None), or None
+        if it isn't an address.
+        '''
+        if address in self._addresses:
+            return self._addresses[address]
+        if len(self._addresses) >= RESOLVED_CACHE_SIZE:
+            self._addresses.clear()
+
+        parsed_address = parse_address(address)
+        if parsed_address is not None:
+            version,number = parsed_address
+            parsed_address = (version,number,self._subnet_indexes[version].lookup(number))
+        self._addresses[address] = parsed_address
+        return parsed_address
+
+    def get_edges(self,source,destination):
+        '''
+        The edges, as (node name, node name), crossed by traffic between
+        two addresses, on the way out of the source's subnet and in to the
+        destination's.
+        '''
+        key = (source,destination)
+        if key in self._edges:
+            return self._edges[key]
+        if len(self._edges) >= RESOLVED_CACHE_SIZE:
+            self._edges.clear()
+
+        edges = []
+        source_address = self.get_address(source)
+        destination_address = self.get_address(destination)
+        if source_address is not None and destination_address is not None:
+            for address,other_address in [(source_address,destination_address),(destination_address,source_address)]:
+                subnet = address[2]
+                if subnet is None:
+                    continue
+                if other_address[2] is not None and other_address[2][1] == subnet[1]:
+                    continue
+                edges.extend(self._get_route_edges(subnet[0],other_address))
+
+        self._edges[key] = edges
+        return edges
+
+    def _get_route_edges(self,subnet_id,address):
+        '''
+        The edges from the subnet to its route table, and on to the target
+        of the route to the address, unless it is dropped there.
+        '''
+        route_table_id = self._subnet_route_table_ids[subnet_id]
+        if route_table_id is None:
+            return []
+        edges = [(subnet_id,route_table_id)]
+
+        version,number,_ = address
+        route = self._route_indexes[route_table_id][version].lookup(number)
+        if route is not None and route["Target"] not in (None,"local") and route["State"] != "blackhole":
+            edges.append((route_table_id,route["Target"]))
+        return edges
+
+def parse_address(address):
+    '''
+    An IPv4 or IPv6 address from a flow log record as (version, int), or
+    None if it isn't one.
+    '''
+    if isinstance(address,bytes):
+        address = address.decode("ascii",errors="replace")
+    for version,family in [(4,socket.AF_INET),(6,socket.AF_INET6)]:
+        try:
+            return version,int.from_bytes(socket.inet_pton(family,address),"big")
+        except (OSError,ValueError):
+            pass
+    return None
+
+# Reading -------------------------------------------------------------
+
+def get_flow_log_tasks(filenames):
+    '''
+    Split the files in to units of work for the workers, as a list of
+    (filename, Parquet row group or None for a text file).
+    '''
+    tasks = []
+    for filename in filenames:
+        try:
+            with open(filename,"rb") as f:
+                is_parquet = f.read(len(PARQUET_MAGIC)) == PARQUET_MAGIC
+            if not is_parquet:
+                tasks.append((filename,None))
+                continue
+            if parquet is None:
+                raise VpcDiagramError(f"reading the Parquet flow log file {filename} needs the pyarrow module")
+            for row_group in range(parquet.ParquetFile(filename).num_row_groups):
+                tasks.append((filename,row_group))
+        except OSError as e:
+            raise VpcDiagramError(f"cannot read flow log file {filename}: {e}")
+    return tasks
+
+def read_text_records(stream,filename):
+    '''
+    Generate the records of a text flow log, a chunk at a time, each a list
+    of (srcaddr, dstaddr, packets, bytes, action) as bytes. A header line,
+    if there is one, gives the positions of the fields.
+    '''
+    first_line = stream.readline()
+    fields = first_line.decode("utf-8",errors="replace").split()
+    has_header = "srcaddr" in fields
+    if not has_header:
+        fields = DEFAULT_FLOW_LOG_FIELDS
+    missing_fields = [field for field in FLOW_LOG_COLUMNS if field not in fields and field != "action"]
+    if len(missing_fields) > 0:
+        raise VpcDiagramError(f"flow log file {filename} has no {', '.join(missing_fields)} field")
+
+    # Without an action field every record counts: the source address,
+    # which is never REJECT, stands in for it.
+    indexes = [fields.index(field if field in fields else "srcaddr") for field in FLOW_LOG_COLUMNS]
+    get_columns = operator.itemgetter(*indexes)
+    field_count = max(indexes) + 1
+
+    # Read in blocks, which is quicker than by line, carrying the partial
+    # line at the end of each block over to the next.
+    partial_line = b"" if has_header else first_line
+    while True:
+        block = stream.read(CHUNK_BYTES)
+        if len(block) == 0:
+            lines = [partial_line]
+        else:
+            lines = (partial_line + block).split(b"\n")
+            partial_line = lines.pop()
+        rows = [line.split() for line in lines]
+        yield [get_columns(row) for row in rows if len(row) >= field_count]
+        if len(block) == 0:
+            return
+
+def read_parquet_records(filename,row_group):
+    '''
+    Generate the records of one row group of a Parquet flow log, a chunk at
+    a time, each a list of (srcaddr, dstaddr, packets, bytes, action).
+    '''
+    parquet_file = parquet.ParquetFile(filename)
+    names = parquet_file.schema_arrow.names
+    missing_fields = [field for field in FLOW_LOG_COLUMNS if field not in names and field != "action"]
+    if len(missing_fields) > 0:
+        raise VpcDiagramError(f"flow log file {filename} has no {', '.join(missing_fields)} column")
+
+    columns = [field for field in FLOW_LOG_COLUMNS if field in names]
+    for batch in parquet_file.iter_batches(batch_size=CHUNK_ROWS,row_groups=[row_group],columns=columns):
+        data = batch.to_pydict()
+        yield list(zip(data["srcaddr"],data["dstaddr"],data["packets"],data["bytes"],
+            data.get("action",[None] * batch.num_rows)))
+
+# Aggregation ---------------------------------------------------------
+
+def aggregate_flow_log(filename,row_group,traffic_index):
+    '''
+    Sum the traffic of a flow log file (or a Parquet row group) per edge,
+    as a dict of {(node name, node name): [bytes, packets]}.
+    '''
+    traffic = {}
+    try:
+        if row_group is not None:
+            for records in read_parquet_records(filename,row_group):
+                add_records(records,traffic_index,traffic)
+            return traffic
+
+        with open(filename,"rb") as raw:
+            is_compressed = raw.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+            raw.seek(0)
+            stream = gzip.GzipFile(fileobj=raw) if is_compressed else raw
+            for records in read_text_records(stream,filename):
+                add_records(records,traffic_index,traffic)
+    except (OSError,EOFError) as e:
+        raise VpcDiagramError(f"cannot read flow log file {filename}: {e}")
+    return traffic
+
+def add_records(records,traffic_index,traffic):
+    '''
+    Add a chunk of records to the traffic per edge. The records are summed
+    per pair of addresses first, so each pair is mapped to edges once.
+    '''
+    pairs = {}
+    for source,destination,packets,byte_count,action in records:
+        if action in REJECTED_ACTIONS or packets in MISSING_VALUES or byte_count in MISSING_VALUES:
+            continue
+        try:
+            byte_count = int(byte_count)
+            packets = int(packets)
+        except ValueError:
+            continue
+        totals = pairs.get((source,destination))
+        if totals is None:
+            pairs[(source,destination)] = [byte_count,packets]
+        else:
+            totals[0] += byte_count
+            totals[1] += packets
+
+    for (source,destination),(byte_count,packets) in pairs.items():
+        for edge_key in traffic_index.get_edges(source,destination):
+            totals = traffic.get(edge_key)
+            if totals is None:
+                traffic[edge_key] = [byte_count,packets]
+            else:
+                totals[0] += byte_count
+                totals[1] += packets
+
+def merge_traffic(traffic,more_traffic):
+    for edge_key,(byte_count,packets) in more_traffic.items():
+        totals = traffic.setdefault(edge_key,[0,0])
+        totals[0] += byte_count
+        totals[1] += packets
+
+_worker_traffic_index = None
+
+def _init_worker(traffic_index):
+    global _worker_traffic_index
+    _worker_traffic_index = traffic_index
+
+def _aggregate_in_worker(filename,row_group):
+    return aggregate_flow_log(filename,row_group,_worker_traffic_index)
+
+def aggregate_flow_logs(filenames,vpc_models,max_workers=None):
+    '''
+    Sum the traffic of the flow log files over the edges of the VPCs'
+    diagrams, as a dict of {(node name, node name): [bytes, packets]}, in a
+    pool of worker processes.
+    '''
+    traffic_index = TrafficIndex(vpc_models)
+    tasks = get_flow_log_tasks(filenames)
+
+    traffic = {}
+    if len(tasks) == 1 or max_workers == 1:
+        for filename,row_group in tasks:
+            merge_traffic(traffic,aggregate_flow_log(filename,row_group,traffic_index))
+        return traffic
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+            initializer=_init_worker,initargs=(traffic_index,)) as executor:
+        futures = [executor.submit(_aggregate_in_worker,filename,row_group) for filename,row_group in tasks]
+        for future in futures:
+            merge_traffic(traffic,future.result())
+    return traffic
+
+# Overlay -------------------------------------------------------------
+
+def add_traffic_overlay(graph,traffic):
+    '''
+    Draw the traffic on the graph's edges: wider for more bytes, by the
+    square root of their share of the most, and labeled with the bytes and
+    packets. Traffic of nodes collapsed by summarize_graph() is added up on
+    the nodes they became. Blackhole (red) edges carry no traffic.
+    '''
+    from .summarize import SummaryNode
+
+    collapsed_names = {}
+    for node in graph.get_nodes():
+        if isinstance(node,SummaryNode):
+            for member_name in node.get_member_names():
+                collapsed_names[member_name] = node.get_name()
+
+    edge_traffic = {}
+    for (source,destination),(byte_count,packets) in traffic.items():
+        edge_key = (collapsed_names.get(source,source),collapsed_names.get(destination,destination))
+        totals = edge_traffic.setdefault(edge_key,[0,0])
+        totals[0] += byte_count
+        totals[1] += packets
+
+    edges = {}
+    for edge in graph.get_edges():
+        edge_key = (edge.get_source(),edge.get_destination())
+        if edge_key in edge_traffic and edge_key not in edges and edge.attributes.get("color") != "red":
+            edges[edge_key] = edge
+    if len(edges) == 0:
+        return
+
+    max_bytes = max(edge_traffic[edge_key][0] for edge_key in edges)
+    for edge_key,edge in edges.items():
+        byte_count,packets = edge_traffic[edge_key]
+        penwidth = 1 + (MAX_TRAFFIC_PENWIDTH - 1) * math.sqrt(byte_count / max(max_bytes,1))
+        edge.attributes["penwidth"] = f"{penwidth:.1f}"
+
+        traffic_label = f"{format_count(byte_count,BYTE_UNITS,1024)}, {format_count(packets,PACKET_UNITS,1000)}"
+        label = edge.attributes.get("label")
+        edge.attributes["label"] = traffic_label if not label else f"{label}\n{traffic_label}"
+
+def format_count(count,units,base):
+    '''
+    A count in the largest of the units (1, base, base squared, ...) that it
+    is at least one of, e.g. "1.5 GB".
+    '''
+    value = float(count)
+    unit_index = 0
+    while value >= base and unit_index < len(units) - 1:
+        value /= base
+        unit_index += 1
+    if unit_index == 0:
+        return f"{count} {units[0]}"
+    return f"{value:.1f} {units[unit_index]}"
@@ -0,0 +1,300 @@
+'''
+Create the graph of a VPC from a snapshot of its descriptions.
+'''
+
+from .dot import Graph, Edge
+from .model import build_vpc_model
+from .nodes import (
+    VpcNode, SubnetNode, RouteTableNode, RouteTableIndex, NodeEdge,
+    InternetGatewayNode, EgressOnlyInternetGatewayNode, NatGatewayNode,
+    VpcPeeringConnectionNode, VpnGatewayNode, VpnConnectionNode,
+    TransitGatewayNode, RemoteNetworkNode, RemoteVpcNode, TheInternetNode,
+    CarrierGatewayNode, LocalGatewayNode, VpcEndpointNode,
+    NetworkInterfaceNode, InstanceNode, CoreNetworkNode, RouteTargetNode,
+    NetworkAclNode, SecurityGroupNode, RemoteSecurityGroupNode, is_security_group_reference,
+)
+
+# Route targets that aren't drawn with the gateways above: (snapshot key,
+# ID prefix, node class, ID key). The ID prefix picks the node class for
+# targets whose description wasn't collected.
+ROUTE_TARGET_TYPES = [
+    ("CarrierGateways","cagw-",CarrierGatewayNode,"CarrierGatewayId"),
+    ("LocalGateways","lgw-",LocalGatewayNode,"LocalGatewayId"),
+    ("VpcEndpoints","vpce-",VpcEndpointNode,"VpcEndpointId"),
+    ("NetworkInterfaces","eni-",NetworkInterfaceNode,"NetworkInterfaceId"),
+    (None,"i-",InstanceNode,"InstanceId"),
+    (None,"arn:",CoreNetworkNode,"CoreNetworkArn"),
+]
+
+# Edges from subnets to their network ACLs, and between security groups
+NETWORK_ACL_EDGE_ATTRIBUTES = {"style": "dotted", "color": "gray40", "dir": "none"}
+SECURITY_GROUP_EDGE_ATTRIBUTES = {"color": "royalblue", "fontcolor": "royalblue"}
+
+def build_graph(snapshot,show_internet=False,show_security=False):
+    '''
+    Create the graph for a VPC from a snapshot returned by
+    collect_vpc_snapshot(). No AWS API calls are made here, and the graph
+    keeps no references to the snapshot's descriptions. show_security adds
+    the network ACLs and security groups, if the snapshot has them.
+    '''
+    vpc_model = build_vpc_model(snapshot)
+
+    graph = Graph("vpc_network_graph", graph_type="graph", bgcolor="white", rankdir="LR")
+
+    # The Internet
+    if show_internet:
+        the_internet_node = TheInternetNode()
+        graph.add_node(the_internet_node)
+    else:
+        the_internet_node = None
+
+    # VPC
+    vpc_node = VpcNode(vpc_model.vpc)
+    graph.add_node(vpc_node)
+
+    # Subnets
+    subnet_nodes = []
+    for subnet in vpc_model.subnets:
+        subnet_node = SubnetNode(subnet)
+        subnet_nodes.append(subnet_node)
+        graph.add_node(subnet_node)
+        graph.add_edge(NodeEdge(vpc_node,subnet_node))
+
+    # Route Tables
+    route_table_nodes = []
+    for route_table in vpc_model.route_tables:
+        route_table_node = RouteTableNode(route_table)
+        route_table_nodes.append(route_table_node)
+        graph.add_node(route_table_node)
+    route_table_index = RouteTableIndex(route_table_nodes,vpc_model.prefix_list_names)
+
+    # Edges between Subnets and Route Tables. Any subnet without an explicit
+    # route-table association gets associated with the main route table.
+    for subnet_node in subnet_nodes:
+        route_table_node = route_table_index.get_route_table_node_for_subnet(subnet_node.get_name())
+        if route_table_node is not None:
+            graph.add_edge(NodeEdge(subnet_node,route_table_node))
+
+    # Network ACLs and Security Groups
+    if show_security:
+        add_network_acl_nodes(graph,vpc_model.network_acls,subnet_nodes)
+        add_security_group_nodes(graph,vpc_model.security_groups)
+
+    # Internet Gateways
+    for internet_gateway_description in snapshot["InternetGateways"]:
+        internet_gateway_node = InternetGatewayNode(internet_gateway_description)
+        graph.add_node(internet_gateway_node)
+        internet_gateway_node.add_route_table_edges(graph,route_table_index)
+        if the_internet_node is not None:
+            graph.add_edge(NodeEdge(internet_gateway_node,the_internet_node))
+
+    # Egress-Only Internet Gateways
+    for egress_only_internet_gateway_description in snapshot["EgressOnlyInternetGateways"]:
+        egress_only_internet_gateway_node = EgressOnlyInternetGatewayNode(egress_only_internet_gateway_description)
+        graph.add_node(egress_only_internet_gateway_node)
+        egress_only_internet_gateway_node.add_route_table_edges(graph,route_table_index)
+        if the_internet_node is not None:
+            graph.add_edge(NodeEdge(egress_only_internet_gateway_node,the_internet_node))
+
+    # NAT Gateways
+    for nat_gateway_description in snapshot["NatGateways"]:
+        nat_gateway_node = NatGatewayNode(nat_gateway_description)
+        graph.add_node(nat_gateway_node)
+        nat_gateway_node.add_route_table_edges(graph,route_table_index)
+        if the_internet_node is not None:
+            graph.add_edge(NodeEdge(nat_gateway_node,the_internet_node))
+
+    # VPC Peering Connections
+    for key,is_requester in [("AccepterVpcPeeringConnections",False),("RequesterVpcPeeringConnections",True)]:
+        for vpc_peering_connections_description in snapshot[key]:
+            vpc_peering_connection_node = VpcPeeringConnectionNode(vpc_peering_connections_description,is_requester=is_requester)
+            graph.add_node(vpc_peering_connection_node)
+            vpc_peering_connection_node.add_route_table_edges(graph,route_table_index)
+            remote_vpc_node = vpc_peering_connection_node.get_remote_vpc_node()
+            graph.add_node(remote_vpc_node)
+            graph.add_edge(NodeEdge(vpc_peering_connection_node,remote_vpc_node))
+
+    # VPN Gateways
+    for vpn_gateway_description in snapshot["VpnGateways"]:
+        vpn_gateway_node = VpnGatewayNode(vpn_gateway_description)
+        graph.add_node(vpn_gateway_node)
+        vpn_gateway_node.add_route_table_edges(graph,route_table_index)
+        for vpn_connection_description in snapshot["VpnConnections"]:
+            if vpn_connection_description.get("VpnGatewayId") != vpn_gateway_node.get_name():
+                continue
+            vpn_connection_node = VpnConnectionNode(vpn_connection_description)
+            graph.add_node(vpn_connection_node)
+            graph.add_edge(NodeEdge(vpn_gateway_node,vpn_connection_node))
+
+    # Transit Gateways
+    for transit_gateway_description in snapshot["TransitGateways"]:
+        transit_gateway_node = TransitGatewayNode(transit_gateway_description)
+        graph.add_node(transit_gateway_node)
+        transit_gateway_node.add_route_table_edges(graph,route_table_index)
+        for transit_gateway_attachment_description in snapshot["TransitGatewayAttachments"]:
+            if transit_gateway_attachment_description["TransitGatewayId"] != transit_gateway_node.get_name():
+                continue
+            remote_network_node = RemoteNetworkNode(transit_gateway_attachment_description)
+            graph.add_node(remote_network_node)
+            graph.add_edge(NodeEdge(transit_gateway_node,remote_network_node))
+
+    # Every other route target: carrier gateways, VPC endpoints, network
+    # interfaces and instances, local gateways, core networks, and targets
+    # that no longer exist.
+    target_nodes = {}
+    for snapshot_key,_,node_class,id_key in ROUTE_TARGET_TYPES:
+        if snapshot_key is None:
+            continue
+        for target_description in snapshot.get(snapshot_key,[]):
+            target_nodes[target_description[id_key]] = (node_class,target_description)
+
+    for target_id in route_table_index.get_target_ids():
+        if graph.get_node(target_id) is not None:
+            continue
+        route_target_node = create_route_target_node(target_id,target_nodes)
+        graph.add_node(route_target_node)
+        route_target_node.add_route_table_edges(graph,route_table_index)
+
+    return graph
+
+def add_network_acl_nodes(graph,network_acls,subnet_nodes):
+    '''
+    Add one node per distinct rule set of the network ACLs associated with
+    subnets, shared by the ACLs having those rules, and an edge from each
+    subnet to its ACL's node, found through a map of {subnet ID: node}.
+    '''
+    rule_sets = {}
+    for network_acl in network_acls:
+        if len(network_acl.subnet_ids) > 0:
+            rule_sets.setdefault(network_acl.rules,[]).append(network_acl)
+
+    subnet_network_acl_nodes = {}
+    for rule_set_network_acls in rule_sets.values():
+        network_acl_node = NetworkAclNode(rule_set_network_acls)
+        graph.add_node(network_acl_node)
+        for network_acl in rule_set_network_acls:
+            for subnet_id in network_acl.subnet_ids:
+                subnet_network_acl_nodes[subnet_id] = network_acl_node
+
+    for subnet_node in subnet_nodes:
+        network_acl_node = subnet_network_acl_nodes.get(subnet_node.get_name())
+        if network_acl_node is not None:
+            graph.add_edge(NodeEdge(subnet_node,network_acl_node,**NETWORK_ACL_EDGE_ATTRIBUTES))
+
+def add_security_group_nodes(graph,security_groups):
+    '''
+    Add one node per distinct rule set of the security groups, shared by the
+    groups having those rules, and the references between them as edges in
+    the direction of the traffic they allow: one edge per pair of nodes and
+    direction, labeled with the protocols and ports.
+    '''
+    rule_sets = {}
+    for security_group in security_groups:
+        rule_sets.setdefault(security_group.rules,[]).append(security_group)
+
+    security_group_nodes = {}
+    for rule_set_security_groups in rule_sets.values():
+        security_group_node = SecurityGroupNode(rule_set_security_groups)
+        graph.add_node(security_group_node)
+        for security_group in rule_set_security_groups:
+            security_group_nodes[security_group.group_id] = security_group_node
+
+    references = {}
+    for rules,rule_set_security_groups in rule_sets.items():
+        security_group_node = security_group_nodes[rule_set_security_groups[0].group_id]
+        for rule in rules:
+            if not is_security_group_reference(rule):
+                continue
+            direction,protocol,ports,peer = rule
+            peer_node = security_group_nodes.get(peer)
+            if peer_node is None:
+                peer_node = RemoteSecurityGroupNode(peer)
+                graph.add_node(peer_node)
+                security_group_nodes[peer] = peer_node
+
+            if direction == "in":
+                source_node,destination_node = peer_node,security_group_node
+            else:
+                source_node,destination_node = security_group_node,peer_node
+            key = (source_node.get_name(),destination_node.get_name())
+            if key not in references:
+                references[key] = (source_node,destination_node,{})
+            # A dict, as an ordered set
+            references[key][2][protocol if ports == "" else f"{protocol}/{ports}"] = None
+
+    for source_node,destination_node,port_labels in references.values():
+        graph.add_edge(NodeEdge(source_node,destination_node,label=",".join(port_labels),**SECURITY_GROUP_EDGE_ATTRIBUTES))
+
+def create_route_target_node(target_id,target_nodes):
+    '''
+    Create the node for a route target, from its description if it was
+    collected, otherwise by the form of its ID. target_nodes is a dict of
+    {target_id: (node class, description)}.
+    '''
+    if target_id in target_nodes:
+        node_class,target_description = target_nodes[target_id]
+        return node_class(target_description)
+
+    for _,id_prefix,node_class,id_key in ROUTE_TARGET_TYPES:
+        if target_id.startswith(id_prefix):
+            return node_class({id_key: target_id})
+
+    return RouteTargetNode({"TargetId": target_id})
+
+def build_stitched_graph(snapshots,show_internet=False,show_security=False):
+    '''
+    Create one graph of several VPCs from a dict of {vpc_id: snapshot}.
+    Resources the VPCs share (peering connections, transit gateways, the
+    Internet) are drawn once, and a peered or transit gateway attached VPC
+    that is in the snapshots is drawn in full in place of its Remote VPC or
+    Remote Network box, as are the security groups of those VPCs that are
+    referred to by the others' rules.
+    '''
+    graph = Graph("vpc_network_graph", graph_type="graph", bgcolor="white", rankdir="LR")
+
+    # The attachments of the VPCs being drawn are covered by their own
+    # transit gateway edges.
+    replaced_node_names = set()
+    for snapshot in snapshots.values():
+        for transit_gateway_attachment_description in snapshot["TransitGatewayAttachments"]:
+            if transit_gateway_attachment_description["ResourceType"] == "vpc" \
+                and transit_gateway_attachment_description["ResourceId"] in snapshots:
+                replaced_node_names.add(transit_gateway_attachment_description["TransitGatewayAttachmentId"])
+
+    vpc_graphs = [build_graph(snapshot,show_internet=show_internet,show_security=show_security)
+        for snapshot in snapshots.values()]
+
+    # The nodes of the security groups being drawn, by group ID (a node can
+    # stand for several groups).
+    security_group_node_names = {}
+    for vpc_graph in vpc_graphs:
+        for node in vpc_graph.get_nodes():
+            if isinstance(node,SecurityGroupNode):
+                for group_id in node.get_group_ids():
+                    security_group_node_names[group_id] = node.get_name()
+
+    edge_keys = set()
+    for vpc_graph in vpc_graphs:
+        for node in vpc_graph.get_nodes():
+            if node.get_name() in replaced_node_names:
+                continue
+            if isinstance(node,RemoteVpcNode) and node.get_name() in snapshots:
+                continue
+            if isinstance(node,RemoteSecurityGroupNode) and node.get_name() in security_group_node_names:
+                continue
+            if graph.get_node(node.get_name()) is None:
+                graph.add_node(node)
+
+        for edge in vpc_graph.get_edges():
+            if edge.get_source() in replaced_node_names or edge.get_destination() in replaced_node_names:
+                continue
+            source = security_group_node_names.get(edge.get_source(),edge.get_source())
+            destination = security_group_node_names.get(edge.get_destination(),edge.get_destination())
+            if (source,destination) != (edge.get_source(),edge.get_destination()):
+                edge = Edge(source,destination,**edge.attributes)
+            edge_key = (source,destination,tuple(sorted(edge.attributes.items())))
+            if edge_key not in edge_keys:
+                edge_keys.add(edge_key)
+                graph.add_edge(edge)
+
+    return graph
@@ -0,0 +1,186 @@
+'''
+Split the graph of a large VPC in to a small overview and a detail diagram
+per availability zone, so that the overview is laid out and rendered
+quickly whatever the number of subnets, and the zones can be drawn in
+parallel, or only when they are asked for.
+
+The overview has everything but the subnets: the VPC, the route tables and
+the gateways and connections they route to. The subnets of each
+availability zone are replaced by one placeholder node, whose URL (a
+hyperlink in SVG output) is the zone's detail diagram. A detail diagram
+has the zone's subnets and the nodes they are connected to (the VPC, their
+route tables and network ACLs), with the VPC linking back to the overview.
+'''
+
+import glob
+import os.path
+import re
+
+from .dot import Graph, Node, Edge
+from .nodes import VpcNode, SubnetNode
+
+# The placeholder name of the zone of subnets that have none, e.g. those
+# that a Terraform plan hasn't created yet.
+NO_AVAILABILITY_ZONE = "no-az"
+
+# Availability zone names, e.g. us-west-2a or us-west-2-lax-1a, and
+# NO_AVAILABILITY_ZONE.
+AVAILABILITY_ZONE_PATTERN = re.compile(r"[a-z]{2}(-[a-z0-9]+)+")
+
+AVAILABILITY_ZONE_NODE_ATTRIBUTES = {"shape": "folder", "style": "filled", "fillcolor": "lightyellow"}
+
+# The file type that detail diagrams are linked as, if it is being written;
+# only SVG (and PDF) output has hyperlinks.
+LINKED_FILE_TYPES = [".svg",".pdf"]
+
+class AvailabilityZoneNode(Node):
+    '''
+    The placeholder of an availability zone's subnets in the overview, with
+    the names of their nodes.
+    '''
+    __slots__ = ("_subnet_names",)
+
+    def __init__(self,availability_zone,subnet_names,**attributes):
+        Node.__init__(self,get_availability_zone_node_name(availability_zone),**attributes)
+        self._subnet_names = subnet_names
+
+    def get_subnet_names(self):
+        return list(self._subnet_names)
+
+def get_availability_zones(graph):
+    '''
+    The subnets of the graph by availability zone, as a dict of
+    {availability zone: [subnet node name, ...]}, sorted by zone.
+    '''
+    availability_zones = {}
+    for node in graph.get_nodes():
+        if isinstance(node,SubnetNode):
+            availability_zone = node.get_subnet().availability_zone or NO_AVAILABILITY_ZONE
+            availability_zones.setdefault(availability_zone,[]).append(node.get_name())
+    return dict(sorted(availability_zones.items()))
+
+def get_availability_zone_node_name(availability_zone):
+    return f"az:{availability_zone}"
+
+def build_overview_graph(graph,availability_zones,detail_urls):
+    '''
+    The overview of the graph, with a placeholder node per availability
+    zone (of get_availability_zones()) linking to the URL in detail_urls, a
+    dict of {availability zone: URL}. The edges of the zone's subnets move
+    to its node, one per neighbour, labeled with their count.
+    '''
+    overview_graph = Graph(graph.get_name(),graph_type=graph.get_graph_type(),**graph.attributes)
+
+    placeholder_names = {}
+    for availability_zone,subnet_names in availability_zones.items():
+        placeholder_name = get_availability_zone_node_name(availability_zone)
+        for subnet_name in subnet_names:
+            placeholder_names[subnet_name] = placeholder_name
+
+    for node in graph.get_nodes():
+        if node.get_name() not in placeholder_names:
+            overview_graph.add_node(node)
+    for availability_zone,subnet_names in availability_zones.items():
+        overview_graph.add_node(AvailabilityZoneNode(availability_zone,subnet_names,
+            label=f"{availability_zone}\n{len(subnet_names)} Subnet{'' if len(subnet_names) == 1 else 's'}",
+            URL=detail_urls[availability_zone],tooltip=f"Subnets in {availability_zone}",
+            **AVAILABILITY_ZONE_NODE_ATTRIBUTES))
+
+    # Edges of subnets, by their ends once moved to the placeholders
+    merged_edges = {}
+    for edge in graph.get_edges():
+        source = placeholder_names.get(edge.get_source(),edge.get_source())
+        destination = placeholder_names.get(edge.get_destination(),edge.get_destination())
+        if source == edge.get_source() and destination == edge.get_destination():
+            overview_graph.add_edge(edge)
+            continue
+        if (source,destination) not in merged_edges:
+            attributes = {k: v for k,v in edge.attributes.items() if k not in ["label","penwidth"]}
+            merged_edges[(source,destination)] = [attributes,0]
+        merged_edges[(source,destination)][1] += 1
+
+    for (source,destination),(attributes,count) in merged_edges.items():
+        overview_graph.add_edge(Edge(source,destination,label=f"{count} subnet{'' if count == 1 else 's'}",**attributes))
+
+    return overview_graph
+
+def build_detail_graph(graph,subnet_names,overview_url):
+    '''
+    The detail graph of one availability zone, given the names of its
+    subnets' nodes: the subnets, their edges and the nodes at the other
+    ends, with the VPC's node linking back to the overview's URL.
+    '''
+    subnet_names = set(subnet_names)
+
+    detail_graph = Graph(graph.get_name(),graph_type=graph.get_graph_type(),**graph.attributes)
+    neighbour_names = {}
+    edges = []
+    for edge in graph.get_edges():
+        if edge.get_source() in subnet_names or edge.get_destination() in subnet_names:
+            edges.append(edge)
+            neighbour_names[edge.get_source()] = None
+            neighbour_names[edge.get_destination()] = None
+
+    for node in graph.get_nodes():
+        if node.get_name() in subnet_names:
+            detail_graph.add_node(node)
+        elif node.get_name() in neighbour_names:
+            if isinstance(node,VpcNode):
+                # A node of its own, as the overview's isn't linked
+                vpc_node = VpcNode(node.get_vpc())
+                vpc_node.attributes = {**node.attributes,"URL": overview_url,"tooltip": "Overview"}
+                node = vpc_node
+            detail_graph.add_node(node)
+    for edge in edges:
+        detail_graph.add_edge(edge)
+
+    return detail_graph
+
+def get_detail_filenames(filenames,availability_zone):
+    '''
+    The filenames of a detail diagram, from those of the overview: the
+    availability zone is added to each stem.
+    '''
+    return [f"{os.path.splitext(f)[0]}-{availability_zone}{os.path.splitext(f)[1]}" for f in filenames]
+
+def find_detail_files(filenames):
+    '''
+    The files that already exist where get_detail_filenames() could put a
+    detail diagram of the filenames, whatever the availability zones. The
+    zones aren't known until the VPCs are collected, so this looks for any
+    name that could be one.
+    '''
+    detail_files = []
+    for filename in filenames:
+        stem,extension = os.path.splitext(filename)
+        for path in sorted(glob.glob(f"{glob.escape(stem)}-*{glob.escape(extension)}")):
+            if AVAILABILITY_ZONE_PATTERN.fullmatch(path[len(stem) + 1:len(path) - len(extension)]):
+                detail_files.append(path)
+    return detail_files
+
+def split_graph(graph,filenames):
+    '''
+    Split the graph in to its overview and detail graphs, to be written to
+    the filenames and those given by get_detail_filenames(). The overview
+    links to the details' files by name, in the first of
+    LINKED_FILE_TYPES being written, or else the first file type. Returns
+    a tuple of ((overview graph, filenames), [(detail graph, filenames),
+    ...]).
+    '''
+    file_types = [os.path.splitext(f)[1] for f in filenames]
+    linked_index = 0
+    for file_type in LINKED_FILE_TYPES:
+        if file_type in file_types:
+            linked_index = file_types.index(file_type)
+            break
+
+    availability_zones = get_availability_zones(graph)
+    overview_url = os.path.basename(filenames[linked_index])
+    detail_urls = {}
+    details = []
+    for availability_zone,subnet_names in availability_zones.items():
+        detail_filenames = get_detail_filenames(filenames,availability_zone)
+        detail_urls[availability_zone] = os.path.basename(detail_filenames[linked_index])
+        details.append((build_detail_graph(graph,subnet_names,overview_url),detail_filenames))
+
+    return (build_overview_graph(graph,availability_zones,detail_urls),filenames),details
@@ -0,0 +1,89 @@
+'''
+Draw the workload density of each subnet on the diagrams: its network
+interfaces, by the kind of workload they belong to (instances, Lambda
+functions, load balancers, NAT gateways and VPC endpoints), and the IPv4
+addresses they use.
+
+The interfaces are counted while they are collected, one paginated sweep
+of the VPC's (or, in batch mode, the region's) interfaces, so a snapshot
+holds a record per subnet and kind rather than a description per
+interface.
+'''
+
+from .addresses import get_heat_color
+from .collect import INTERFACE_COUNTS_SNAPSHOT_KEY
+from .descriptions import INTERFACE_KINDS
+
+def get_interface_density(snapshots):
+    '''
+    The counts of the network interfaces of the snapshots' subnets, as a
+    dict of {subnet_id: {kind: [interfaces, IPv4 addresses]}}. Subnets
+    without interfaces have no kinds; those of snapshots without counts
+    aren't in it.
+    '''
+    density = {}
+    for snapshot in snapshots:
+        if INTERFACE_COUNTS_SNAPSHOT_KEY not in snapshot:
+            continue
+        for subnet_description in snapshot["Subnets"]:
+            density[subnet_description["SubnetId"]] = {}
+        for counts in snapshot[INTERFACE_COUNTS_SNAPSHOT_KEY]:
+            kind_counts = density.setdefault(counts["SubnetId"],{}).setdefault(counts["Kind"],[0,0])
+            kind_counts[0] += counts["InterfaceCount"]
+            kind_counts[1] += counts["IpAddressCount"]
+    return density
+
+def add_interface_overlay(graph,density):
+    '''
+    Add the network interfaces of each subnet to its label, and fill it
+    with a heat color by its interfaces as a share of the busiest subnet's,
+    so that the hot spots stand out. Subnets collapsed by summarize_graph()
+    are labeled with their totals and colored by their average. Nodes that
+    are already filled, e.g. by --utilization, keep their color.
+    '''
+    from .summarize import SummaryNode
+
+    node_counts = []
+    for node in graph.get_nodes():
+        if isinstance(node,SummaryNode):
+            subnet_ids = [name for name in node.get_member_names() if name in density]
+        elif node.get_name() in density:
+            subnet_ids = [node.get_name()]
+        else:
+            continue
+        if len(subnet_ids) == 0:
+            continue
+
+        kind_counts = {}
+        for subnet_id in subnet_ids:
+            for kind,(interface_count,ip_address_count) in density[subnet_id].items():
+                totals = kind_counts.setdefault(kind,[0,0])
+                totals[0] += interface_count
+                totals[1] += ip_address_count
+        node.attributes["label"] += "\n" + "\n".join(format_interface_density(kind_counts))
+        node_counts.append((node,sum(counts[0] for counts in kind_counts.values()) / len(subnet_ids)))
+
+    max_count = max((count for _,count in node_counts),default=0)
+    if max_count == 0:
+        return
+    for node,count in node_counts:
+        if "fillcolor" in node.attributes:
+            continue
+        styles = [style for style in node.attributes.get("style","").split(",") if style != ""]
+        if "filled" not in styles:
+            styles.append("filled")
+        node.attributes["style"] = ",".join(styles)
+        node.attributes["fillcolor"] = get_heat_color(count / max_count)
+
+def format_interface_density(kind_counts):
+    '''
+    The label lines of a dict of {kind: [interfaces, IPv4 addresses]}: the
+    totals, e.g. "42 ENIs, 57 IPs", then the interfaces of each kind.
+    '''
+    interface_count = sum(counts[0] for counts in kind_counts.values())
+    ip_address_count = sum(counts[1] for counts in kind_counts.values())
+    lines = [f"{interface_count} ENI{'' if interface_count == 1 else 's'}, "
+        f"{ip_address_count} IP{'' if ip_address_count == 1 else 's'}"]
+    if interface_count > 0:
+        lines.append(", ".join(f"{kind_counts[kind][0]} {kind}" for kind in INTERFACE_KINDS if kind in kind_counts))
+    return lines
@@ -0,0 +1,243 @@
+'''
+Cache of graphviz layouts, so that a diagram whose topology hasn't changed
+is drawn from the positions computed the last time rather than laid out
+again, and its nodes stay where they were.
+
+Layouts are keyed by a hash of the graph's structure: the nodes, edges and
+subgraphs in order, with the attributes that affect the layout. Colors and
+styles are left out, so a diff or a utilization heat map of an unchanged
+topology reuses its layout too.
+
+- A graph whose layout is cached is rendered with "neato -n2", which only
+  draws the nodes and edges at their cached positions.
+- A graph (without clusters) that differs in only a few nodes from the last
+  layout of the same diagram is laid out by neato with the unchanged nodes
+  pinned to their previous positions, and the new ones placed among them.
+- Anything else is laid out by dot as usual.
+
+Either way, the layout graphviz computed is read back from its -Tjson0
+output, written in the same run as the diagram's files, and cached.
+'''
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+from .cache import ResponseCache
+from .dot import Graph, Node, Edge, Subgraph, get_output_arguments, run_graphviz
+
+# Attributes that don't change the layout, and so aren't part of the
+# topology hash.
+COSMETIC_ATTRIBUTES = frozenset(["bgcolor","color","fillcolor","fontcolor","penwidth","style","tooltip"])
+
+# The layout attributes kept from graphviz's output, for the graph and its
+# clusters, nodes and edges.
+GRAPH_LAYOUT_ATTRIBUTES = ["bb","lp","lwidth","lheight"]
+NODE_LAYOUT_ATTRIBUTES = ["pos","width","height"]
+EDGE_LAYOUT_ATTRIBUTES = ["pos","lp","xlp","head_lp","tail_lp"]
+
+# A layout is seeded from the diagram's last one if at most this fraction of
+# the nodes were added or removed; past that a fresh layout reads better.
+MAX_SEED_CHANGE = 0.1
+
+# Layouts don't go stale, they are only evicted by size.
+LAYOUT_TTL = float("inf")
+
+class LayoutCache:
+    '''
+    Layouts on disk, shared by concurrent runs like the response cache, by
+    topology hash, and the topology hash of the last layout of each diagram
+    (by output filename, without the extension) to seed new layouts from.
+    '''
+    def __init__(self,cache_dir,max_bytes):
+        self._response_cache = ResponseCache(cache_dir,max_bytes)
+
+    def render(self,graph,filenames,program="dot"):
+        '''
+        Render the graph to the files like dot.render(), reusing the cached
+        layout of its topology if there is one, and caching it if not.
+        '''
+        topology_hash = get_topology_hash(graph)
+        diagram_key = os.path.abspath(os.path.splitext(filenames[0])[0])
+
+        layout = self._response_cache.get(["layout",topology_hash],LAYOUT_TTL)
+        if layout is not None:
+            positioned_graph = get_positioned_graph(graph,layout)
+            if positioned_graph is not None:
+                run_graphviz(["neato","-n2"] + get_output_arguments(filenames),positioned_graph)
+                self._response_cache.put(["diagram",diagram_key],topology_hash)
+                return
+
+        command = [program]
+        seed_layout = self._get_seed_layout(graph,diagram_key)
+        if seed_layout is not None:
+            command = ["neato"]
+            graph = get_seeded_graph(graph,seed_layout)
+
+        fd,layout_filename = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            run_graphviz(command + get_output_arguments(filenames) + ["-Tjson0",f"-o{layout_filename}"],graph)
+            with open(layout_filename,encoding="utf-8") as f:
+                layout = read_layout(f)
+        finally:
+            os.remove(layout_filename)
+
+        self._response_cache.put(["layout",topology_hash],layout)
+        self._response_cache.put(["diagram",diagram_key],topology_hash)
+
+    def _get_seed_layout(self,graph,diagram_key):
+        '''
+        The diagram's last layout if the graph can be laid out from it, else
+        None. neato doesn't draw clusters, so graphs with any get a new
+        layout from dot.
+        '''
+        if len(graph.get_subgraphs()) > 0:
+            return None
+        topology_hash = self._response_cache.get(["diagram",diagram_key],LAYOUT_TTL)
+        if topology_hash is None:
+            return None
+        layout = self._response_cache.get(["layout",topology_hash],LAYOUT_TTL)
+        if layout is None or len(layout["Subgraphs"]) > 0:
+            return None
+
+        node_names = set(node.get_name() for node in graph.get_nodes())
+        changed = len(node_names.symmetric_difference(layout["Nodes"]))
+        if changed > max(1,MAX_SEED_CHANGE * len(node_names)):
+            return None
+        return layout
+
+# Topology ------------------------------------------------------------
+
+def get_topology_hash(graph):
+    '''
+    A hash of everything in the graph that affects its layout.
+    '''
+    digest = hashlib.sha256()
+
+    def update(*values):
+        digest.update(repr(values).encode("utf-8"))
+
+    def update_subgraph(subgraph):
+        update("subgraph",subgraph.get_name(),get_layout_attributes(subgraph.attributes),subgraph.get_node_names())
+        for child_subgraph in subgraph.get_subgraphs():
+            update_subgraph(child_subgraph)
+        update("end")
+
+    update(graph.get_graph_type(),get_layout_attributes(graph.attributes))
+    for subgraph in graph.get_subgraphs():
+        update_subgraph(subgraph)
+    for node in graph.get_nodes():
+        update("node",node.get_name(),get_layout_attributes(node.attributes))
+    for edge in graph.get_edges():
+        update("edge",edge.get_source(),edge.get_destination(),get_layout_attributes(edge.attributes))
+    return digest.hexdigest()
+
+def get_layout_attributes(attributes):
+    return sorted((key,str(value)) for key,value in attributes.items() if key not in COSMETIC_ATTRIBUTES)
+
+# Layouts -------------------------------------------------------------
+
+def read_layout(stream):
+    '''
+    Read a layout from graphviz -Tjson0 output, as a dict of the Graph's
+    layout attributes, and those of the Subgraphs and Nodes by name, and of
+    the Edges as a list of [source, destination, attributes].
+    '''
+    data = json.load(stream)
+    layout = {"Graph": get_attributes(data,GRAPH_LAYOUT_ATTRIBUTES), "Subgraphs": {}, "Nodes": {}, "Edges": []}
+
+    # Nodes and subgraphs are both objects, only the nodes have positions.
+    node_names = {}
+    for graphviz_object in data.get("objects",[]):
+        if "pos" in graphviz_object:
+            node_names[graphviz_object["_gvid"]] = graphviz_object["name"]
+            layout["Nodes"][graphviz_object["name"]] = get_attributes(graphviz_object,NODE_LAYOUT_ATTRIBUTES)
+        else:
+            layout["Subgraphs"][graphviz_object["name"]] = get_attributes(graphviz_object,GRAPH_LAYOUT_ATTRIBUTES)
+
+    for edge in data.get("edges",[]):
+        layout["Edges"].append([node_names[edge["tail"]],node_names[edge["head"]],
+            get_attributes(edge,EDGE_LAYOUT_ATTRIBUTES)])
+
+    return layout
+
+def get_attributes(graphviz_object,keys):
+    return {key: graphviz_object[key] for key in keys if key in graphviz_object}
+
+def get_positioned_graph(graph,layout):
+    '''
+    A copy of the graph with the layout's positions of everything in it, or
+    None if the layout is missing any of its nodes or edges.
+    '''
+    node_layouts = layout["Nodes"]
+    if any(node.get_name() not in node_layouts for node in graph.get_nodes()):
+        return None
+
+    edge_layouts = get_edge_layouts(graph,layout)
+    if any(edge_layout is None for edge_layout in edge_layouts):
+        return None
+
+    return copy_graph(graph,layout["Graph"],layout["Subgraphs"],node_layouts,edge_layouts)
+
+def get_seeded_graph(graph,layout):
+    '''
+    A copy of the graph for neato, with the nodes that are in the layout
+    pinned to their positions, and each new node starting at a neighbour's
+    position if it has one in the layout.
+    '''
+    node_layouts = {}
+    for name,node_layout in layout["Nodes"].items():
+        node_layouts[name] = {"pos": node_layout["pos"] + "!"}
+
+    for edge in graph.get_edges():
+        for name,neighbour_name in [(edge.get_source(),edge.get_destination()),(edge.get_destination(),edge.get_source())]:
+            if name not in node_layouts and neighbour_name in layout["Nodes"]:
+                node_layouts[name] = {"pos": layout["Nodes"][neighbour_name]["pos"]}
+
+    # Positions are in points, as graphviz writes them, and edges are
+    # routed around the nodes.
+    graph_attributes = {"inputscale": 72, "splines": graph.attributes.get("splines","true")}
+    return copy_graph(graph,graph_attributes,{},node_layouts,[{}] * len(graph.get_edges()))
+
+def get_edge_layouts(graph,layout):
+    '''
+    The layout attributes of each of the graph's edges, in order, or None for
+    an edge that isn't in the layout. graphviz writes edges in its own order,
+    so they are matched by their nodes, and parallel edges in turn.
+    '''
+    edge_layouts = collections.defaultdict(collections.deque)
+    for source,destination,edge_layout in layout["Edges"]:
+        edge_layouts[(source,destination)].append(edge_layout)
+
+    result = []
+    for edge in graph.get_edges():
+        queue = edge_layouts.get((edge.get_source(),edge.get_destination()))
+        if not queue:
+            queue = edge_layouts.get((edge.get_destination(),edge.get_source()))
+        result.append(queue.popleft() if queue else None)
+    return result
+
+def copy_graph(graph,graph_attributes,subgraph_layouts,node_layouts,edge_layouts):
+    '''
+    A copy of the graph with layout attributes added: the graph's, and the
+    subgraphs' and nodes' by name, and the edges' in order.
+    '''
+    def copy_subgraph(subgraph):
+        subgraph_copy = Subgraph(subgraph.get_name(),**{**subgraph.attributes,**subgraph_layouts.get(subgraph.get_name(),{})})
+        for node_name in subgraph.get_node_names():
+            subgraph_copy.add_node_name(node_name)
+        for child_subgraph in subgraph.get_subgraphs():
+            subgraph_copy.add_subgraph(copy_subgraph(child_subgraph))
+        return subgraph_copy
+
+    graph_copy = Graph(graph.get_name(),graph_type=graph.get_graph_type(),**{**graph.attributes,**graph_attributes})
+    for subgraph in graph.get_subgraphs():
+        graph_copy.add_subgraph(copy_subgraph(subgraph))
+    for node in graph.get_nodes():
+        graph_copy.add_node(Node(node.get_name(),**{**node.attributes,**node_layouts.get(node.get_name(),{})}))
+    for edge,edge_layout in zip(graph.get_edges(),edge_layouts):
+        graph_copy.add_edge(Edge(edge.get_source(),edge.get_destination(),**{**edge.attributes,**edge_layout}))
+    return graph_copy
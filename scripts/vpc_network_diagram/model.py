@@ -0,0 +1,273 @@
+'''
+A compact model of a VPC's addressing and routing, built from a snapshot in
+one pass: slotted records of just what the diagrams and the route queries
+use, with IDs and CIDR blocks interned, and the VPC and subnet CIDR blocks
+parsed in to ipaddress networks once.
+
+Nothing in the model refers back to the raw descriptions, so a snapshot can
+be freed once its model and graph are built.
+'''
+
+import ipaddress
+import sys
+
+from .descriptions import (
+    get_aws_name, get_route_target, get_route_destination,
+    is_propagated_route, is_blackhole_route, get_protocol_name, get_port_range,
+)
+
+class Vpc:
+    '''
+    A VPC: its ID, Name (or None), owner's account ID (or None) and
+    associated CIDR blocks.
+    '''
+    __slots__ = ("vpc_id","name","owner_id","cidr_blocks")
+
+    def __init__(self,vpc_id,name,owner_id,cidr_blocks):
+        self.vpc_id = vpc_id
+        self.name = name
+        self.owner_id = owner_id
+        self.cidr_blocks = cidr_blocks
+
+class Subnet:
+    '''
+    A subnet: its ID, Name (or None), availability zone, associated CIDR
+    blocks, and the number of its IPv4 addresses that are free (or None if
+    unknown, e.g. from a Terraform plan).
+    '''
+    __slots__ = ("subnet_id","name","availability_zone","cidr_blocks","available_ip_address_count")
+
+    def __init__(self,subnet_id,name,availability_zone,cidr_blocks,available_ip_address_count):
+        self.subnet_id = subnet_id
+        self.name = name
+        self.availability_zone = availability_zone
+        self.cidr_blocks = cidr_blocks
+        self.available_ip_address_count = available_ip_address_count
+
+class Route:
+    '''
+    A route: its destination (a CIDR block or prefix list ID), target ID
+    (or None if it has none that we know of), and whether it was propagated
+    and is a blackhole.
+    '''
+    __slots__ = ("destination","target_id","is_propagated","is_blackhole")
+
+    def __init__(self,destination,target_id,is_propagated,is_blackhole):
+        self.destination = destination
+        self.target_id = target_id
+        self.is_propagated = is_propagated
+        self.is_blackhole = is_blackhole
+
+class RouteTable:
+    '''
+    A route table: its ID, Name (or None), whether it is the VPC's main
+    route table, the IDs of its explicitly associated subnets, and its
+    routes.
+    '''
+    __slots__ = ("route_table_id","name","is_main","subnet_ids","routes")
+
+    def __init__(self,route_table_id,name,is_main,subnet_ids,routes):
+        self.route_table_id = route_table_id
+        self.name = name
+        self.is_main = is_main
+        self.subnet_ids = subnet_ids
+        self.routes = routes
+
+class NetworkAcl:
+    '''
+    A network ACL: its ID, Name (or None), whether it is the VPC's default,
+    the IDs of its associated subnets, and its rules as a tuple of
+    (direction, rule number, action, protocol, ports, CIDR block) in
+    evaluation order, inbound ("in") first.
+    '''
+    __slots__ = ("network_acl_id","name","is_default","subnet_ids","rules")
+
+    def __init__(self,network_acl_id,name,is_default,subnet_ids,rules):
+        self.network_acl_id = network_acl_id
+        self.name = name
+        self.is_default = is_default
+        self.subnet_ids = subnet_ids
+        self.rules = rules
+
+class SecurityGroup:
+    '''
+    A security group: its ID, Name (or else group name), and its rules as a
+    sorted tuple of (direction, protocol, ports, peer), one per peer, where
+    the peer is a CIDR block, a prefix list ID, another security group's ID,
+    or "self".
+    '''
+    __slots__ = ("group_id","name","rules")
+
+    def __init__(self,group_id,name,rules):
+        self.group_id = group_id
+        self.name = name
+        self.rules = rules
+
+class VpcModel:
+    '''
+    The model of one VPC: the Vpc, lists of its Subnets and RouteTables, the
+    names and (where collected) CIDR blocks of the prefix lists its routes
+    use, as dicts keyed by prefix list ID, and a list of the Vpcs at the
+    other end of its peering connections, as far as the connections
+    describe them. Lists of its NetworkAcls and SecurityGroups are empty
+    unless they were collected.
+    '''
+    __slots__ = ("vpc","subnets","route_tables","prefix_list_names","prefix_list_cidrs","peer_vpcs",
+        "network_acls","security_groups")
+
+    def __init__(self,vpc,subnets,route_tables,prefix_list_names,prefix_list_cidrs,peer_vpcs,
+            network_acls,security_groups):
+        self.vpc = vpc
+        self.subnets = subnets
+        self.route_tables = route_tables
+        self.prefix_list_names = prefix_list_names
+        self.prefix_list_cidrs = prefix_list_cidrs
+        self.peer_vpcs = peer_vpcs
+        self.network_acls = network_acls
+        self.security_groups = security_groups
+
+def build_vpc_model(snapshot):
+    '''
+    Build the model of the snapshot's VPC.
+    '''
+    intern = sys.intern
+
+    vpc_description = snapshot["Vpc"]
+    vpc = Vpc(intern(vpc_description["VpcId"]),get_aws_name(vpc_description),
+        vpc_description.get("OwnerId"),get_cidr_blocks(vpc_description))
+
+    subnets = []
+    for subnet_description in snapshot["Subnets"]:
+        subnets.append(Subnet(intern(subnet_description["SubnetId"]),get_aws_name(subnet_description),
+            intern(subnet_description.get("AvailabilityZone","")) or None,get_cidr_blocks(subnet_description),
+            subnet_description.get("AvailableIpAddressCount")))
+
+    route_tables = []
+    for route_table_description in snapshot["RouteTables"]:
+        is_main = False
+        subnet_ids = []
+        for association in route_table_description["Associations"]:
+            if association["Main"]:
+                is_main = True
+            if "SubnetId" in association:
+                subnet_ids.append(intern(association["SubnetId"]))
+
+        routes = []
+        for route in route_table_description["Routes"]:
+            destination = get_route_destination(route)
+            target_id = get_route_target(route)
+            routes.append(Route(None if destination is None else intern(destination),
+                None if target_id is None else intern(target_id),
+                is_propagated_route(route),is_blackhole_route(route)))
+
+        route_tables.append(RouteTable(intern(route_table_description["RouteTableId"]),
+            get_aws_name(route_table_description),is_main,tuple(subnet_ids),tuple(routes)))
+
+    prefix_list_names = {}
+    for prefix_list_description in snapshot.get("ManagedPrefixLists",[]):
+        prefix_list_names[prefix_list_description["PrefixListId"]] = prefix_list_description.get("PrefixListName")
+
+    prefix_list_cidrs = {}
+    for entry in snapshot.get("ManagedPrefixListEntries",[]):
+        prefix_list_cidrs.setdefault(entry["PrefixListId"],[]).append(intern(entry["Cidr"]))
+
+    peer_vpcs = []
+    for key,info_key in [("AccepterVpcPeeringConnections","RequesterVpcInfo"),("RequesterVpcPeeringConnections","AccepterVpcInfo")]:
+        for vpc_peering_connection_description in snapshot.get(key,[]):
+            peer_vpcs.append(build_peer_vpc(vpc_peering_connection_description[info_key]))
+
+    network_acls = [build_network_acl(d) for d in snapshot.get("NetworkAcls",[])]
+    security_groups = [build_security_group(d) for d in snapshot.get("SecurityGroups",[])]
+
+    return VpcModel(vpc,subnets,route_tables,prefix_list_names,prefix_list_cidrs,peer_vpcs,
+        network_acls,security_groups)
+
+def build_network_acl(network_acl_description):
+    '''
+    The NetworkAcl of a describe_network_acls description.
+    '''
+    intern = sys.intern
+
+    rules = []
+    for entry in network_acl_description.get("Entries",[]):
+        port_range = entry.get("PortRange",{})
+        rules.append((
+            "out" if entry["Egress"] else "in",
+            entry["RuleNumber"],
+            intern(entry["RuleAction"]),
+            intern(get_protocol_name(entry["Protocol"])),
+            intern(get_port_range(port_range.get("From"),port_range.get("To"))),
+            intern(entry.get("CidrBlock",entry.get("Ipv6CidrBlock",""))),
+        ))
+    rules.sort(key=lambda rule: (rule[0] == "out",rule[1]))
+
+    subnet_ids = tuple(intern(association["SubnetId"]) for association in network_acl_description.get("Associations",[]))
+    return NetworkAcl(intern(network_acl_description["NetworkAclId"]),get_aws_name(network_acl_description),
+        network_acl_description.get("IsDefault",False),subnet_ids,tuple(rules))
+
+def build_security_group(security_group_description):
+    '''
+    The SecurityGroup of a describe_security_groups description.
+    '''
+    intern = sys.intern
+    group_id = intern(security_group_description["GroupId"])
+
+    rules = set()
+    for direction,key in [("in","IpPermissions"),("out","IpPermissionsEgress")]:
+        for permission in security_group_description.get(key,[]):
+            protocol = intern(get_protocol_name(permission["IpProtocol"]))
+            ports = intern(get_port_range(permission.get("FromPort"),permission.get("ToPort")))
+            peers = [r["CidrIp"] for r in permission.get("IpRanges",[])]
+            peers.extend(r["CidrIpv6"] for r in permission.get("Ipv6Ranges",[]))
+            peers.extend(r["PrefixListId"] for r in permission.get("PrefixListIds",[]))
+            for pair in permission.get("UserIdGroupPairs",[]):
+                peers.append("self" if pair.get("GroupId") == group_id else pair.get("GroupId",""))
+            for peer in peers:
+                rules.add((direction,protocol,ports,intern(peer)))
+
+    name = get_aws_name(security_group_description) or security_group_description.get("GroupName")
+    return SecurityGroup(group_id,name,tuple(sorted(rules)))
+
+def build_peer_vpc(vpc_info):
+    '''
+    The Vpc at one end of a peering connection, from the connection's
+    AccepterVpcInfo or RequesterVpcInfo. It has no Name.
+    '''
+    cidr_blocks = [(ipaddress.IPv4Network,c["CidrBlock"]) for c in vpc_info.get("CidrBlockSet",[])]
+    cidr_blocks.extend((ipaddress.IPv6Network,c["Ipv6CidrBlock"]) for c in vpc_info.get("Ipv6CidrBlockSet",[]))
+    return Vpc(sys.intern(vpc_info["VpcId"]),None,vpc_info.get("OwnerId"),parse_cidr_blocks(cidr_blocks))
+
+def get_cidr_blocks(resource_description):
+    '''
+    The associated CIDR blocks of a VPC or subnet description as a tuple of
+    ipaddress networks, IPv4 first, without duplicates. A block that isn't
+    a CIDR block (e.g. the placeholder for one that a Terraform plan hasn't
+    assigned yet) is kept as a string.
+    '''
+    cidr_blocks = []
+
+    if "CidrBlock" in resource_description:
+        cidr_blocks.append((ipaddress.IPv4Network,resource_description["CidrBlock"]))
+
+    for association_set in resource_description.get("CidrBlockAssociationSet",[]):
+        if association_set["CidrBlockState"]["State"] == "associated":
+            cidr_blocks.append((ipaddress.IPv4Network,association_set["CidrBlock"]))
+
+    for association_set in resource_description.get("Ipv6CidrBlockAssociationSet",[]):
+        if association_set["Ipv6CidrBlockState"]["State"] == "associated":
+            cidr_blocks.append((ipaddress.IPv6Network,association_set["Ipv6CidrBlock"]))
+
+    return parse_cidr_blocks(cidr_blocks)
+
+def parse_cidr_blocks(cidr_blocks):
+    '''
+    Parse a list of (IPv4Network or IPv6Network, CIDR block) in to a tuple
+    of networks, without duplicates, keeping what doesn't parse as a string.
+    '''
+    networks = []
+    for network_class,cidr_block in dict.fromkeys(cidr_blocks):
+        try:
+            networks.append(network_class(cidr_block,strict=False))
+        except ValueError:
+            networks.append(sys.intern(cidr_block))
+    return tuple(networks)
@@ -0,0 +1,597 @@
+'''
+Graph nodes for AWS resources, built from their raw descriptions or, for
+VPCs, subnets and route tables, from the compact model of the VPC.
+'''
+
+from .dot import Node, Edge
+
+from .descriptions import get_aws_name, LOCAL_ROUTE_TARGET
+from .model import build_peer_vpc
+
+# Lines of a network ACL's or security group's label: the resources sharing
+# its rules, and the rules themselves.
+MAX_LABEL_RULE_SET_RESOURCES = 3
+MAX_LABEL_RULES = 8
+
+# The rule number of a network ACL's last rule, which denies everything else
+CATCH_ALL_RULE_NUMBER = 32767
+
+# Base Classes --------------------------------------------------------
+
+class AwsResourceNodeBase(Node):
+    '''
+    Base Class for the AWS Resource Types drawn from their raw descriptions.
+    The label is generated when the node is created, and the description
+    isn't kept.
+    '''
+    __slots__ = ()
+
+    def __init__(self,resource_description,id_key,resource_title):
+        node_name = resource_description[id_key]
+        label_list = self._generate_aws_label_list(resource_description,node_name,resource_title)
+        Node.__init__(self,node_name,label="\n".join(label_list),shape="box")
+
+    def _generate_aws_label_list(self,resource_description,node_name,resource_title):
+        '''
+        Generated a list of strings that should be in the node's label
+        (often overridden in derived classes)
+        '''
+        return generate_label_list(resource_title,get_aws_name(resource_description),node_name)
+
+class AwsModelNodeBase(Node):
+    '''
+    Base class for VPCs, Subnets and Route Tables, which are drawn from, and
+    keep, their records in the compact model (see model.py) rather than
+    their raw descriptions.
+    '''
+    __slots__ = ("_resource",)
+
+    def __init__(self,resource,node_name,resource_title):
+        self._resource = resource
+        label_list = self._generate_aws_label_list(node_name,resource_title)
+        Node.__init__(self,node_name,label="\n".join(label_list),shape="box")
+
+    def _generate_aws_label_list(self,node_name,resource_title):
+        '''
+        Generated a list of strings that should be in the node's label
+        (often overridden in derived classes)
+        '''
+        return generate_label_list(resource_title,self._resource.name,node_name)
+
+class AwsCidrBlockNodeBase(AwsModelNodeBase):
+    '''
+    Base class for VPCs and Subnets, things having IPv4 and IPv6 CIDR blocks
+    '''
+    __slots__ = ()
+
+    def _generate_aws_label_list(self,node_name,resource_title):
+        '''
+        Enhance the parent class label list with the CIDR blocks
+        '''
+        label_list = AwsModelNodeBase._generate_aws_label_list(self,node_name,resource_title)
+        label_list.extend(str(cidr_block) for cidr_block in self._resource.cidr_blocks)
+        return label_list
+
+class AwsGatewayNodeBase(AwsResourceNodeBase):
+    '''
+    Base class for gateway resources, i.e. resources that are destinations
+    in route tables.
+    '''
+    __slots__ = ()
+
+    def add_route_table_edges(self,graph,route_table_index):
+        '''
+        Create an Edge between this node and any route tables that point
+        to this gateway, labeled with the destinations. Propagated routes
+        get their own dashed edge, and blackhole routes a red one.
+        '''
+        for route_table_node,routes in route_table_index.get_routes_for_target(self.get_name()):
+            edge_destinations = {}
+            for destination,is_propagated,is_blackhole in routes:
+                edge_destinations.setdefault((is_propagated,is_blackhole),[]).append(destination)
+
+            for (is_propagated,is_blackhole),destinations in edge_destinations.items():
+                attributes = {"label": ",".join(destinations)}
+                if is_propagated:
+                    attributes["style"] = "dashed"
+                if is_blackhole:
+                    attributes["color"] = "red"
+                graph.add_edge(NodeEdge(route_table_node,self,**attributes))
+
+def generate_label_list(resource_title,name,node_name):
+    '''
+    The start of a resource's label: its title, Name (if any) and ID.
+    '''
+    label_list = [resource_title]
+    if name is not None:
+        label_list.append(name)
+    label_list.append(node_name)
+    return label_list
+
+# Conveniences --------------------------------------------------------
+
+class NodeEdge(Edge):
+    '''
+    Convenience wrapper around the Edge class:
+    - Operates on Node objects instead of node names.
+    - Has default 'color' and 'dir' settings.
+    '''
+    __slots__ = ()
+
+    def __init__(self,node_a,node_b,**kwargs):
+        attributes = {"color": "black", "dir": "forward"}
+        attributes.update(kwargs)
+        Edge.__init__(self,node_a.get_name(),node_b.get_name(),**attributes)
+
+class RouteTableIndex:
+    '''
+    Lookups over a VPC's route tables, built in one pass over them, so that
+    edge construction needn't rescan every route table (and every route)
+    for every subnet and gateway. prefix_list_names, a dict of {prefix list
+    ID: name}, adds the names of prefix lists to route destinations.
+    '''
+    def __init__(self,route_table_nodes,prefix_list_names=None):
+        prefix_list_names = prefix_list_names or {}
+
+        self._main_route_table_node = None
+        self._subnet_route_table_nodes = {}
+        self._target_routes = {}
+
+        for route_table_node in route_table_nodes:
+            route_table = route_table_node.get_route_table()
+
+            if route_table.is_main:
+                self._main_route_table_node = route_table_node
+            for subnet_id in route_table.subnet_ids:
+                self._subnet_route_table_nodes[subnet_id] = route_table_node
+
+            target_routes = {}
+            for route in route_table.routes:
+                if route.target_id is None:
+                    continue
+                destination = route.destination
+                if destination in prefix_list_names:
+                    destination = f"{destination} ({prefix_list_names[destination]})"
+                target_routes.setdefault(route.target_id,[]).append(
+                    (destination,route.is_propagated,route.is_blackhole))
+
+            for target_id,routes in target_routes.items():
+                self._target_routes.setdefault(target_id,[]).append((route_table_node,routes))
+
+    def get_main_route_table_node(self):
+        '''
+        The main route table, i.e. the one automatically created by AWS as
+        the default for the VPC.
+        '''
+        return self._main_route_table_node
+
+    def get_route_table_node_for_subnet(self,subnet_id):
+        '''
+        The route table used by the subnet: the explicitly associated one, or
+        else the main route table.
+        '''
+        return self._subnet_route_table_nodes.get(subnet_id,self._main_route_table_node)
+
+    def get_routes_for_target(self,target_id):
+        '''
+        Get a list of (route table node, routes) for the route tables having
+        routes to the target (e.g. a gateway ID), where routes is a list of
+        (destination, is_propagated, is_blackhole).
+        '''
+        return self._target_routes.get(target_id,[])
+
+    def get_target_ids(self):
+        '''
+        The IDs of all of the route targets, except the VPC itself ("local").
+        '''
+        return [target_id for target_id in self._target_routes if target_id != LOCAL_ROUTE_TARGET]
+
+# AWS Resource Classes ------------------------------------------------
+
+class VpcNode(AwsCidrBlockNodeBase):
+    '''
+    AWS VPC
+    '''
+    __slots__ = ()
+
+    def __init__(self,vpc):
+        AwsCidrBlockNodeBase.__init__(self,vpc,vpc.vpc_id,"VPC")
+
+    def get_vpc(self):
+        return self._resource
+
+class SubnetNode(AwsCidrBlockNodeBase):
+    '''
+    AWS VPC Subnet
+    '''
+    __slots__ = ()
+
+    def __init__(self,subnet):
+        AwsCidrBlockNodeBase.__init__(self,subnet,subnet.subnet_id,"Subnet")
+
+    def get_subnet(self):
+        return self._resource
+
+class RouteTableNode(AwsModelNodeBase):
+    '''
+    AWS Route Table
+    '''
+    __slots__ = ()
+
+    def __init__(self,route_table):
+        AwsModelNodeBase.__init__(self,route_table,route_table.route_table_id,"Route Table")
+
+    def get_route_table(self):
+        return self._resource
+
+    def is_main(self):
+        '''
+        Is this the main route table, i.e. the one automatically created by
+        AWS as the default for the VPC?
+        '''
+        return self._resource.is_main
+
+    def is_associated_with(self,subnet_id):
+        '''
+        Is this route table associated with the specified subnet?
+        '''
+        return subnet_id in self._resource.subnet_ids
+
+    def _generate_aws_label_list(self,node_name,resource_title):
+        '''
+        Enhance the parent class label list with note about this being the
+        main route table, if that is the case.
+        '''
+        label_list = AwsModelNodeBase._generate_aws_label_list(self,node_name,resource_title)
+
+        if self.is_main():
+            label_list.append("(Main)")
+
+        return label_list
+
+    def get_destinations_for_id(self,gateway_id):
+        '''
+        Get list of route table destinations (CIDR Blocks or prefix list IDs)
+        for the specified gateway ID
+        '''
+        destinations = [route.destination for route in self._resource.routes if route.target_id == gateway_id]
+        return list(dict.fromkeys(destinations))
+
+class InternetGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS Internet Gateway
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"InternetGatewayId","Internet Gateway")
+
+class EgressOnlyInternetGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS Egress-Only Internet Gateway
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"EgressOnlyInternetGatewayId","Egress-Only Internet Gateway")
+
+class NatGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS NAT Gateway
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"NatGatewayId","NAT Gateway")
+
+class VpcPeeringConnectionNode(AwsGatewayNodeBase):
+    '''
+    AWS VPC Peering Connection
+    '''
+    __slots__ = ("_is_requester","_remote_vpc_node")
+
+    def __init__(self,gateway_description,is_requester):
+        self._is_requester = is_requester
+        AwsGatewayNodeBase.__init__(self,gateway_description,"VpcPeeringConnectionId","VPC Peering Connection")
+
+        if self._is_requester:
+            self._remote_vpc_node = RemoteVpcNode(gateway_description['AccepterVpcInfo'],is_requester=False)
+        else:
+            self._remote_vpc_node = RemoteVpcNode(gateway_description['RequesterVpcInfo'],is_requester=True)
+
+    def _generate_aws_label_list(self,resource_description,node_name,resource_title):
+        '''
+        Enhance the parent class label list with item about this being the
+        requester or the accepter.
+        '''
+        label_list = AwsResourceNodeBase._generate_aws_label_list(self,resource_description,node_name,resource_title)
+
+        if self._is_requester:
+            label_list.append("(Requester)")
+        else:
+            label_list.append("(Accepter)")
+
+        return label_list
+
+    def get_remote_vpc_node(self):
+        '''
+        The node object representing the VPC at the other end of the VPC
+        Peering Connection.
+        '''
+        return self._remote_vpc_node
+
+class VpnGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS VPN Gateway
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"VpnGatewayId","VPN Gateway")
+
+class VpnConnectionNode(AwsResourceNodeBase):
+    '''
+    AWS VPN Connection
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsResourceNodeBase.__init__(self,gateway_description,"VpnConnectionId","VPN Connection")
+
+class TransitGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS Transit Gateway
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"TransitGatewayId","Transit Gateway")
+
+class TransitGatewayAttachmentNode(AwsGatewayNodeBase):
+    '''
+    AWS Transit Gateway Attachment
+    '''
+    __slots__ = ()
+
+    def __init__(self,attachment_description):
+        AwsGatewayNodeBase.__init__(self,attachment_description,"TransitGatewayAttachmentId","Transit Gateway Attachment")
+
+class RemoteNetworkNode(TransitGatewayAttachmentNode):
+    '''
+    Remote Network - A different presentation of a Transit Gateway Attachment
+    '''
+    __slots__ = ()
+
+    def __init__(self,attachment_description):
+        TransitGatewayAttachmentNode.__init__(self,attachment_description)
+
+    def _generate_aws_label_list(self,transit_gateway_attachment_description,node_name,resource_title):
+        '''
+        Replace the labels that would normally be provided for the Transit
+        Gateway Attachment itself, with just the info for the associated remote
+        network.
+        '''
+        label_list = ['Remote Network']
+
+        for key in ['ResourceType','ResourceOwnerId','ResourceId']:
+            if key in transit_gateway_attachment_description:
+                label_list.append(transit_gateway_attachment_description[key])
+
+        return label_list
+
+class CarrierGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS Carrier Gateway (Wavelength Zones)
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"CarrierGatewayId","Carrier Gateway")
+
+class LocalGatewayNode(AwsGatewayNodeBase):
+    '''
+    AWS Outposts Local Gateway
+    '''
+    __slots__ = ()
+
+    def __init__(self,gateway_description):
+        AwsGatewayNodeBase.__init__(self,gateway_description,"LocalGatewayId","Local Gateway")
+
+class VpcEndpointNode(AwsGatewayNodeBase):
+    '''
+    AWS VPC Endpoint (gateway endpoints are route targets)
+    '''
+    __slots__ = ()
+
+    def __init__(self,endpoint_description):
+        AwsGatewayNodeBase.__init__(self,endpoint_description,"VpcEndpointId","VPC Endpoint")
+
+    def _generate_aws_label_list(self,endpoint_description,node_name,resource_title):
+        '''
+        Enhance the parent class label list with the endpoint's service.
+        '''
+        label_list = AwsResourceNodeBase._generate_aws_label_list(self,endpoint_description,node_name,resource_title)
+
+        if "ServiceName" in endpoint_description:
+            label_list.append(endpoint_description["ServiceName"])
+
+        return label_list
+
+class NetworkInterfaceNode(AwsGatewayNodeBase):
+    '''
+    AWS Network Interface, e.g. of an instance doing NAT or firewalling
+    '''
+    __slots__ = ()
+
+    def __init__(self,interface_description):
+        AwsGatewayNodeBase.__init__(self,interface_description,"NetworkInterfaceId","Network Interface")
+
+    def _generate_aws_label_list(self,interface_description,node_name,resource_title):
+        '''
+        Enhance the parent class label list with the instance the interface
+        is attached to, or else its description.
+        '''
+        label_list = AwsResourceNodeBase._generate_aws_label_list(self,interface_description,node_name,resource_title)
+
+        attachment = interface_description.get("Attachment",{})
+        if "InstanceId" in attachment:
+            label_list.append(attachment["InstanceId"])
+        elif interface_description.get("Description"):
+            label_list.append(interface_description["Description"])
+
+        return label_list
+
+class InstanceNode(AwsGatewayNodeBase):
+    '''
+    AWS EC2 Instance, for routes naming an instance but no network interface
+    '''
+    __slots__ = ()
+
+    def __init__(self,instance_description):
+        AwsGatewayNodeBase.__init__(self,instance_description,"InstanceId","Instance")
+
+class CoreNetworkNode(AwsGatewayNodeBase):
+    '''
+    AWS Cloud WAN Core Network
+    '''
+    __slots__ = ()
+
+    def __init__(self,core_network_description):
+        AwsGatewayNodeBase.__init__(self,core_network_description,"CoreNetworkArn","Core Network")
+
+class RouteTargetNode(AwsGatewayNodeBase):
+    '''
+    Any other route target, e.g. a gateway that no longer exists
+    '''
+    __slots__ = ()
+
+    def __init__(self,target_description):
+        AwsGatewayNodeBase.__init__(self,target_description,"TargetId","Route Target")
+
+class NetworkAclNode(Node):
+    '''
+    AWS Network ACL, or several having identical rules
+    '''
+    __slots__ = ()
+
+    def __init__(self,network_acls):
+        label_list = generate_rule_set_label_list("Network ACL",
+            [(network_acl.network_acl_id,network_acl.name) for network_acl in network_acls])
+        if any(network_acl.is_default for network_acl in network_acls):
+            label_list.append("(Default)")
+        label_list.extend(generate_rule_label_list(
+            [format_network_acl_rule(rule) for rule in network_acls[0].rules]))
+        Node.__init__(self,network_acls[0].network_acl_id,label="\n".join(label_list),shape="note")
+
+class SecurityGroupNode(Node):
+    '''
+    AWS Security Group, or several having identical rules. Rules referring
+    to other security groups are drawn as edges rather than listed.
+    '''
+    __slots__ = ("_group_ids",)
+
+    def __init__(self,security_groups):
+        self._group_ids = tuple(security_group.group_id for security_group in security_groups)
+        label_list = generate_rule_set_label_list("Security Group",
+            [(security_group.group_id,security_group.name) for security_group in security_groups])
+        label_list.extend(generate_rule_label_list([format_security_group_rule(rule)
+            for rule in security_groups[0].rules if not is_security_group_reference(rule)]))
+        Node.__init__(self,security_groups[0].group_id,label="\n".join(label_list),shape="note")
+
+    def get_group_ids(self):
+        '''
+        The IDs of the security groups having this node's rules.
+        '''
+        return self._group_ids
+
+class RemoteSecurityGroupNode(Node):
+    '''
+    A security group referred to by a rule but not in the VPC, e.g. in a
+    peered VPC
+    '''
+    __slots__ = ()
+
+    def __init__(self,group_id):
+        Node.__init__(self,group_id,label="\n".join(["Remote Security Group",group_id]),shape="note")
+
+def generate_rule_set_label_list(resource_title,resources):
+    '''
+    The start of the label of a rule set's node: like any other resource's
+    for one resource, otherwise the count and the first few, from a list of
+    (ID, Name or None).
+    '''
+    if len(resources) == 1:
+        return generate_label_list(resource_title,resources[0][1],resources[0][0])
+
+    label_list = [f"{len(resources)} {resource_title}s"]
+    for resource_id,name in resources[:MAX_LABEL_RULE_SET_RESOURCES]:
+        label_list.append(resource_id if name is None else f"{name} ({resource_id})")
+    if len(resources) > MAX_LABEL_RULE_SET_RESOURCES:
+        label_list.append(f"(+{len(resources) - MAX_LABEL_RULE_SET_RESOURCES} more)")
+    return label_list
+
+def generate_rule_label_list(rules):
+    '''
+    At most MAX_LABEL_RULES of the formatted rules, and how many more there
+    are.
+    '''
+    if len(rules) <= MAX_LABEL_RULES:
+        return rules
+    return rules[:MAX_LABEL_RULES] + [f"(+{len(rules) - MAX_LABEL_RULES} more rules)"]
+
+def format_network_acl_rule(rule):
+    '''
+    A network ACL rule as text, e.g. "in 100 allow tcp 443 0.0.0.0/0". The
+    catch-all rule is numbered "*", as in the console.
+    '''
+    direction,rule_number,action,protocol,ports,cidr_block = rule
+    if rule_number == CATCH_ALL_RULE_NUMBER:
+        rule_number = "*"
+    return " ".join(str(field) for field in [direction,rule_number,action,protocol,ports,cidr_block] if field != "")
+
+def format_security_group_rule(rule):
+    '''
+    A security group rule as text, e.g. "in tcp 443 from 0.0.0.0/0".
+    '''
+    direction,protocol,ports,peer = rule
+    fields = [direction,protocol,ports,"from" if direction == "in" else "to",peer]
+    return " ".join(field for field in fields if field != "")
+
+def is_security_group_reference(rule):
+    '''
+    Does the security group rule refer to another security group?
+    '''
+    return rule[3].startswith("sg-")
+
+# External Resources
+
+class TheInternetNode(Node):
+    '''
+    Node representing the public Internet
+    '''
+    __slots__ = ()
+
+    def __init__(self):
+        Node.__init__(self,"internet",label="The Internet",shape="ellipse")
+
+class RemoteVpcNode(Node):
+    '''
+    Node representing the VPC at the other end of a VPC Peering Connection
+    '''
+    __slots__ = ()
+
+    def __init__(self,remote_vpc_description,is_requester):
+        remote_vpc = build_peer_vpc(remote_vpc_description)
+        label_strings = ['Remote VPC']
+
+        if remote_vpc.owner_id is not None:
+            label_strings.append(remote_vpc.owner_id)
+        label_strings.append(remote_vpc.vpc_id)
+        label_strings.extend(str(cidr_block) for cidr_block in remote_vpc.cidr_blocks)
+
+        if is_requester:
+            label_strings.append("(Requester)")
+        else:
+            label_strings.append("(Accepter)")
+
+        Node.__init__(self,remote_vpc.vpc_id,label="\n".join(label_strings),shape="box")
@@ -0,0 +1,233 @@
+'''
+Answer "how does subnet X reach destination Y?" from a VPC snapshot, the
+way the VPC router does: pick the subnet's route table, then the route with
+the longest prefix matching the destination.
+
+Each route table's routes go in to one binary trie per address family, so a
+lookup walks at most 32 (IPv4) or 128 (IPv6) levels regardless of the number
+of routes.
+
+Of the routes with the same prefix, the router prefers a static route to a
+CIDR block, then one to a prefix list, then a propagated route, whatever
+their order in the route table.
+'''
+
+import ipaddress
+import json
+
+from .errors import VpcDiagramError
+from .model import build_vpc_model
+
+# The ranks of routes with the same prefix, the lowest preferred.
+STATIC_ROUTE_RANK = 0
+PREFIX_LIST_ROUTE_RANK = 1
+PROPAGATED_ROUTE_RANK = 2
+
+class PrefixTrie:
+    '''
+    Binary trie of IP prefixes for longest-prefix matching. Each trie node is
+    a list of [zero child, one child, value, rank].
+    '''
+    def __init__(self,max_prefix_length):
+        self._max_prefix_length = max_prefix_length
+        self._root = [None,None,None,None]
+
+    def insert(self,network,value,rank=STATIC_ROUTE_RANK):
+        '''
+        Add an ipaddress network. Of the values for the same network, the one
+        with the lowest rank is kept, and of those, the last added.
+        '''
+        trie_node = self._root
+        address = int(network.network_address)
+        for i in range(network.prefixlen):
+            bit = (address >> (self._max_prefix_length - 1 - i)) & 1
+            if trie_node[bit] is None:
+                trie_node[bit] = [None,None,None,None]
+            trie_node = trie_node[bit]
+        if trie_node[2] is None or rank <= trie_node[3]:
+            trie_node[2] = value
+            trie_node[3] = rank
+
+    def lookup(self,network):
+        '''
+        The value of the longest prefix containing the whole of the ipaddress
+        network (a single address being a /32 or /128), or None.
+        '''
+        trie_node = self._root
+        value = trie_node[2]
+        address = int(network.network_address)
+        for i in range(network.prefixlen):
+            bit = (address >> (self._max_prefix_length - 1 - i)) & 1
+            trie_node = trie_node[bit]
+            if trie_node is None:
+                break
+            if trie_node[2] is not None:
+                value = trie_node[2]
+        return value
+
+class RouteQueryEngine:
+    '''
+    Route lookups for the subnets of one VPC, from its model (see model.py).
+    '''
+    def __init__(self,vpc_model):
+        self._vpc_id = vpc_model.vpc.vpc_id
+        self._route_tries = {}
+        self._routes = {}
+        self._main_route_table_id = None
+        self._subnet_route_table_ids = {}
+
+        for route_table in vpc_model.route_tables:
+            route_table_id = route_table.route_table_id
+
+            if route_table.is_main:
+                self._main_route_table_id = route_table_id
+            for subnet_id in route_table.subnet_ids:
+                self._subnet_route_table_ids[subnet_id] = route_table_id
+
+            tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+            routes = []
+            for route in route_table.routes:
+                destination = route.destination
+                if destination is None:
+                    continue
+                result = {
+                    "RouteTableId": route_table_id,
+                    "Destination": destination,
+                    "Target": route.target_id,
+                    "State": "blackhole" if route.is_blackhole else "active",
+                    "Propagated": route.is_propagated,
+                }
+                rank = get_route_rank(route,destination in vpc_model.prefix_list_cidrs)
+                for cidr in vpc_model.prefix_list_cidrs.get(destination,[destination]):
+                    try:
+                        network = ipaddress.ip_network(cidr,strict=False)
+                    except ValueError:
+                        # A prefix list whose entries weren't collected
+                        continue
+                    tries[network.version].insert(network,result,rank)
+                    routes.append((network,result,rank))
+            self._route_tries[route_table_id] = tries
+            self._routes[route_table_id] = routes
+
+        self._subnet_ids = {}
+        for subnet in vpc_model.subnets:
+            self._subnet_ids[subnet.subnet_id] = subnet.subnet_id
+            if subnet.name is not None:
+                self._subnet_ids.setdefault(subnet.name,subnet.subnet_id)
+
+    def get_vpc_id(self):
+        return self._vpc_id
+
+    def has_subnet(self,subnet_id_or_name):
+        return subnet_id_or_name in self._subnet_ids
+
+    def get_route_table_id(self,subnet_id):
+        '''
+        The ID of the route table the subnet uses, or None if the VPC has no
+        main route table to fall back on.
+        '''
+        return self._subnet_route_table_ids.get(subnet_id,self._main_route_table_id)
+
+    def get_routes(self,route_table_id):
+        '''
+        The route table's routes, with prefix lists expanded to their CIDR
+        blocks, as a list of (ipaddress network, lookup result, rank) in
+        order.
+        '''
+        return list(self._routes[route_table_id])
+
+    def lookup(self,subnet_id_or_name,destination):
+        '''
+        Look up the route used from the subnet (ID or Name) to the
+        destination (an address or CIDR block). Returns a dict with the
+        subnet and route table used, the matching route's destination and
+        target, and whether the route is active or a blackhole. With no
+        matching route, the Target is None and the traffic is dropped.
+        '''
+        if subnet_id_or_name not in self._subnet_ids:
+            raise VpcDiagramError(f"subnet not found: {subnet_id_or_name}")
+        subnet_id = self._subnet_ids[subnet_id_or_name]
+
+        try:
+            network = ipaddress.ip_network(destination,strict=False)
+        except ValueError:
+            raise VpcDiagramError(f"not an IP address or CIDR block: {destination}")
+
+        route_table_id = self.get_route_table_id(subnet_id)
+        route = None
+        if route_table_id is not None:
+            route = self._route_tries[route_table_id][network.version].lookup(network)
+
+        result = {"SubnetId": subnet_id, "Query": destination, "RouteTableId": route_table_id}
+        if route is None:
+            result.update({"Destination": None, "Target": None, "State": "no route", "Propagated": False})
+        else:
+            result.update(route)
+        return result
+
+def get_route_rank(route,is_prefix_list):
+    '''
+    The rank of a route (see model.Route) among those with the same prefix:
+    a propagated route is ranked below a static one to a prefix list, which
+    is ranked below a static one to a CIDR block.
+    '''
+    if route.is_propagated:
+        return PROPAGATED_ROUTE_RANK
+    return PREFIX_LIST_ROUTE_RANK if is_prefix_list else STATIC_ROUTE_RANK
+
+def run_queries(snapshots,queries,output_format,stream):
+    '''
+    Run (subnet, destination) queries against the snapshots' subnets and
+    write one result per line to the stream, as text or JSON lines.
+    '''
+    engines = [RouteQueryEngine(build_vpc_model(snapshot)) for snapshot in snapshots.values()]
+
+    for subnet_id_or_name,destination in queries:
+        engine = None
+        for candidate in engines:
+            if candidate.has_subnet(subnet_id_or_name):
+                engine = candidate
+                break
+        if engine is None:
+            raise VpcDiagramError(f"subnet not found: {subnet_id_or_name}")
+
+        result = engine.lookup(subnet_id_or_name,destination)
+        if output_format == "json":
+            stream.write(json.dumps(result) + "\n")
+        else:
+            stream.write(format_query_result(result) + "\n")
+
+def format_query_result(result):
+    '''
+    One line of text describing a lookup result.
+    '''
+    text = f"{result['SubnetId']} -> {result['Query']}: "
+    if result["Target"] is None:
+        return text + f"no route in {result['RouteTableId']} (dropped)"
+
+    text += f"{result['RouteTableId']} {result['Destination']} via {result['Target']}"
+    if result["Propagated"]:
+        text += " (propagated)"
+    if result["State"] == "blackhole":
+        text += " (blackhole)"
+    return text
+
+def read_query_file(filename):
+    '''
+    Read (subnet, destination) pairs from a file, one per line, separated by
+    whitespace or a comma. Blank lines and lines starting with # are skipped.
+    '''
+    queries = []
+    try:
+        with open(filename,encoding="utf-8") as f:
+            for line_number,line in enumerate(f,1):
+                line = line.strip()
+                if line == "" or line.startswith("#"):
+                    continue
+                fields = line.replace(","," ").split()
+                if len(fields) != 2:
+                    raise VpcDiagramError(f"{filename} line {line_number}: expected a subnet and a destination")
+                queries.append((fields[0],fields[1]))
+    except OSError as e:
+        raise VpcDiagramError(f"cannot read query file {filename}: {e}")
+    return queries
@@ -0,0 +1,387 @@
+'''
+A long-running diagram server, for portals that would otherwise run the
+script once per page view and pay for the interpreter, the boto3 import,
+every API call and a dot process each time.
+
+    python -m vpc_network_diagram.server --region us-west-2 --port 8080
+
+    GET /vpc/<VPC ID or Name>.svg     (or any of the file types, or .json
+                                       for the collected snapshot, or
+                                       .ndjson, .graphml or .mmd exports)
+    GET /vpc/<VPC ID or Name>.png?internet=1&refresh=1
+    GET /vpc/<VPC ID or Name>/overview.svg
+    GET /vpc/<VPC ID or Name>/az/<availability zone>.svg
+
+The EC2 client is created once and kept warm. Collected snapshots and
+rendered diagrams are cached in memory for a time to live, and concurrent
+requests for the same VPC share a single collection (and for the same
+diagram, a single render). Renders run as dot processes, at most
+--render-workers at once.
+
+For very large VPCs, the overview has a box per availability zone in place
+of its subnets, linking to the zone's detail diagram (see hierarchy.py).
+Each view is rendered on its first request, from one graph of the VPC.
+'''
+
+import asyncio
+import collections
+import io
+import json
+import os
+import sys
+import time
+import urllib.parse
+from argparse import ArgumentParser
+
+from .collect import DEFAULT_MAX_WORKERS, create_session, create_ec2_client, get_vpc_description, collect_vpc_snapshot
+from .dot import RENDER_FORMATS
+from .export import EXPORT_FORMATS
+from .errors import VpcDiagramError
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_SNAPSHOT_TTL = 300
+DEFAULT_RENDER_TTL = 300
+DEFAULT_CACHE_ENTRIES = 256
+
+# Longest request line or header line accepted, and most header lines.
+MAX_LINE_LENGTH = 8192
+MAX_HEADERS = 100
+
+CONTENT_TYPES = {
+    ".dot": "text/vnd.graphviz; charset=utf-8",
+    ".gv": "text/vnd.graphviz; charset=utf-8",
+    ".jpg": "image/jpeg",
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+    ".json": "application/json",
+    ".ndjson": "application/x-ndjson",
+    ".graphml": "application/graphml+xml",
+    ".mmd": "text/plain; charset=utf-8",
+}
+
+class HttpError(Exception):
+    '''
+    An error response: the status and reason, and a message for the body.
+    '''
+    def __init__(self,status,reason,message):
+        Exception.__init__(self,message)
+        self.status = status
+        self.reason = reason
+
+class TtlCache:
+    '''
+    A dict whose entries expire ttl seconds after they were put, holding at
+    most max_entries (the least recently used are dropped first).
+    '''
+    def __init__(self,ttl,max_entries=DEFAULT_CACHE_ENTRIES):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def get(self,key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expiry,value = entry
+        if time.monotonic() >= expiry:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self,key,value):
+        if self._ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self._ttl,value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+class DiagramServer:
+    '''
+    Serves diagrams and snapshots of the VPCs seen by one EC2 client. All
+    methods are called from the event loop's thread; collection and graph
+    building run in its default executor.
+    '''
+    def __init__(self,ec2_client,snapshot_ttl=DEFAULT_SNAPSHOT_TTL,render_ttl=DEFAULT_RENDER_TTL,
+            render_workers=None,max_workers=DEFAULT_MAX_WORKERS,program="dot"):
+        self._ec2_client = ec2_client
+        self._snapshots = TtlCache(snapshot_ttl)
+        self._graphs = TtlCache(render_ttl)
+        self._outputs = TtlCache(render_ttl)
+        self._render_semaphore = asyncio.Semaphore(render_workers or os.cpu_count() or 1)
+        self._max_workers = max_workers
+        self._program = program
+        self._in_flight = {}
+
+    async def _coalesce(self,key,function,*args):
+        '''
+        Await function(*args), unless a call with the same key is already in
+        flight, in which case await that call's result instead.
+        '''
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function(*args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key,None))
+        # Shielded, so that a client hanging up doesn't cancel the call for
+        # the others waiting on it.
+        return await asyncio.shield(task)
+
+    async def get_snapshot(self,vpc,refresh=False):
+        '''
+        The snapshot of a VPC (ID, Name or "default"), from the cache or
+        collected.
+        '''
+        snapshot = None if refresh else self._snapshots.get(vpc)
+        if snapshot is None:
+            snapshot = await self._coalesce(("snapshot",vpc),self._collect_snapshot,vpc)
+        return snapshot
+
+    async def _collect_snapshot(self,vpc):
+        def collect():
+            vpc_description = get_vpc_description(self._ec2_client,vpc)
+            return collect_vpc_snapshot(self._ec2_client,vpc_description,max_workers=self._max_workers)
+        snapshot = await asyncio.get_running_loop().run_in_executor(None,collect)
+        self._snapshots.put(vpc,snapshot)
+        return snapshot
+
+    async def get_output(self,vpc,snapshot,file_type,show_internet=False,view=None):
+        '''
+        The body of the response for a VPC's diagram (or with a file type of
+        .json, its snapshot, or of an export, its graph in that format), from
+        the cache or made from the snapshot. The view is None for the whole
+        diagram, "overview", or "az/<availability zone>" for a zone's detail.
+        '''
+        key = (vpc,file_type,show_internet,view)
+        entry = self._outputs.get(key)
+        # A cached output is only good for the snapshot it was made from
+        if entry is not None and entry[0] is snapshot:
+            return entry[1]
+        output = await self._coalesce(("output",id(snapshot)) + key,self._create_output,
+            vpc,snapshot,file_type,show_internet,view)
+        self._outputs.put(key,(snapshot,output))
+        return output
+
+    async def get_graph(self,vpc,snapshot,show_internet=False):
+        '''
+        The graph of a VPC's snapshot, from the cache or built, shared by the
+        views of its diagram.
+        '''
+        from .graph import build_graph
+
+        key = (vpc,show_internet)
+        entry = self._graphs.get(key)
+        if entry is not None and entry[0] is snapshot:
+            return entry[1]
+        graph = await self._coalesce(("graph",id(snapshot)) + key,
+            asyncio.get_running_loop().run_in_executor,None,build_graph,snapshot,show_internet)
+        self._graphs.put(key,(snapshot,graph))
+        return graph
+
+    async def _create_output(self,vpc,snapshot,file_type,show_internet,view):
+        loop = asyncio.get_running_loop()
+        if file_type == ".json":
+            return await loop.run_in_executor(None,lambda: json.dumps(snapshot,default=lambda o: o.isoformat()).encode("utf-8"))
+
+        graph = await self.get_graph(vpc,snapshot,show_internet)
+        if view is not None:
+            graph = await loop.run_in_executor(None,get_view_graph,graph,view,file_type,show_internet)
+        if file_type in EXPORT_FORMATS:
+            return await loop.run_in_executor(None,export_to_bytes,graph,file_type)
+        dot_text = await loop.run_in_executor(None,graph.to_string)
+        async with self._render_semaphore:
+            return await self._render(dot_text,file_type)
+
+    async def _render(self,dot_text,file_type):
+        try:
+            process = await asyncio.create_subprocess_exec(self._program,f"-T{RENDER_FORMATS[file_type]}",
+                stdin=asyncio.subprocess.PIPE,stdout=asyncio.subprocess.PIPE,stderr=asyncio.subprocess.PIPE)
+        except FileNotFoundError:
+            raise VpcDiagramError(f"graphviz '{self._program}' not found in path")
+        stdout,stderr = await process.communicate(dot_text.encode("utf-8"))
+        if process.returncode != 0:
+            raise VpcDiagramError(f"{self._program} failed: {stderr.decode('utf-8',errors='replace').strip()}")
+        return stdout
+
+    # HTTP ------------------------------------------------------------
+
+    async def handle_connection(self,reader,writer):
+        '''
+        Serve one request per connection.
+        '''
+        start = time.perf_counter()
+        method = path = "-"
+        try:
+            try:
+                method,path,query = await read_request(reader)
+                file_type,body = await self.handle_request(method,path,query)
+                status,reason,content_type = 200,"OK",CONTENT_TYPES[file_type]
+            except HttpError as e:
+                status,reason,content_type,body = e.status,e.reason,"text/plain; charset=utf-8",f"{e}\n".encode("utf-8")
+            headers = [f"HTTP/1.1 {status} {reason}",f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}","Connection: close"]
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("ascii"))
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+            sys.stderr.write(f"{method} {path} {status} {time.perf_counter() - start:.3f}s\n")
+        except (ConnectionError,asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self,method,path,query):
+        '''
+        Returns a tuple of (file type, body), or raises HttpError.
+        '''
+        import botocore.exceptions
+
+        if method not in ["GET","HEAD"]:
+            raise HttpError(405,"Method Not Allowed",f"method not allowed: {method}")
+        if path == "/health":
+            return ".json",b'{"Status": "ok"}'
+
+        # /vpc/<vpc><ext>, /vpc/<vpc>/overview<ext> or /vpc/<vpc>/az/<az><ext>
+        parts = [urllib.parse.unquote(part) for part in path.split("/")]
+        name,file_type = os.path.splitext(parts[-1])
+        vpc,view = name,None
+        if len(parts) == 4 and name == "overview":
+            vpc,view = parts[2],"overview"
+        elif len(parts) == 5 and parts[3] == "az" and name != "":
+            vpc,view = parts[2],f"az/{name}"
+        elif len(parts) != 3:
+            vpc = ""
+        if vpc == "" or parts[1] != "vpc" or file_type not in CONTENT_TYPES or (view is not None and file_type == ".json"):
+            raise HttpError(404,"Not Found",f"not found: {path} (expected /vpc/<VPC ID or Name>"
+                f"[/overview or /az/<availability zone>]{{{','.join(CONTENT_TYPES)}}})")
+
+        try:
+            snapshot = await self.get_snapshot(vpc,refresh=is_true(query,"refresh"))
+        except VpcDiagramError as e:
+            raise HttpError(404,"Not Found",str(e))
+        except (botocore.exceptions.BotoCoreError,botocore.exceptions.ClientError) as e:
+            raise HttpError(502,"Bad Gateway",str(e))
+
+        try:
+            body = await self.get_output(vpc,snapshot,file_type,show_internet=is_true(query,"internet"),view=view)
+        except VpcDiagramError as e:
+            raise HttpError(500,"Internal Server Error",str(e))
+        return file_type,body
+
+def get_view_graph(graph,view,file_type,show_internet):
+    '''
+    The overview graph, or the detail graph of an availability zone, of a
+    VPC's graph. Their links are relative to the view's path, and keep the
+    file type and query.
+    '''
+    from .hierarchy import get_availability_zones, build_overview_graph, build_detail_graph
+
+    query = "?internet=1" if show_internet else ""
+    availability_zones = get_availability_zones(graph)
+    if view == "overview":
+        detail_urls = {availability_zone: f"az/{urllib.parse.quote(availability_zone)}{file_type}{query}"
+            for availability_zone in availability_zones}
+        return build_overview_graph(graph,availability_zones,detail_urls)
+
+    availability_zone = view[len("az/"):]
+    if availability_zone not in availability_zones:
+        raise HttpError(404,"Not Found",f"no subnets in availability zone: {availability_zone}")
+    return build_detail_graph(graph,availability_zones[availability_zone],f"../overview{file_type}{query}")
+
+def export_to_bytes(graph,file_type):
+    '''
+    The graph exported in the format of the file type (see export.py).
+    '''
+    stream = io.StringIO()
+    EXPORT_FORMATS[file_type](graph,stream)
+    return stream.getvalue().encode("utf-8")
+
+async def read_request(reader):
+    '''
+    Read an HTTP request's line and headers. Returns a tuple of (method,
+    path, {query parameter: [values]}).
+    '''
+    request_line = await read_line(reader)
+    parts = request_line.split(" ")
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise HttpError(400,"Bad Request",f"bad request line: {request_line}")
+
+    for _ in range(MAX_HEADERS):
+        if await read_line(reader) == "":
+            break
+    else:
+        raise HttpError(400,"Bad Request","too many headers")
+
+    url = urllib.parse.urlsplit(parts[1])
+    return parts[0],url.path,urllib.parse.parse_qs(url.query)
+
+async def read_line(reader):
+    try:
+        line = await reader.readuntil(b"\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(400,"Bad Request","line too long")
+    return line.decode("latin-1").rstrip("\r\n")
+
+def is_true(query,name):
+    return query.get(name,["0"])[-1].lower() in ["1","true","yes"]
+
+async def serve(diagram_server,host=DEFAULT_HOST,port=DEFAULT_PORT):
+    server = await asyncio.start_server(diagram_server.handle_connection,host,port,limit=MAX_LINE_LENGTH)
+    for socket in server.sockets:
+        sys.stderr.write(f"Serving on http://{socket.getsockname()[0]}:{socket.getsockname()[1]}/\n")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    '''
+    Main entry point
+    '''
+    parser = ArgumentParser(
+        description = "Serve network diagrams of AWS VPCs over HTTP",
+    )
+    parser.add_argument("--profile",
+        help="AWS Profile")
+    parser.add_argument("--region",
+        help="AWS Region")
+    parser.add_argument("--endpoint-url",
+        help="URL of the EC2 endpoint to use in place of AWS's, e.g. a local stub")
+    parser.add_argument("--host",default=DEFAULT_HOST,
+        help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port",type=int,default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--snapshot-ttl",type=float,default=DEFAULT_SNAPSHOT_TTL,metavar="SECONDS",
+        help=f"How long collected VPC data is reused (default: {DEFAULT_SNAPSHOT_TTL})")
+    parser.add_argument("--render-ttl",type=float,default=DEFAULT_RENDER_TTL,metavar="SECONDS",
+        help=f"How long rendered diagrams are reused, while their VPC data is (default: {DEFAULT_RENDER_TTL})")
+    parser.add_argument("--render-workers",type=int,default=os.cpu_count(),
+        help="Maximum number of diagrams rendered at once (default: number of CPUs)")
+    parser.add_argument("--max-workers",type=int,default=DEFAULT_MAX_WORKERS,
+        help=f"Maximum number of concurrent AWS API calls per VPC (default: {DEFAULT_MAX_WORKERS})")
+    args = parser.parse_args(argv)
+
+    if args.render_workers is None or args.render_workers < 1:
+        args.render_workers = 1
+    if args.max_workers < 1:
+        sys.stderr.write("ERROR - --max-workers must be at least 1\n")
+        sys.exit(1)
+
+    ec2_client = create_ec2_client(create_session(args.profile,args.region),args.endpoint_url)
+
+    async def run():
+        diagram_server = DiagramServer(ec2_client,args.snapshot_ttl,args.render_ttl,
+            args.render_workers,args.max_workers)
+        await serve(diagram_server,args.host,args.port)
+
+    try:
+        asyncio.run(run())
+    except OSError as e:
+        sys.stderr.write(f"ERROR - {e}\n")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
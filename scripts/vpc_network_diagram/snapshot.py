@@ -0,0 +1,93 @@
+'''
+Snapshot files: the collected describe responses for one or more VPCs saved
+to disk, so diagrams can be rendered later without any AWS API calls.
+'''
+
+import datetime
+import gzip
+import json
+
+from .descriptions import get_aws_name
+from .errors import VpcDiagramError
+
+# Snapshot files are identified by format name and versioned so that older
+# files keep loading as the snapshot contents grow.
+SNAPSHOT_FORMAT = "vpc-network-diagram-snapshot"
+SNAPSHOT_VERSION = 2
+
+def save_snapshots(filename,snapshots):
+    '''
+    Save a dict of {vpc_id: snapshot}, as returned by collect_vpc_snapshot()
+    and collect_region_snapshots(), to a gzip'd JSON file. The snapshots hold
+    the raw describe responses, so nothing is lost for rendering later.
+    '''
+    document = {
+        "Format": SNAPSHOT_FORMAT,
+        "Version": SNAPSHOT_VERSION,
+        "Created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "Snapshots": list(snapshots.values()),
+    }
+    with gzip.open(filename,"wt",encoding="utf-8") as f:
+        # boto3 returns datetime objects for things like CreateTime
+        json.dump(document,f,separators=(",",":"),default=lambda o: o.isoformat())
+
+def load_snapshots(filename):
+    '''
+    Load the snapshots saved by save_snapshots() as a dict of
+    {vpc_id: snapshot}.
+    '''
+    try:
+        with gzip.open(filename,"rt",encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError,ValueError) as e:
+        raise VpcDiagramError(f"cannot read snapshot file {filename}: {e}")
+
+    if not isinstance(document,dict) or document.get("Format") != SNAPSHOT_FORMAT:
+        raise VpcDiagramError(f"not a snapshot file: {filename}")
+
+    if document["Version"] > SNAPSHOT_VERSION:
+        raise VpcDiagramError(f"snapshot file version {document['Version']} is newer than this script supports: {filename}")
+
+    snapshots = {}
+    for snapshot in document["Snapshots"]:
+        snapshots[snapshot["Vpc"]["VpcId"]] = snapshot
+    return snapshots
+
+def select_snapshots(snapshots,all_vpcs=False,vpc_ids_or_names=None,tags=None):
+    '''
+    The offline counterpart of get_vpc_description() and
+    get_vpc_descriptions(): select snapshots by VPC ID, Name, "default",
+    and/or tags ("Key=Value", or just "Key" for any value).
+    '''
+    candidates = {}
+    for vpc_id,snapshot in snapshots.items():
+        vpc_tags = {}
+        for tag in snapshot["Vpc"].get("Tags",[]):
+            vpc_tags[tag["Key"]] = tag["Value"]
+        is_match = True
+        for tag in tags or []:
+            key,_,value = tag.partition("=")
+            if key not in vpc_tags or ("=" in tag and vpc_tags[key] != value):
+                is_match = False
+                break
+        if is_match:
+            candidates[vpc_id] = snapshot
+
+    if all_vpcs or not vpc_ids_or_names:
+        return candidates
+
+    selected = {}
+    for vpc_id_or_name in vpc_ids_or_names:
+        matches = []
+        for vpc_id,snapshot in candidates.items():
+            if vpc_id == vpc_id_or_name \
+                or (vpc_id_or_name == "default" and snapshot["Vpc"].get("IsDefault")) \
+                or get_aws_name(snapshot["Vpc"]) == vpc_id_or_name:
+                matches.append(vpc_id)
+        if len(matches) == 0:
+            raise VpcDiagramError(f"VPC not found in snapshot: {vpc_id_or_name}")
+        if len(matches) > 1:
+            raise VpcDiagramError(f"Found more than one VPC matching '{vpc_id_or_name}'. Use ID instead.")
+        selected[matches[0]] = candidates[matches[0]]
+
+    return selected
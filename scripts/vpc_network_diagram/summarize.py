@@ -0,0 +1,311 @@
+'''
+Summarize the graph of a very large VPC so that it stays readable and quick
+to render. Subnets are grouped in to clusters by availability zone and route
+table, and when the graph has more nodes than a budget, subnets that look
+alike are collapsed in to one node with a count.
+
+The collapse levels, each coarser than the last:
+
+0. Nothing is collapsed.
+1. Subnets in the same availability zone with the same route table and CIDR
+   pattern (the prefix lengths of their CIDR blocks) become one node.
+2. As 1, across availability zones.
+3. Route tables with identical routes become one node, and the subnets
+   associated with them one node per CIDR pattern.
+4. As 3, for route tables with routes to the same targets, whatever the
+   destinations.
+
+The lowest level that brings the node count within the budget is used, or
+the highest if none does. Once anything is collapsed, the parallel edges
+that collapsing creates are merged, with the route destinations of their
+labels combined and cut short.
+'''
+
+import ipaddress
+
+from .addresses import add_utilization_heat
+from .dot import Graph, Node, Edge, Subgraph
+from .nodes import SubnetNode, RouteTableNode
+
+DEFAULT_NODE_BUDGET = 150
+COLLAPSE_LEVELS = [0,1,2,3,4]
+
+# Route destinations shown in an edge label once anything is collapsed.
+MAX_LABEL_DESTINATIONS = 6
+
+AVAILABILITY_ZONE_CLUSTER_ATTRIBUTES = {"style": "rounded", "color": "gray50", "fontcolor": "gray30"}
+ROUTE_TABLE_CLUSTER_ATTRIBUTES = {"style": "dashed", "color": "gray70", "fontcolor": "gray40"}
+
+class SummaryNode(Node):
+    '''
+    A node that several subnets or route tables were collapsed in to, with
+    their names.
+    '''
+    __slots__ = ("_member_names",)
+
+    def __init__(self,name,member_names,**attributes):
+        Node.__init__(self,name,**attributes)
+        self._member_names = member_names
+
+    def get_member_names(self):
+        return list(self._member_names)
+
+def summarize_graph(graph,node_budget=DEFAULT_NODE_BUDGET,level=None):
+    '''
+    Return a tuple of (summarized graph, collapse level used). Given a
+    level, it is used whatever the node count.
+    '''
+    subnets = get_subnet_summaries(graph)
+    route_table_groups_by_level = {
+        3: get_route_table_groups(graph,subnets,by_destination=True),
+        4: get_route_table_groups(graph,subnets,by_destination=False),
+    }
+
+    if level is None:
+        node_count = len(graph.get_nodes())
+        for level in COLLAPSE_LEVELS:
+            route_table_groups = route_table_groups_by_level.get(level,{})
+            collapsed_names = get_collapsed_names(subnets,route_table_groups,level)
+            if node_count - len(collapsed_names) + len(set(collapsed_names.values())) <= node_budget:
+                break
+    else:
+        route_table_groups = route_table_groups_by_level.get(level,{})
+        collapsed_names = get_collapsed_names(subnets,route_table_groups,level)
+
+    summary_graph = Graph(graph.get_name(),graph_type=graph.get_graph_type(),**graph.attributes)
+
+    # Nodes
+    members = {}
+    for node in graph.get_nodes():
+        collapsed_name = collapsed_names.get(node.get_name())
+        if collapsed_name is None:
+            summary_graph.add_node(node)
+        else:
+            members.setdefault(collapsed_name,[]).append(node.get_name())
+    for collapsed_name,node_names in members.items():
+        if node_names[0] in subnets:
+            summary_node = create_subnet_summary_node(collapsed_name,node_names,subnets)
+            # Subnets colored by utilization stay colored once collapsed
+            if "fillcolor" in graph.get_node(node_names[0]).attributes:
+                add_utilization_heat(summary_node,[graph.get_node(name).get_subnet() for name in node_names])
+            summary_graph.add_node(summary_node)
+        else:
+            summary_graph.add_node(create_route_table_summary_node(collapsed_name,node_names))
+
+    # Edges. Without collapsing, only identical edges are merged.
+    if level == 0:
+        edge_keys = set()
+        for edge in graph.get_edges():
+            edge_key = (edge.get_source(),edge.get_destination(),tuple(sorted(edge.attributes.items())))
+            if edge_key not in edge_keys:
+                edge_keys.add(edge_key)
+                summary_graph.add_edge(edge)
+    else:
+        for edge in merge_edges(graph.get_edges(),collapsed_names):
+            summary_graph.add_edge(edge)
+
+    add_clusters(summary_graph,subnets,collapsed_names,route_table_groups,level)
+
+    return summary_graph,level
+
+def get_subnet_summaries(graph):
+    '''
+    The availability zone, route table and CIDR pattern of each subnet in
+    the graph, as a dict of {subnet_id: (availability zone, route table ID
+    or None, CIDR pattern, first IPv4 CIDR block or None)}. The route table
+    is the one the subnet's edge leads to.
+    '''
+    subnet_nodes = {}
+    route_table_names = set()
+    for node in graph.get_nodes():
+        if isinstance(node,SubnetNode):
+            subnet_nodes[node.get_name()] = node
+        elif isinstance(node,RouteTableNode):
+            route_table_names.add(node.get_name())
+
+    route_table_ids = {}
+    for edge in graph.get_edges():
+        if edge.get_source() in subnet_nodes and edge.get_destination() in route_table_names:
+            route_table_ids[edge.get_source()] = edge.get_destination()
+
+    subnets = {}
+    for subnet_id,subnet_node in subnet_nodes.items():
+        subnet = subnet_node.get_subnet()
+        ipv4_cidr_blocks = [cidr_block for cidr_block in subnet.cidr_blocks if isinstance(cidr_block,ipaddress.IPv4Network)]
+        subnets[subnet_id] = (subnet.availability_zone,route_table_ids.get(subnet_id),
+            get_cidr_pattern(subnet),ipv4_cidr_blocks[0] if len(ipv4_cidr_blocks) > 0 else None)
+    return subnets
+
+def get_cidr_pattern(subnet):
+    '''
+    The prefix lengths of a subnet's CIDR blocks, e.g. "/24 /64".
+    '''
+    return " ".join(f"/{str(cidr_block).split('/')[-1]}" for cidr_block in subnet.cidr_blocks)
+
+def get_route_table_groups(graph,subnets,by_destination=True):
+    '''
+    The route tables with identical routes (the same edges to the same
+    route targets, and if by_destination, with the same labels), as a dict
+    of {route_table_id: ID of the group's first route table}, for the groups
+    of more than one.
+    '''
+    subnet_ids = set(subnets)
+    routes = {}
+    for node in graph.get_nodes():
+        if isinstance(node,RouteTableNode):
+            routes[node.get_name()] = set()
+    for edge in graph.get_edges():
+        if edge.get_source() in routes and edge.get_destination() not in subnet_ids:
+            attributes = edge.attributes if by_destination else get_unlabeled_attributes(edge.attributes)
+            routes[edge.get_source()].add((edge.get_destination(),tuple(sorted(attributes.items()))))
+
+    groups = {}
+    for route_table_id,route_table_routes in routes.items():
+        groups.setdefault(tuple(sorted(route_table_routes)),[]).append(route_table_id)
+
+    route_table_groups = {}
+    for route_table_ids in groups.values():
+        if len(route_table_ids) > 1:
+            for route_table_id in route_table_ids:
+                route_table_groups[route_table_id] = route_table_ids[0]
+    return route_table_groups
+
+def get_collapsed_names(subnets,route_table_groups,level):
+    '''
+    The nodes collapsed at a level, as a dict of {node name: name of the
+    node it is collapsed in to}. Groups of one aren't collapsed.
+    '''
+    groups = {}
+    if level >= 3:
+        for route_table_id,first_route_table_id in route_table_groups.items():
+            groups.setdefault(f"route-tables:{first_route_table_id}",[]).append(route_table_id)
+
+    if level >= 1:
+        for subnet_id,(availability_zone,route_table_id,cidr_pattern,_) in subnets.items():
+            if level >= 3 and route_table_id in route_table_groups:
+                route_table_id = f"route-tables:{route_table_groups[route_table_id]}"
+            if level >= 2:
+                availability_zone = None
+            groups.setdefault(f"subnets:{availability_zone or ''}:{route_table_id or ''}:{cidr_pattern}",[]).append(subnet_id)
+
+    collapsed_names = {}
+    for collapsed_name,node_names in groups.items():
+        if len(node_names) > 1:
+            for node_name in node_names:
+                collapsed_names[node_name] = collapsed_name
+    return collapsed_names
+
+def create_subnet_summary_node(name,subnet_ids,subnets):
+    '''
+    The node standing for several subnets: their count, availability zones,
+    CIDR pattern and the range of their IPv4 CIDR blocks.
+    '''
+    availability_zones = sorted(set(subnets[subnet_id][0] or "" for subnet_id in subnet_ids))
+    label_list = [f"{len(subnet_ids)} Subnets"]
+    label_list.append(availability_zones[0] if len(availability_zones) == 1 else f"{len(availability_zones)} AZs")
+    label_list.append(subnets[subnet_ids[0]][2])
+    cidr_blocks = sorted(subnets[subnet_id][3] for subnet_id in subnet_ids if subnets[subnet_id][3] is not None)
+    if len(cidr_blocks) > 0:
+        label_list.append(f"{cidr_blocks[0]} .. {cidr_blocks[-1]}")
+    return SummaryNode(name,subnet_ids,label="\n".join(label_list),shape="box3d")
+
+def create_route_table_summary_node(name,route_table_ids):
+    '''
+    The node standing for several route tables with identical routes.
+    '''
+    label_list = [f"{len(route_table_ids)} Route Tables",f"{min(route_table_ids)} .. {max(route_table_ids)}"]
+    return SummaryNode(name,route_table_ids,label="\n".join(label_list),shape="box3d")
+
+def get_unlabeled_attributes(attributes):
+    return {k: v for k,v in attributes.items() if k != "label"}
+
+def merge_edges(edges,collapsed_names):
+    '''
+    Move the edges on to the nodes they are collapsed in to, and merge the
+    edges with the same endpoints and attributes other than their labels.
+    The labels, lists of route destinations, are combined and cut short.
+    Returns the list of edges.
+    '''
+    merged_edges = {}
+    for edge in edges:
+        source = collapsed_names.get(edge.get_source(),edge.get_source())
+        destination = collapsed_names.get(edge.get_destination(),edge.get_destination())
+        attributes = get_unlabeled_attributes(edge.attributes)
+        edge_key = (source,destination,tuple(sorted(attributes.items())))
+        if edge_key not in merged_edges:
+            merged_edges[edge_key] = (attributes,{})
+        if "label" in edge.attributes:
+            # A dict, as an ordered set
+            merged_edges[edge_key][1].update(dict.fromkeys(edge.attributes["label"].split(",")))
+
+    merged_edge_list = []
+    for (source,destination,_),(attributes,destinations) in merged_edges.items():
+        if len(destinations) > 0:
+            attributes["label"] = shorten_label(list(destinations))
+        merged_edge_list.append(Edge(source,destination,**attributes))
+    return merged_edge_list
+
+def shorten_label(destinations):
+    '''
+    An edge label listing at most MAX_LABEL_DESTINATIONS of the
+    destinations, and how many more there are.
+    '''
+    if len(destinations) <= MAX_LABEL_DESTINATIONS:
+        return ",".join(destinations)
+    return ",".join(destinations[:MAX_LABEL_DESTINATIONS]) + f",(+{len(destinations) - MAX_LABEL_DESTINATIONS} more)"
+
+def add_clusters(graph,subnets,collapsed_names,route_table_groups,level):
+    '''
+    Add the subnet clusters: by availability zone and, within those, by
+    route table. From level 2 subnets are no longer split by availability
+    zone, so there are only route table clusters, holding their route
+    tables.
+    '''
+    clusters = {}
+    for subnet_id,(availability_zone,route_table_id,_,_) in subnets.items():
+        if level >= 2:
+            availability_zone = None
+        if level >= 3 and route_table_id in route_table_groups:
+            route_table_id = f"route-tables:{route_table_groups[route_table_id]}"
+        node_names = clusters.setdefault(availability_zone,{}).setdefault(route_table_id,[])
+        node_name = collapsed_names.get(subnet_id,subnet_id)
+        if node_name not in node_names:
+            node_names.append(node_name)
+
+    for availability_zone in sorted(clusters,key=lambda az: az or ""):
+        if availability_zone is not None:
+            parent = Subgraph(f"cluster_{availability_zone}",label=availability_zone,**AVAILABILITY_ZONE_CLUSTER_ATTRIBUTES)
+            graph.add_subgraph(parent)
+        else:
+            parent = graph
+
+        for route_table_id in sorted(clusters[availability_zone],key=lambda rtb: rtb or ""):
+            node_names = sorted(clusters[availability_zone][route_table_id])
+            if route_table_id is None:
+                subgraph = parent
+            else:
+                cluster_name = route_table_id if availability_zone is None else f"{availability_zone}_{route_table_id}"
+                subgraph = Subgraph(f"cluster_{cluster_name}",
+                    label=get_route_table_cluster_label(graph,route_table_id),**ROUTE_TABLE_CLUSTER_ATTRIBUTES)
+                parent.add_subgraph(subgraph)
+                if availability_zone is None:
+                    node_names.insert(0,route_table_id)
+            if subgraph is graph:
+                # Subnets without a route table in no availability zone
+                # aren't clustered.
+                continue
+            for node_name in node_names:
+                subgraph.add_node_name(node_name)
+
+def get_route_table_cluster_label(graph,route_table_id):
+    '''
+    A route table cluster's label: the route table's Name, or ID, or for
+    collapsed route tables their count.
+    '''
+    node = graph.get_node(route_table_id)
+    if node is None:
+        return route_table_id
+    label_list = node.attributes.get("label","").split("\n")
+    if route_table_id.startswith("route-tables:"):
+        return label_list[0]
+    return label_list[1] if len(label_list) > 1 else route_table_id
@@ -0,0 +1,526 @@
+'''
+Build VPC snapshots from Terraform instead of the EC2 API: the JSON output
+of "terraform show -json" for a state file or a saved plan.
+
+The aws_* resources are turned in to the same descriptions that the EC2
+describe calls return, so the snapshots render, query and diff like any
+other. Resources that a plan hasn't created yet have no ID; they get their
+Terraform address as a placeholder ID, and the attributes that refer to
+them (vpc_id, subnet_id, gateway_id, ...) are resolved through the
+references in the plan's configuration.
+
+The file is stream-parsed with the ijson module (see requirements.txt),
+keeping only the aws_* resources of interest, so large state files needn't
+be loaded whole. Without ijson, only files up to MAX_UNSTREAMED_BYTES are
+read, with json.load.
+'''
+
+import json
+import os
+import re
+
+from .errors import VpcDiagramError
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Errors from reading a malformed or truncated file
+READ_ERRORS = (OSError,ValueError) + ((ijson.JSONError,) if ijson is not None else ())
+
+# The largest file read whole with json.load when ijson isn't installed.
+MAX_UNSTREAMED_BYTES = 64 * 1024 * 1024
+
+# Where the resources are in the JSON: the state's values, or the plan's
+# planned values (the plan's prior_state is ignored). Child modules nest.
+RESOURCE_PREFIX_RE = re.compile(r"^(values|planned_values)\.root_module(\.child_modules\.item)*\.resources\.item$")
+
+# The plan's configuration, with the module calls it passes through.
+CONFIGURATION_PREFIX_RE = re.compile(r"^configuration\.root_module((?:\.module_calls\.[^.]+\.module)*)\.resources\.item$")
+
+# A resource reference in the configuration, e.g. aws_subnet.public[count.index].id
+REFERENCE_RE = re.compile(r'^(?P<address>aws_\w+\.\w+)(?:\[(?P<index>[^\]]+)\])?(?:\.(?P<attribute>\w+))?')
+
+# aws_route and the aws_route_table route blocks: Terraform attribute, and
+# EC2 route key.
+ROUTE_DESTINATION_ATTRIBUTES = [
+    ("destination_cidr_block","DestinationCidrBlock"),
+    ("destination_ipv6_cidr_block","DestinationIpv6CidrBlock"),
+    ("destination_prefix_list_id","DestinationPrefixListId"),
+    ("cidr_block","DestinationCidrBlock"),
+    ("ipv6_cidr_block","DestinationIpv6CidrBlock"),
+]
+ROUTE_TARGET_ATTRIBUTES = [
+    ("gateway_id","GatewayId"),
+    ("nat_gateway_id","NatGatewayId"),
+    ("egress_only_gateway_id","EgressOnlyInternetGatewayId"),
+    ("transit_gateway_id","TransitGatewayId"),
+    ("vpc_peering_connection_id","VpcPeeringConnectionId"),
+    ("carrier_gateway_id","CarrierGatewayId"),
+    ("local_gateway_id","LocalGatewayId"),
+    ("network_interface_id","NetworkInterfaceId"),
+    ("vpc_endpoint_id","GatewayId"),
+    ("core_network_arn","CoreNetworkArn"),
+]
+
+# The attributes of each resource type that refer to other resources, and
+# so may need resolving from the configuration.
+REFERENCE_ATTRIBUTES = {
+    "aws_subnet": ["vpc_id"],
+    "aws_route_table": ["vpc_id"],
+    "aws_default_route_table": ["default_route_table_id"],
+    "aws_main_route_table_association": ["vpc_id","route_table_id"],
+    "aws_route_table_association": ["subnet_id","route_table_id"],
+    "aws_route": ["route_table_id","destination_prefix_list_id"] + [a for a,_ in ROUTE_TARGET_ATTRIBUTES],
+    "aws_internet_gateway": ["vpc_id"],
+    "aws_internet_gateway_attachment": ["vpc_id","internet_gateway_id"],
+    "aws_egress_only_internet_gateway": ["vpc_id"],
+    "aws_nat_gateway": ["subnet_id"],
+    "aws_vpc_peering_connection": ["vpc_id","peer_vpc_id"],
+    "aws_vpn_gateway": ["vpc_id"],
+    "aws_vpn_gateway_attachment": ["vpc_id","vpn_gateway_id"],
+    "aws_vpn_connection": ["vpn_gateway_id","transit_gateway_id"],
+    "aws_ec2_transit_gateway": [],
+    "aws_ec2_transit_gateway_vpc_attachment": ["vpc_id","transit_gateway_id"],
+    "aws_carrier_gateway": ["vpc_id"],
+    "aws_vpc_endpoint": ["vpc_id"],
+    "aws_vpc_endpoint_route_table_association": ["vpc_endpoint_id","route_table_id"],
+    "aws_vpc_ipv4_cidr_block_association": ["vpc_id"],
+    "aws_vpc_ipv6_cidr_block_association": ["vpc_id"],
+    "aws_vpc": [],
+}
+
+class TerraformResource:
+    '''
+    A managed resource from the state or plan: its address, type, module
+    and index, and its known attribute values.
+    '''
+    __slots__ = ("address","type","module_prefix","index","values")
+
+    def __init__(self,resource,module_prefix):
+        self.address = resource["address"]
+        self.type = resource["type"]
+        self.module_prefix = module_prefix
+        self.index = resource.get("index")
+        self.values = resource.get("values") or {}
+
+    def get_config_key(self):
+        '''
+        The resource's address in the configuration, without its index or
+        those of its modules.
+        '''
+        return re.sub(r"\[[^\]]*\]","",self.module_prefix + self.type + "." + self.address.rsplit(self.type + ".",1)[1])
+
+def load_terraform_snapshots(filename):
+    '''
+    Read "terraform show -json" output for a state file or a saved plan, and
+    return the VPCs in it as a dict of {vpc_id: snapshot}.
+    '''
+    try:
+        with open(filename,"rb") as f:
+            if ijson is not None:
+                resources,references = read_streamed(f)
+            else:
+                size = os.fstat(f.fileno()).st_size
+                if size > MAX_UNSTREAMED_BYTES:
+                    raise VpcDiagramError(f"Terraform JSON file {filename} is {size // (1024 * 1024)} MB, "
+                        "reading it without loading it whole needs the ijson module")
+                resources,references = read_document(json.load(f))
+    except READ_ERRORS as e:
+        raise VpcDiagramError(f"cannot read Terraform JSON file {filename}: {e}")
+
+    if len(resources) == 0:
+        raise VpcDiagramError(f"no AWS VPC resources found in {filename} (expected the output of 'terraform show -json')")
+
+    return build_snapshots(resources,references)
+
+# Reading -------------------------------------------------------------
+
+def read_streamed(f):
+    '''
+    Stream-parse the JSON with ijson, building only the resources (and the
+    configuration references) of the types in REFERENCE_ATTRIBUTES.
+    '''
+    resources = {}
+    references = {}
+    builder = None
+    for prefix,event,value in ijson.parse(f,use_float=True):
+        if builder is not None:
+            builder.event(event,value)
+            if event == "end_map" and prefix == builder_prefix:
+                add_resource(resources,references,builder_kind,builder_module_prefix,builder.value)
+                builder = None
+            continue
+
+        if event != "start_map":
+            continue
+        if RESOURCE_PREFIX_RE.match(prefix):
+            builder_kind = "resource"
+            builder_module_prefix = None
+        else:
+            match = CONFIGURATION_PREFIX_RE.match(prefix)
+            if match is None:
+                continue
+            builder_kind = "configuration"
+            builder_module_prefix = get_module_prefix(match.group(1))
+        builder = ijson.ObjectBuilder()
+        builder.event(event,value)
+        builder_prefix = prefix
+
+    return resources,references
+
+def read_document(document):
+    '''
+    The json.load() counterpart of read_streamed().
+    '''
+    resources = {}
+    references = {}
+
+    def walk_values(module):
+        for resource in module.get("resources",[]):
+            add_resource(resources,references,"resource",None,resource)
+        for child_module in module.get("child_modules",[]):
+            walk_values(child_module)
+
+    def walk_configuration(module,module_prefix):
+        for resource in module.get("resources",[]):
+            add_resource(resources,references,"configuration",module_prefix,resource)
+        for name,module_call in module.get("module_calls",{}).items():
+            walk_configuration(module_call.get("module",{}),f"{module_prefix}module.{name}.")
+
+    if not isinstance(document,dict):
+        raise ValueError("not a JSON object")
+    for key in ["values","planned_values"]:
+        if key in document:
+            walk_values(document[key].get("root_module",{}))
+    if "configuration" in document:
+        walk_configuration(document["configuration"].get("root_module",{}),"")
+    return resources,references
+
+def get_module_prefix(module_calls_path):
+    '''
+    Turn a ".module_calls.a.module.module_calls.b.module" JSON path in to
+    the "module.a.module.b." address prefix.
+    '''
+    return "".join(f"module.{name}." for name in re.findall(r"\.module_calls\.([^.]+)\.module",module_calls_path))
+
+def add_resource(resources,references,kind,module_prefix,resource):
+    '''
+    Keep a resource from the values, or the references of a resource from
+    the configuration, if it is of a type of interest.
+    '''
+    if resource.get("mode","managed") != "managed" or resource.get("type") not in REFERENCE_ATTRIBUTES:
+        return
+
+    if kind == "resource":
+        address = resource["address"]
+        module_prefix = address[:address.index(resource["type"] + ".")]
+        resources[address] = TerraformResource(resource,module_prefix)
+        return
+
+    expressions = resource.get("expressions",{})
+    resource_references = {}
+    for attribute in REFERENCE_ATTRIBUTES[resource["type"]]:
+        attribute_references = expressions.get(attribute,{}).get("references")
+        if attribute_references:
+            resource_references[attribute] = attribute_references
+    references[module_prefix + resource["address"]] = resource_references
+
+# Resolving -----------------------------------------------------------
+
+def resolve(resources,references,resource,attribute):
+    '''
+    The value of a resource attribute that refers to another resource: the
+    known value, or else the other resource's ID (or placeholder) as found
+    through the configuration's references. None if neither is known.
+    '''
+    value = resource.values.get(attribute)
+    if value:
+        return value
+
+    for reference in references.get(resource.get_config_key(),{}).get(attribute,[]):
+        match = REFERENCE_RE.match(reference)
+        if match is None:
+            continue
+
+        address = resource.module_prefix + match.group("address")
+        index = match.group("index")
+        if index in ["count.index","each.key"]:
+            index = resource.index
+        elif index is not None:
+            index = json.loads(index) if index.startswith('"') or index.isdigit() else None
+        if index is None and address not in resources and resource.index is not None:
+            # Referenced as a whole, with the index elsewhere in the expression
+            index = resource.index
+        if index is not None:
+            address += f"[{json.dumps(index)}]"
+
+        target_attribute = match.group("attribute") or "id"
+        if address in resources:
+            target = resources[address]
+            if target.values.get(target_attribute):
+                return target.values[target_attribute]
+        return address if target_attribute == "id" else f"{address}.{target_attribute}"
+
+    return None
+
+def get_id(resource):
+    return resource.values.get("id") or resource.address
+
+def get_tags(resource):
+    tags = resource.values.get("tags_all") or resource.values.get("tags") or {}
+    return [{"Key": key, "Value": value} for key,value in tags.items()]
+
+# Building ------------------------------------------------------------
+
+def build_snapshots(resources,references):
+    '''
+    Turn the resources in to EC2-style descriptions, and those in to a
+    snapshot per VPC.
+    '''
+    def ref(resource,attribute):
+        return resolve(resources,references,resource,attribute)
+
+    by_type = {}
+    for resource in resources.values():
+        by_type.setdefault(resource.type,[]).append(resource)
+
+    snapshots = {}
+    route_tables = {}
+    subnet_vpc_ids = {}
+
+    for resource in by_type.get("aws_vpc",[]):
+        vpc_id = get_id(resource)
+        values = resource.values
+        vpc_description = {"VpcId": vpc_id, "Tags": get_tags(resource),
+            "CidrBlockAssociationSet": [], "Ipv6CidrBlockAssociationSet": []}
+        if values.get("owner_id"):
+            vpc_description["OwnerId"] = values["owner_id"]
+        if values.get("cidr_block"):
+            vpc_description["CidrBlock"] = values["cidr_block"]
+        if values.get("ipv6_cidr_block"):
+            vpc_description["Ipv6CidrBlockAssociationSet"].append(
+                {"Ipv6CidrBlock": values["ipv6_cidr_block"], "Ipv6CidrBlockState": {"State": "associated"}})
+        snapshots[vpc_id] = {
+            "Vpc": vpc_description,
+            "Subnets": [],
+            "RouteTables": [],
+            "InternetGateways": [],
+            "EgressOnlyInternetGateways": [],
+            "NatGateways": [],
+            "AccepterVpcPeeringConnections": [],
+            "RequesterVpcPeeringConnections": [],
+            "VpnGateways": [],
+            "VpnConnections": [],
+            "TransitGateways": [],
+            "TransitGatewayAttachments": [],
+            "CarrierGateways": [],
+            "VpcEndpoints": [],
+            "NetworkInterfaces": [],
+            "LocalGateways": [],
+            "ManagedPrefixLists": [],
+            "ManagedPrefixListEntries": [],
+        }
+
+        # Every VPC has a main route table, whether or not Terraform manages
+        # it, with the local routes for the VPC's CIDR blocks.
+        main_route_table_id = values.get("default_route_table_id") or f"{resource.address}.default_route_table_id"
+        route_tables[main_route_table_id] = {"RouteTableId": main_route_table_id, "VpcId": vpc_id,
+            "Associations": [{"Main": True, "RouteTableId": main_route_table_id}], "Routes": [], "Tags": []}
+
+    def add(vpc_id,key,description):
+        if vpc_id in snapshots:
+            snapshots[vpc_id][key].append(description)
+
+    for resource_type,ip_key,cidr_key,state_key,set_key in [
+            ("aws_vpc_ipv4_cidr_block_association","cidr_block","CidrBlock","CidrBlockState","CidrBlockAssociationSet"),
+            ("aws_vpc_ipv6_cidr_block_association","ipv6_cidr_block","Ipv6CidrBlock","Ipv6CidrBlockState","Ipv6CidrBlockAssociationSet")]:
+        for resource in by_type.get(resource_type,[]):
+            vpc_id = ref(resource,"vpc_id")
+            if vpc_id in snapshots and resource.values.get(ip_key):
+                snapshots[vpc_id]["Vpc"][set_key].append({cidr_key: resource.values[ip_key], state_key: {"State": "associated"}})
+
+    for resource in by_type.get("aws_subnet",[]):
+        subnet_id = get_id(resource)
+        vpc_id = ref(resource,"vpc_id")
+        subnet_vpc_ids[subnet_id] = vpc_id
+        subnet_description = {"SubnetId": subnet_id, "VpcId": vpc_id, "Tags": get_tags(resource)}
+        for attribute,key in [("cidr_block","CidrBlock"),("availability_zone","AvailabilityZone"),("availability_zone_id","AvailabilityZoneId")]:
+            if resource.values.get(attribute):
+                subnet_description[key] = resource.values[attribute]
+        if resource.values.get("ipv6_cidr_block"):
+            subnet_description["Ipv6CidrBlockAssociationSet"] = [
+                {"Ipv6CidrBlock": resource.values["ipv6_cidr_block"], "Ipv6CidrBlockState": {"State": "associated"}}]
+        add(vpc_id,"Subnets",subnet_description)
+
+    # Route tables, with their inline routes
+    for resource in by_type.get("aws_route_table",[]):
+        route_table_id = get_id(resource)
+        route_tables[route_table_id] = {"RouteTableId": route_table_id, "VpcId": ref(resource,"vpc_id"),
+            "Associations": [], "Routes": [], "Tags": get_tags(resource)}
+        for route in resource.values.get("route") or []:
+            add_route(route_tables[route_table_id],route)
+
+    for resource in by_type.get("aws_default_route_table",[]):
+        route_table_id = ref(resource,"default_route_table_id")
+        if route_table_id in route_tables:
+            route_tables[route_table_id]["Tags"] = get_tags(resource)
+            for route in resource.values.get("route") or []:
+                add_route(route_tables[route_table_id],route)
+
+    for resource in by_type.get("aws_main_route_table_association",[]):
+        vpc_id = ref(resource,"vpc_id")
+        route_table_id = ref(resource,"route_table_id")
+        for route_table_description in route_tables.values():
+            if route_table_description["VpcId"] == vpc_id:
+                route_table_description["Associations"] = [a for a in route_table_description["Associations"] if not a["Main"]]
+        if route_table_id in route_tables:
+            route_tables[route_table_id]["Associations"].append({"Main": True, "RouteTableId": route_table_id})
+
+    for resource in by_type.get("aws_route_table_association",[]):
+        route_table_id = ref(resource,"route_table_id")
+        subnet_id = ref(resource,"subnet_id")
+        if route_table_id in route_tables and subnet_id is not None:
+            route_tables[route_table_id]["Associations"].append(
+                {"Main": False, "SubnetId": subnet_id, "RouteTableId": route_table_id})
+
+    for resource in by_type.get("aws_route",[]):
+        route_table_id = ref(resource,"route_table_id")
+        if route_table_id in route_tables:
+            add_route(route_tables[route_table_id],{attribute: ref(resource,attribute)
+                for attribute in REFERENCE_ATTRIBUTES["aws_route"] + ["destination_cidr_block","destination_ipv6_cidr_block"]})
+
+    # Gateway endpoints add a route to their service's prefix list
+    for resource in by_type.get("aws_vpc_endpoint",[]):
+        vpc_endpoint_id = get_id(resource)
+        add(ref(resource,"vpc_id"),"VpcEndpoints",{"VpcEndpointId": vpc_endpoint_id, "VpcId": ref(resource,"vpc_id"),
+            "ServiceName": resource.values.get("service_name"), "VpcEndpointType": resource.values.get("vpc_endpoint_type"),
+            "Tags": get_tags(resource)})
+        prefix_list_id = resource.values.get("prefix_list_id") or f"{resource.address}.prefix_list_id"
+        for route_table_id in resource.values.get("route_table_ids") or []:
+            if route_table_id in route_tables:
+                add_route(route_tables[route_table_id],{"destination_prefix_list_id": prefix_list_id, "gateway_id": vpc_endpoint_id})
+
+    for resource in by_type.get("aws_vpc_endpoint_route_table_association",[]):
+        route_table_id = ref(resource,"route_table_id")
+        vpc_endpoint_id = ref(resource,"vpc_endpoint_id")
+        if route_table_id in route_tables:
+            add_route(route_tables[route_table_id],{"destination_prefix_list_id": f"{vpc_endpoint_id}.prefix_list_id", "gateway_id": vpc_endpoint_id})
+
+    for route_table_description in route_tables.values():
+        vpc_id = route_table_description["VpcId"]
+        if vpc_id not in snapshots:
+            continue
+        add_local_routes(route_table_description,snapshots[vpc_id]["Vpc"])
+        add(vpc_id,"RouteTables",route_table_description)
+
+    # Gateways
+    internet_gateways = {}
+    for resource in by_type.get("aws_internet_gateway",[]):
+        internet_gateway_id = get_id(resource)
+        internet_gateways[internet_gateway_id] = {"InternetGatewayId": internet_gateway_id, "Attachments": [], "Tags": get_tags(resource)}
+        if ref(resource,"vpc_id") is not None:
+            internet_gateways[internet_gateway_id]["Attachments"].append({"VpcId": ref(resource,"vpc_id"), "State": "available"})
+    for resource in by_type.get("aws_internet_gateway_attachment",[]):
+        internet_gateway_id = ref(resource,"internet_gateway_id")
+        if internet_gateway_id in internet_gateways:
+            internet_gateways[internet_gateway_id]["Attachments"].append({"VpcId": ref(resource,"vpc_id"), "State": "available"})
+    for internet_gateway_description in internet_gateways.values():
+        for attachment in internet_gateway_description["Attachments"]:
+            add(attachment["VpcId"],"InternetGateways",internet_gateway_description)
+
+    for resource in by_type.get("aws_egress_only_internet_gateway",[]):
+        vpc_id = ref(resource,"vpc_id")
+        add(vpc_id,"EgressOnlyInternetGateways",{"EgressOnlyInternetGatewayId": get_id(resource),
+            "Attachments": [{"VpcId": vpc_id, "State": "attached"}], "Tags": get_tags(resource)})
+
+    for resource in by_type.get("aws_nat_gateway",[]):
+        subnet_id = ref(resource,"subnet_id")
+        vpc_id = subnet_vpc_ids.get(subnet_id)
+        add(vpc_id,"NatGateways",{"NatGatewayId": get_id(resource), "VpcId": vpc_id, "SubnetId": subnet_id,
+            "ConnectivityType": resource.values.get("connectivity_type","public"), "Tags": get_tags(resource)})
+
+    for resource in by_type.get("aws_carrier_gateway",[]):
+        vpc_id = ref(resource,"vpc_id")
+        add(vpc_id,"CarrierGateways",{"CarrierGatewayId": get_id(resource), "VpcId": vpc_id, "Tags": get_tags(resource)})
+
+    for resource in by_type.get("aws_vpc_peering_connection",[]):
+        requester_vpc_info = {"VpcId": ref(resource,"vpc_id"), "OwnerId": resource.values.get("owner_id") or ""}
+        accepter_vpc_info = {"VpcId": ref(resource,"peer_vpc_id"), "OwnerId": resource.values.get("peer_owner_id") or ""}
+        if resource.values.get("peer_region"):
+            accepter_vpc_info["Region"] = resource.values["peer_region"]
+        vpc_peering_connection_description = {"VpcPeeringConnectionId": get_id(resource),
+            "RequesterVpcInfo": requester_vpc_info, "AccepterVpcInfo": accepter_vpc_info,
+            "Status": {"Code": "active"}, "Tags": get_tags(resource)}
+        add(requester_vpc_info["VpcId"],"RequesterVpcPeeringConnections",vpc_peering_connection_description)
+        add(accepter_vpc_info["VpcId"],"AccepterVpcPeeringConnections",vpc_peering_connection_description)
+
+    vpn_gateways = {}
+    for resource in by_type.get("aws_vpn_gateway",[]):
+        vpn_gateway_id = get_id(resource)
+        vpn_gateways[vpn_gateway_id] = {"VpnGatewayId": vpn_gateway_id, "VpcAttachments": [], "Tags": get_tags(resource)}
+        if ref(resource,"vpc_id") is not None:
+            vpn_gateways[vpn_gateway_id]["VpcAttachments"].append({"VpcId": ref(resource,"vpc_id"), "State": "attached"})
+    for resource in by_type.get("aws_vpn_gateway_attachment",[]):
+        vpn_gateway_id = ref(resource,"vpn_gateway_id")
+        if vpn_gateway_id in vpn_gateways:
+            vpn_gateways[vpn_gateway_id]["VpcAttachments"].append({"VpcId": ref(resource,"vpc_id"), "State": "attached"})
+    for vpn_gateway_description in vpn_gateways.values():
+        for attachment in vpn_gateway_description["VpcAttachments"]:
+            add(attachment["VpcId"],"VpnGateways",vpn_gateway_description)
+            for resource in by_type.get("aws_vpn_connection",[]):
+                if ref(resource,"vpn_gateway_id") == vpn_gateway_description["VpnGatewayId"]:
+                    add(attachment["VpcId"],"VpnConnections",{"VpnConnectionId": get_id(resource),
+                        "VpnGatewayId": vpn_gateway_description["VpnGatewayId"], "Tags": get_tags(resource)})
+
+    # Transit gateways: a VPC's snapshot has the transit gateways it is
+    # attached to, and their other attachments.
+    transit_gateways = {get_id(r): {"TransitGatewayId": get_id(r), "Tags": get_tags(r)} for r in by_type.get("aws_ec2_transit_gateway",[])}
+    transit_gateway_attachments = []
+    for resource in by_type.get("aws_ec2_transit_gateway_vpc_attachment",[]):
+        transit_gateway_attachments.append({"TransitGatewayAttachmentId": get_id(resource),
+            "TransitGatewayId": ref(resource,"transit_gateway_id"), "ResourceType": "vpc",
+            "ResourceId": ref(resource,"vpc_id"), "State": "available", "Tags": get_tags(resource)})
+    for resource in by_type.get("aws_vpn_connection",[]):
+        if ref(resource,"transit_gateway_id") is not None:
+            transit_gateway_attachments.append({"TransitGatewayAttachmentId": resource.values.get("transit_gateway_attachment_id") or f"{resource.address}.transit_gateway_attachment_id",
+                "TransitGatewayId": ref(resource,"transit_gateway_id"), "ResourceType": "vpn",
+                "ResourceId": get_id(resource), "State": "available"})
+    for attachment in transit_gateway_attachments:
+        if attachment["ResourceType"] != "vpc" or attachment["ResourceId"] not in snapshots:
+            continue
+        vpc_id = attachment["ResourceId"]
+        transit_gateway_id = attachment["TransitGatewayId"]
+        if all(d["TransitGatewayId"] != transit_gateway_id for d in snapshots[vpc_id]["TransitGateways"]):
+            add(vpc_id,"TransitGateways",transit_gateways.get(transit_gateway_id,{"TransitGatewayId": transit_gateway_id}))
+        for other_attachment in transit_gateway_attachments:
+            if other_attachment["TransitGatewayId"] == transit_gateway_id and other_attachment is not attachment:
+                add(vpc_id,"TransitGatewayAttachments",other_attachment)
+
+    return snapshots
+
+def add_route(route_table_description,route):
+    '''
+    Add a route, given as Terraform attributes, to a route table description
+    as an EC2 route.
+    '''
+    route_description = {"Origin": "CreateRoute", "State": "active"}
+    for attribute,key in ROUTE_DESTINATION_ATTRIBUTES + ROUTE_TARGET_ATTRIBUTES:
+        if route.get(attribute) and key not in route_description:
+            route_description[key] = route[attribute]
+    route_table_description["Routes"].append(route_description)
+
+def add_local_routes(route_table_description,vpc_description):
+    '''
+    Add the local routes for the VPC's CIDR blocks to a route table.
+    '''
+    local_routes = []
+    cidr_blocks = [vpc_description.get("CidrBlock")]
+    cidr_blocks += [a["CidrBlock"] for a in vpc_description["CidrBlockAssociationSet"]]
+    for cidr_block in dict.fromkeys(cidr_blocks):
+        if cidr_block is not None:
+            local_routes.append({"DestinationCidrBlock": cidr_block, "GatewayId": "local", "Origin": "CreateRouteTable", "State": "active"})
+    for association in vpc_description["Ipv6CidrBlockAssociationSet"]:
+        local_routes.append({"DestinationIpv6CidrBlock": association["Ipv6CidrBlock"], "GatewayId": "local", "Origin": "CreateRouteTable", "State": "active"})
+    route_table_description["Routes"] = local_routes + route_table_description["Routes"]
@@ -0,0 +1,163 @@
+'''
+Instrumentation for --trace: wall time of each phase of a run, and the
+latency, retries and pagination of every EC2 API call, recorded through
+botocore's event hooks.
+
+The trace is written as a Chrome trace-event file (chrome://tracing or
+https://ui.perfetto.dev) whose extra keys hold the same data as plain JSON,
+and a summary table goes to stderr. Without --trace a NullTracer is used,
+which registers no hooks and whose spans do nothing.
+'''
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Where the start time and operation of a call, and whether it continues a
+# paginated listing, are kept in botocore's request context.
+CONTEXT_START_KEY = "vpc_network_diagram_trace_start"
+CONTEXT_OPERATION_KEY = "vpc_network_diagram_trace_operation"
+CONTEXT_CONTINUATION_KEY = "vpc_network_diagram_trace_continuation"
+
+class Tracer:
+    '''
+    Records spans (named, timed sections of the run, with arguments such as
+    node counts) and API calls, from any thread.
+    '''
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = []
+        self._api_calls = []
+
+    @contextlib.contextmanager
+    def span(self,name,category="phase",**arguments):
+        '''
+        Time the body of a with statement. The dict of arguments is yielded
+        so that results (e.g. counts) can be added to it.
+        '''
+        start = time.perf_counter()
+        try:
+            yield arguments
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._spans.append({"Name": name, "Category": category,
+                    "Start": start - self._origin, "Seconds": end - start,
+                    "Thread": threading.get_ident(), "Arguments": arguments})
+
+    def instrument_client(self,client):
+        '''
+        Register the event hooks that record the client's EC2 API calls.
+        Returns the client.
+        '''
+        events = client.meta.events
+        events.register("provide-client-params.ec2",self._provide_client_params)
+        events.register("before-call.ec2",self._before_call)
+        events.register("after-call.ec2",self._after_call)
+        events.register("after-call-error.ec2",self._after_call_error)
+        return client
+
+    def _provide_client_params(self,params,context,**kwargs):
+        # A request with a NextToken is a later page of a listing
+        context[CONTEXT_CONTINUATION_KEY] = params.get("NextToken") is not None
+
+    def _before_call(self,model,context,**kwargs):
+        context[CONTEXT_START_KEY] = time.perf_counter()
+        context[CONTEXT_OPERATION_KEY] = model.name
+
+    def _after_call(self,model,http_response,parsed,context,**kwargs):
+        metadata = parsed.get("ResponseMetadata",{})
+        self._add_api_call(model.name,context,http_response.status_code,
+            metadata.get("RetryAttempts",0),parsed.get("Error",{}).get("Code"),
+            "NextToken" in parsed)
+
+    def _after_call_error(self,exception,context,**kwargs):
+        self._add_api_call(context.get(CONTEXT_OPERATION_KEY),context,None,0,type(exception).__name__,False)
+
+    def _add_api_call(self,operation_name,context,status_code,retries,error,has_next_page):
+        end = time.perf_counter()
+        start = context.get(CONTEXT_START_KEY,end)
+        with self._lock:
+            self._api_calls.append({"Operation": operation_name, "Region": context.get("client_region"),
+                "Start": start - self._origin, "Seconds": end - start, "Thread": threading.get_ident(),
+                "StatusCode": status_code, "Retries": retries, "Error": error,
+                "Continuation": context.get(CONTEXT_CONTINUATION_KEY,False), "HasNextPage": has_next_page})
+
+    # Output ----------------------------------------------------------
+
+    def get_api_call_summary(self):
+        '''
+        The API calls totalled by operation, slowest first: a list of dicts
+        with the Operation, Calls (each paginated listing counting once),
+        Pages (the requests made, one per page of each call), Retries,
+        Errors, and total and maximum Seconds (per request).
+        '''
+        operations = {}
+        for api_call in self._api_calls:
+            operation = operations.setdefault(api_call["Operation"],{"Operation": api_call["Operation"],
+                "Calls": 0, "Pages": 0, "Retries": 0, "Errors": 0, "Seconds": 0.0, "MaxSeconds": 0.0})
+            operation["Calls"] += not api_call["Continuation"]
+            operation["Pages"] += 1
+            operation["Retries"] += api_call["Retries"]
+            operation["Errors"] += api_call["Error"] is not None
+            operation["Seconds"] += api_call["Seconds"]
+            operation["MaxSeconds"] = max(operation["MaxSeconds"],api_call["Seconds"])
+        return sorted(operations.values(),key=lambda o: -o["Seconds"])
+
+    def write(self,filename):
+        '''
+        Write the trace as a Chrome trace-event JSON object. Chrome ignores
+        the other keys: the Spans, the ApiCalls and their Summary.
+        '''
+        pid = os.getpid()
+        thread_ids = {}
+        trace_events = []
+        for category,events in [("phase",self._spans),("api",self._api_calls)]:
+            for event in events:
+                tid = thread_ids.setdefault(event["Thread"],len(thread_ids))
+                trace_events.append({"name": event.get("Name",event.get("Operation")),
+                    "cat": event.get("Category",category), "ph": "X", "pid": pid, "tid": tid,
+                    "ts": round(event["Start"] * 1e6,3), "dur": round(event["Seconds"] * 1e6,3),
+                    "args": event.get("Arguments",{k: v for k,v in event.items() if k not in ["Start","Seconds","Thread"]})})
+
+        document = {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "Spans": self._spans,
+            "ApiCalls": self._api_calls,
+            "ApiCallSummary": self.get_api_call_summary(),
+        }
+        with open(filename,"w",encoding="utf-8") as f:
+            json.dump(document,f,default=str)
+
+    def write_summary(self,stream):
+        '''
+        Write a table of the phases and the API calls by operation.
+        '''
+        stream.write(f"{'Phase':<40} {'Seconds':>9}  Details\n")
+        for span in sorted(self._spans,key=lambda span: span["Start"]):
+            if span["Category"] != "phase":
+                continue
+            details = " ".join(f"{k}={v}" for k,v in span["Arguments"].items())
+            stream.write(f"{span['Name']:<40} {span['Seconds']:>9.3f}  {details}\n")
+
+        summary = self.get_api_call_summary()
+        if len(summary) > 0:
+            stream.write(f"\n{'API Operation':<40} {'Calls':>6} {'Pages':>6} {'Retries':>7} {'Errors':>6} {'Seconds':>9} {'Max':>7}\n")
+            for operation in summary:
+                stream.write(f"{operation['Operation']:<40} {operation['Calls']:>6} {operation['Pages']:>6} "
+                    f"{operation['Retries']:>7} {operation['Errors']:>6} {operation['Seconds']:>9.3f} {operation['MaxSeconds']:>7.3f}\n")
+
+class NullTracer:
+    '''
+    The tracer used without --trace: no hooks and no recording.
+    '''
+    def span(self,name,category="phase",**arguments):
+        # A dict of its own, as callers add details to it
+        return contextlib.nullcontext({})
+
+    def instrument_client(self,client):
+        return client